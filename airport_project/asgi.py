@@ -3,6 +3,10 @@ ASGI config for airport_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this entry point (e.g. ``uvicorn airport_project.asgi:application``)
+to run the async views natively, including the long-lived SSE change feed at
+/api/events/flights/ (flights.events).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,27 +49,42 @@ INSTALLED_APPS = [
 
 # MIDDLEWARE
 MIDDLEWARE = [
+    # outermost: Server-Timing header, slow-request log and per-route histograms
+    'flights.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # read-your-writes stickiness for flights.db_router.ReplicaRouter
+    'flights.db_router.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'flights.middleware.JWTAuthFromCookieMiddleware',
+    # rejects floods on FLIGHTS_RATE_LIMITS routes before the view runs
+    'flights.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 # REST Framework + JWT
 REST_FRAMEWORK = {
+    # JWT first: bearer/cookie requests never touch the session store
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'flights.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': (
+        # TimedJSONRenderer on orjson when it is installed (flights.fastpath)
+        'flights.fastpath.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'flights.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
+    'MAX_PAGE_SIZE': 200,  # hard cap for ?page_size=
 }
 
 from datetime import timedelta
@@ -76,6 +92,54 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
+# JWT-only mode (FLIGHTS_STATELESS_AUTH=1): HTML views authenticate from the
+# access_token cookie, flash messages travel in a signed cookie and nothing
+# reads or writes django_session, so web nodes need no shared session store.
+# The admin's login/logout are routed to the cookie views (airport_project.urls).
+FLIGHTS_STATELESS_AUTH = os.environ.get('FLIGHTS_STATELESS_AUTH', '').lower() in ('1', 'true', 'yes')
+if FLIGHTS_STATELESS_AUTH:
+    MIDDLEWARE.remove('django.contrib.sessions.middleware.SessionMiddleware')
+    MIDDLEWARE[MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware')] = (
+        'flights.middleware.JWTCookieAuthenticationMiddleware'
+    )
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = ('flights.authentication.CachedJWTAuthentication',)
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+    # admin.E410 asks for SessionMiddleware, which the admin no longer needs here
+    SILENCED_SYSTEM_CHECKS = ['admin.E410']
+
+# verified-token LRU used by flights.authentication (entries, seconds)
+FLIGHTS_JWT_CACHE_SIZE = 10_000
+FLIGHTS_JWT_CACHE_TTL = 15 * 60
+# requests slower than this are logged with their SQL by flights.instrumentation (milliseconds)
+FLIGHTS_SLOW_REQUEST_MS = 500
+# JWTAuthFromCookieMiddleware renews the access cookie this close to expiry (seconds)
+FLIGHTS_JWT_REFRESH_THRESHOLD = 5 * 60
+# queued booking mode: joins answer 202 and `process_bookings` books them (flights.booking)
+FLIGHTS_BOOKING_QUEUE = False
+# Token-bucket limits per URL name, checked by flights.ratelimit before the
+# view runs ("<ip|user|flight>:<requests>/<s|m|h|d>"; unsafe methods only)
+FLIGHTS_RATE_LIMITS = {
+    # password hashing
+    'token_obtain_pair': ['ip:20/m', 'ip:200/h'],
+    'login': ['ip:20/m', 'ip:200/h'],
+    'admin:login': ['ip:20/m', 'ip:200/h'],
+    'admin_login': ['ip:20/m', 'ip:200/h'],  # admin login with FLIGHTS_STATELESS_AUTH
+    'user-register': ['ip:10/h'],
+    'register': ['ip:10/h'],
+    # seat booking
+    'flight-join': ['user:30/m', 'ip:120/m', 'flight:50/s'],
+    'async_flight_join': ['user:30/m', 'ip:120/m', 'flight:50/s'],
+    'register_flight': ['user:30/m', 'ip:120/m', 'flight:50/s'],
+}
+# bucket store shared by the worker processes of a host (None: a file in the temp dir)
+FLIGHTS_RATELIMIT_PATH = None
+# SSE change feed (flights.events): outbox poll interval and stream lifetime (seconds)
+FLIGHTS_EVENTS_POLL_INTERVAL = 1.0
+FLIGHTS_EVENTS_STREAM_SECONDS = 5 * 60
+# password hashing processes used by flights.onboarding (None: one per CPU)
+FLIGHTS_ONBOARDING_WORKERS = None
+# ... and by bulk_register, in one pool per server process (1: hash in the request)
+FLIGHTS_ONBOARDING_WEB_WORKERS = 2
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Flight Booking API',
     'DESCRIPTION': 'API for flight management, passenger registration and booking',
@@ -99,7 +163,8 @@ ROOT_URLCONF = 'airport_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to flights.instrumentation
+        'BACKEND': 'flights.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -133,6 +198,38 @@ DATABASES = {
     # }
 }
 
+# Read replicas: reads of flights models go to these aliases (see flights.db_router),
+# e.g. ['replica'] with DATABASES['replica'] = {..., 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['flights.db_router.ReplicaRouter']
+FLIGHTS_READ_REPLICAS = []
+# reads stay on the primary this long after the client wrote (seconds)
+FLIGHTS_REPLICA_STICKY_SECONDS = 5
+# replicas are probed at most this often per process (seconds)
+FLIGHTS_REPLICA_HEALTH_INTERVAL = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'catalog' holds the versioned API responses of the public flight catalog
+# (see flights/cache.py). LocMemCache evicts in LRU order once MAX_ENTRIES is
+# reached; with several worker processes switch it to a shared backend, e.g.
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache' / 'catalog',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'flight-catalog',
+        # API responses plus ~3 HTML fragment entries per flight (flights.fragments)
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+FLIGHTS_CATALOG_CACHE = 'catalog'
+FLIGHTS_CATALOG_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
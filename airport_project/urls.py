@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import (
@@ -26,4 +27,14 @@ urlpatterns = [
 
     # Redoc UI (مستندات خواناتر)
     path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-]
\ No newline at end of file
+]
+
+# the admin's own login/logout views store the user in the session; named
+# so that FLIGHTS_RATE_LIMITS can limit the login
+stateless_admin_urls = [
+    path('admin/login/', cookie_login_view, name='admin_login'),
+    path('admin/logout/', cookie_logout_view, name='admin_logout'),
+]
+
+if settings.FLIGHTS_STATELESS_AUTH:
+    urlpatterns = stateless_admin_urls + urlpatterns
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Flight, Passenger, Airport, City
+from .models import BookingRequest, Flight, Passenger, Airport, City, RouteStats, AirportStats, CityStats
 
 @admin.register(Flight)
 class FlightAdmin(admin.ModelAdmin):
@@ -17,7 +17,8 @@ class FlightAdmin(admin.ModelAdmin):
         'destination__city',         # فیلتر بر اساس شهر مقصد
     ]
     search_fields = ['name', 'origin__name', 'destination__name']
-    readonly_fields = ['passenger_count']  # اختیاری
+    readonly_fields = ['passenger_count']  # مقدار ذخیره‌شده؛ توسط سیگنال‌ها به‌روز می‌شود
+    list_select_related = ['origin__city', 'destination__city']
 
     def origin_city(self, obj):
         return obj.origin.city.name if obj.origin and obj.origin.city else '-'
@@ -27,16 +28,13 @@ class FlightAdmin(admin.ModelAdmin):
         return obj.destination.city.name if obj.destination and obj.destination.city else '-'
     destination_city.short_description = 'شهر مقصد'
 
-    def passenger_count(self, obj):
-        return obj.passengers.count()
-    passenger_count.short_description = 'تعداد مسافران'
-
 
 # اگر می‌خوای بقیه مدل‌ها هم در ادمین باشن (اختیاری)
 @admin.register(Passenger)
 class PassengerAdmin(admin.ModelAdmin):
-    list_display = ['name', 'passport', 'phone', 'user']
+    list_display = ['name', 'passport', 'phone', 'user', 'organizer']
     search_fields = ['name', 'passport']
+    raw_id_fields = ['organizer']
 
 @admin.register(Airport)
 class AirportAdmin(admin.ModelAdmin):
@@ -46,4 +44,57 @@ class AirportAdmin(admin.ModelAdmin):
 @admin.register(City)
 class CityAdmin(admin.ModelAdmin):
     list_display = ['name']
-    search_fields = ['name']
\ No newline at end of file
+    search_fields = ['name']
+
+
+# درخواست‌های رزرو در صف (flights.booking)؛ توسط process_bookings پردازش می‌شوند
+@admin.register(BookingRequest)
+class BookingRequestAdmin(admin.ModelAdmin):
+    list_display = ['id', 'flight', 'passenger', 'status', 'created_at', 'processed_at']
+    list_filter = ['status']
+    list_select_related = ['flight__origin', 'flight__destination', 'passenger__user']
+    readonly_fields = ['flight', 'passenger', 'status', 'created_at', 'processed_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+# آمار از پیش محاسبه‌شده (flights.stats)؛ فقط خواندنی
+class ReadOnlyStatsAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RouteStats)
+class RouteStatsAdmin(ReadOnlyStatsAdmin):
+    list_display = ['origin', 'destination', 'flight_count', 'passenger_count', 'seats', 'load_factor']
+    list_select_related = ['origin', 'destination']
+    ordering = ['-passenger_count']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_load_factor()
+
+    def load_factor(self, obj):
+        return '-' if obj.load_factor is None else f'{obj.load_factor:.0%}'
+    load_factor.short_description = 'ضریب اشغال'
+    load_factor.admin_order_field = 'load_factor'
+
+
+@admin.register(AirportStats)
+class AirportStatsAdmin(ReadOnlyStatsAdmin):
+    list_display = ['airport', 'departing_flights', 'arriving_flights', 'departing_passengers', 'arriving_passengers']
+    list_select_related = ['airport']
+    ordering = ['-departing_passengers']
+
+
+@admin.register(CityStats)
+class CityStatsAdmin(ReadOnlyStatsAdmin):
+    list_display = ['city', 'departing_flights', 'arriving_flights', 'departing_passengers', 'arriving_passengers']
+    list_select_related = ['city']
+    ordering = ['-departing_passengers']
@@ -0,0 +1,301 @@
+"""
+Async (ASGI) versions of the hot flight endpoints.
+
+These views run on the event loop and read through Django's async ORM, so a
+single ASGI worker can hold many slow client connections without tying up a
+thread per request. They return the same JSON bodies as the DRF endpoints,
+built from values_list rows (flights.fastpath):
+
+- GET  /api/async/flights/               → List flights (?after_id=&page_size=)
+- GET  /api/async/flights/<id>/          → Retrieve flight detail
+- GET  /api/async/flights/my_flights/    → Flights the current user has joined
+- POST /api/async/flights/<id>/join/     → Join the flight as passenger
+- GET  /api/bookings/<id>/               → Status of a queued join (?wait= long-polls)
+- GET  /api/events/flights/              → Server-Sent Events change feed (flights.events)
+
+List and detail share the catalog cache and ETags of FlightViewSet. Lists are
+keyset-paginated on the primary key: `next` carries the `after_id` of the
+following page. Seat booking itself stays a short synchronous transaction
+(flights.booking) run in a worker thread.
+
+Authentication mirrors the API settings: a bearer JWT (also copied from the
+access cookie by JWTAuthFromCookieMiddleware) first, then the session, with
+CSRF enforced for session-authenticated writes.
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import ClaimsUser, verify_access_token
+from .booking import book_seat, booking_queue_enabled, enqueue_booking
+from .cache import (
+    CATALOG_CACHE_ALIAS, CATALOG_CACHE_TIMEOUT, aget_version, catalog_entry, catalog_stats,
+)
+from .db_router import primary_reads
+from .events import event_stream
+from .fastpath import flight_rows
+from .models import BookingRequest, BookingStatus, Flight, Passenger
+from .roles import is_manager_or_admin
+from .serializers import BookingRequestSerializer
+
+PAGE_SIZE = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+MAX_PAGE_SIZE = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 200)
+# longest ?wait= of the booking status long-poll, and how often it re-reads (seconds)
+MAX_BOOKING_WAIT = 30
+BOOKING_POLL_INTERVAL = 0.5
+MAX_EVENT_FLIGHTS = 100
+
+
+def _flights():
+    return Flight.objects.select_related('origin__city', 'destination__city')
+
+
+def _error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+# ───────────────────────────────────────────────
+# Authentication
+# ───────────────────────────────────────────────
+
+class AuthenticationFailed(Exception):
+    pass
+
+
+class _CSRFCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return reason
+
+
+async def authenticate(request, claims_user=False):
+    """
+    Return the user of `request`, or None when it carries no credentials.
+
+    With `claims_user=True` a valid JWT yields a ClaimsUser without any query.
+    Raises AuthenticationFailed for invalid tokens, inactive accounts and
+    session writes failing the CSRF check.
+    """
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if parts and parts[0] in jwt_settings.AUTH_HEADER_TYPES:
+        token = verify_access_token(parts[1]) if len(parts) == 2 else None
+        if token is None or jwt_settings.USER_ID_CLAIM not in token:
+            raise AuthenticationFailed('Given token not valid for any token type')
+        if claims_user:
+            return ClaimsUser(token)
+        user = await User.objects.filter(
+            pk=token[jwt_settings.USER_ID_CLAIM], is_active=True
+        ).afirst()
+        if user is None:
+            raise AuthenticationFailed('User not found')
+        return user
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        reason = _CSRFCheck(lambda request: None).process_view(request, None, (), {})
+        if reason:
+            raise AuthenticationFailed(f'CSRF Failed: {reason}')
+    return user
+
+
+async def _require_user(request, claims_user=False):
+    """Return (user, None) or (None, error response)."""
+    try:
+        user = await authenticate(request, claims_user=claims_user)
+    except AuthenticationFailed as exc:
+        return None, _error(str(exc), 401)
+    if user is None:
+        return None, _error('Authentication credentials were not provided.', 401)
+    return user, None
+
+
+# ───────────────────────────────────────────────
+# Helpers
+# ───────────────────────────────────────────────
+
+def _page_params(request):
+    """Return (after_id, page_size) from the query string, or raise ValueError."""
+    after_id = int(request.GET.get('after_id', 0))
+    page_size = int(request.GET.get('page_size', PAGE_SIZE))
+    if after_id < 0 or page_size < 1:
+        raise ValueError
+    return after_id, min(page_size, MAX_PAGE_SIZE)
+
+
+async def _keyset_page(request, queryset):
+    try:
+        after_id, page_size = _page_params(request)
+    except ValueError:
+        return _error('after_id and page_size must be positive integers.', 400)
+
+    flights = [
+        flight async for flight in
+        flight_rows(queryset.filter(pk__gt=after_id).order_by('pk')[:page_size + 1])
+    ]
+    next_url = None
+    if len(flights) > page_size:
+        flights = flights[:page_size]
+        query = request.GET.copy()
+        query['after_id'] = flights[-1]['id']
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return JsonResponse({'next': next_url, 'results': flights})
+
+
+async def _cached(request, build):
+    """Serve `build()`'s JSON response through the catalog cache with ETags."""
+    etag, key = catalog_entry(await aget_version('catalog'), request.get_full_path(), 'application/json')
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        catalog_stats.record('not_modified')
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    cache = caches[CATALOG_CACHE_ALIAS]
+    entry = await cache.aget(key)
+    if entry is not None:
+        catalog_stats.record('hits')
+        content, content_type = entry
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        catalog_stats.record('misses')
+        with primary_reads():
+            response = await build()
+        if response.status_code != 200:
+            return response
+        await cache.aset(key, (response.content, response['Content-Type']), CATALOG_CACHE_TIMEOUT)
+
+    response['ETag'] = etag
+    return response
+
+
+# ───────────────────────────────────────────────
+# Views
+# ───────────────────────────────────────────────
+
+@require_GET
+async def flight_list(request):
+    return await _cached(request, lambda: _keyset_page(request, _flights()))
+
+
+@require_GET
+async def flight_detail(request, pk):
+    async def build():
+        flight = await flight_rows(_flights().filter(pk=pk)).afirst()
+        if flight is None:
+            return _error('No Flight matches the given query.', 404)
+        return JsonResponse(flight)
+
+    return await _cached(request, build)
+
+
+@require_GET
+async def my_flights(request):
+    user, error = await _require_user(request, claims_user=True)
+    if error:
+        return error
+    passenger_id = await Passenger.objects.filter(user_id=user.pk).values_list('pk', flat=True).afirst()
+    if passenger_id is None:
+        return JsonResponse({'error': 'Passenger profile not found'}, status=404)
+    return await _keyset_page(request, _flights().filter(passengers=passenger_id))
+
+
+@csrf_exempt  # enforced in authenticate() for session users, as DRF does
+@require_POST
+async def flight_join(request, pk):
+    user, error = await _require_user(request)
+    if error:
+        return error
+    flight = await Flight.objects.filter(pk=pk).only('capacity', 'passenger_count').afirst()
+    if flight is None:
+        return _error('No Flight matches the given query.', 404)
+    passenger_id = await Passenger.objects.filter(user_id=user.pk).values_list('pk', flat=True).afirst()
+    if passenger_id is None:
+        return JsonResponse({'error': 'Passenger profile not found'}, status=404)
+
+    if booking_queue_enabled() and not flight.is_full:
+        data = BookingRequestSerializer(await sync_to_async(enqueue_booking)(pk, passenger_id)).data
+        response = JsonResponse({'message': 'Booking request queued', **data}, status=202)
+        response['Location'] = data['status_url']
+        return response
+
+    if booking_queue_enabled():
+        result = BookingStatus.FULL
+    else:
+        result = await sync_to_async(book_seat)(pk, passenger_id)
+    if result == BookingStatus.ALREADY_JOINED:
+        return JsonResponse({'error': 'Already joined this flight', 'status': result}, status=400)
+    if result == BookingStatus.FULL:
+        return JsonResponse({'error': 'Flight is full', 'status': result}, status=409)
+    return JsonResponse({'message': 'Successfully joined flight', 'status': result})
+
+
+@require_GET
+async def booking_status(request, pk):
+    """
+    Status of a queued booking request, for its passenger or a manager.
+
+    With ?wait=N (seconds, at most MAX_BOOKING_WAIT) the response is held
+    until the request has been processed or N seconds have passed.
+    """
+    user, error = await _require_user(request, claims_user=True)
+    if error:
+        return error
+    try:
+        wait = min(float(request.GET.get('wait', 0)), MAX_BOOKING_WAIT)
+    except ValueError:
+        return _error('wait must be a number of seconds.', 400)
+
+    booking = await BookingRequest.objects.filter(pk=pk).select_related('passenger').afirst()
+    if booking is None or (
+        booking.passenger.user_id != user.pk
+        and not await sync_to_async(is_manager_or_admin)(user, getattr(user, 'token', None))
+    ):
+        return _error('No BookingRequest matches the given query.', 404)
+
+    deadline = time.monotonic() + wait
+    while booking.status == BookingStatus.QUEUED and time.monotonic() < deadline:
+        await asyncio.sleep(BOOKING_POLL_INTERVAL)
+        booking.status, booking.processed_at = await BookingRequest.objects.filter(pk=pk).values_list(
+            'status', 'processed_at',
+        ).aget()
+    return JsonResponse(BookingRequestSerializer(booking).data)
+
+
+@require_GET
+async def flight_events(request):
+    """
+    Stream flight and passenger-count changes as Server-Sent Events.
+
+    Resumes after the `Last-Event-ID` header (or ?last_event_id=); ?flight=
+    (repeatable or comma-separated) subscribes to specific flights only.
+    Needs an ASGI server: under WSGI the stream would hold a worker thread.
+    """
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+        flight_ids = {
+            int(flight_id)
+            for value in request.GET.getlist('flight') for flight_id in value.split(',') if flight_id
+        }
+    except ValueError:
+        return _error('last_event_id and flight must be integers.', 400)
+    if len(flight_ids) > MAX_EVENT_FLIGHTS:
+        return _error(f'At most {MAX_EVENT_FLIGHTS} flights per stream.', 400)
+
+    response = StreamingHttpResponse(event_stream(last_event_id, flight_ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # keep reverse proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -2,51 +2,57 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.views.decorators.http import require_http_methods
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.utils.http import url_has_allowed_host_and_scheme
 from .models import Passenger
+from .serializers import CustomTokenObtainPairSerializer
+from .authentication import ACCESS_COOKIE, REFRESH_COOKIE, set_jwt_cookies, stateless_auth
 from django.contrib.auth.forms import UserCreationForm
 
 
 @require_http_methods(["GET", "POST"])
 def cookie_login_view(request):
-    """Render login form (GET) and on POST authenticate, create session and set JWT cookie."""
+    """Render login form (GET) and on POST authenticate, create session and set JWT cookies.
+
+    With FLIGHTS_STATELESS_AUTH no session is created: the JWT cookies are the login.
+    """
+    next_url = request.POST.get('next') or request.GET.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}, request.is_secure()):
+        next_url = None
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
             user = form.get_user()
-            login(request, user)
+            if not stateless_auth():
+                login(request, user)
             # create JWT
-            refresh = RefreshToken.for_user(user)
-            access = str(refresh.access_token)
-            resp = redirect('flight_list') if 'next' not in request.POST else redirect(request.POST.get('next'))
-            # Set httponly cookie for access token
-            resp.set_cookie(
-                'access_token',
-                access,
-                httponly=True,
-                samesite='Lax',
-            )
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
+            resp = redirect(next_url or 'flight_list')
+            # Set httponly cookies for access token (and refresh token, used by
+            # JWTAuthFromCookieMiddleware to renew the access token near expiry)
+            set_jwt_cookies(resp, refresh)
             return resp
     else:
         form = AuthenticationForm()
 
-    return render(request, 'flights/login.html', {'form': form})
+    return render(request, 'flights/login.html', {'form': form, 'next': next_url})
 
 
 def cookie_logout_view(request):
-    """Logout the user (session) and delete JWT cookie."""
-    logout(request)
+    """Logout the user (session) and delete JWT cookies."""
+    if not stateless_auth():
+        logout(request)
     resp = redirect('flight_list')
-    resp.delete_cookie('access_token')
+    resp.delete_cookie(ACCESS_COOKIE)
+    resp.delete_cookie(REFRESH_COOKIE)
     return resp
 
 
 @require_http_methods(["GET", "POST"])
 def register_view(request):
-    """Render registration form and create User + Passenger, then login and set JWT cookie."""
+    """Render registration form and create User + Passenger, then login and set JWT cookies."""
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
         if form.is_valid():
@@ -70,11 +76,11 @@ def register_view(request):
             )
 
             # login and set cookie
-            login(request, user)
-            refresh = RefreshToken.for_user(user)
-            access = str(refresh.access_token)
+            if not stateless_auth():
+                login(request, user)
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
             resp = redirect('flight_list')
-            resp.set_cookie('access_token', access, httponly=True, samesite='Lax')
+            set_jwt_cookies(resp, refresh)
             return resp
     else:
         form = UserCreationForm()
@@ -0,0 +1,167 @@
+"""
+JWT authentication with a verified-token cache.
+
+- `verified_tokens` is a bounded, TTL-aware LRU of already validated access
+  tokens keyed by the SHA-256 of the raw token. A token's signature and claims
+  are checked once; later requests carrying the same token reuse the result
+  until the token expires or is evicted.
+- `CachedJWTAuthentication` uses that cache and, for safe (read-only) requests
+  to views that opt in with `claims_user_safe_methods = True`, returns a
+  claims-backed `ClaimsUser` instead of fetching the User row.
+- `JWTAuthFromCookieMiddleware` (flights.middleware) uses the same cache to
+  decide whether the access cookie is close to expiry and must be renewed.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Passenger
+
+ACCESS_COOKIE = 'access_token'
+REFRESH_COOKIE = 'refresh_token'
+
+
+def stateless_auth():
+    """True when FLIGHTS_STATELESS_AUTH is on: the HTML views never use the session."""
+    return getattr(settings, 'FLIGHTS_STATELESS_AUTH', False)
+
+
+class VerifiedTokenCache:
+    """
+    Thread-safe LRU of validated tokens.
+
+    Each entry expires at the token's own `exp` claim (capped by
+    FLIGHTS_JWT_CACHE_TTL), so an expired token is never served from the cache.
+    """
+
+    def __init__(self, maxsize, max_ttl):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(raw_token):
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.sha256(raw_token).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        now = time.time()
+        expires_at = min(token.get('exp', now), now + self.max_ttl)
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._entries[key] = (token, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    maxsize=getattr(settings, 'FLIGHTS_JWT_CACHE_SIZE', 10_000),
+    max_ttl=getattr(settings, 'FLIGHTS_JWT_CACHE_TTL', 15 * 60),
+)
+
+
+def verify_access_token(raw_token):
+    """Return the validated AccessToken for `raw_token`, or None if it is invalid/expired."""
+    key = VerifiedTokenCache.key_for(raw_token)
+    token = verified_tokens.get(key)
+    if token is None:
+        try:
+            token = AccessToken(raw_token)
+        except TokenError:
+            return None
+        verified_tokens.set(key, token)
+    return token
+
+
+def set_jwt_cookies(response, refresh):
+    """Store the access token (and the refresh token it came from) in httponly cookies."""
+    response.set_cookie(ACCESS_COOKIE, str(refresh.access_token), httponly=True, samesite='Lax')
+    response.set_cookie(
+        REFRESH_COOKIE, str(refresh),
+        max_age=int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+        httponly=True, samesite='Lax',
+    )
+    return response
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight user built from token claims, without a database fetch.
+
+    Only the passenger profile is loaded, lazily, for views that need it.
+    """
+
+    @cached_property
+    def passenger_profile(self):
+        return Passenger.objects.get(user_id=self.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication backed by `verified_tokens`.
+
+    Views may set `claims_user_safe_methods = True` to receive a `ClaimsUser`
+    on GET/HEAD/OPTIONS. Such users are trusted for the lifetime of the access
+    token, so deactivating an account only takes effect on unsafe requests
+    (or once the token expires).
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if self._wants_claims_user(request):
+            if jwt_settings.USER_ID_CLAIM in validated_token:
+                return ClaimsUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        key = VerifiedTokenCache.key_for(raw_token)
+        token = verified_tokens.get(key)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.set(key, token)
+        return token
+
+    @staticmethod
+    def _wants_claims_user(request):
+        if request.method not in SAFE_METHODS:
+            return False
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        return bool(getattr(view, 'claims_user_safe_methods', False))
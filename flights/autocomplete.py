@@ -0,0 +1,127 @@
+"""
+Prefix autocomplete over airport names/codes and city names.
+
+`PlaceIndex` is a sorted array of (normalized key, rank, kind, id) entries:
+every airport contributes its code, its full name and each word of its name;
+every city its full name and each word. A lookup is a binary search for the
+first key >= the query followed by a short forward scan while keys still start
+with it, so it never touches the database or scans the full table.
+
+The array is rebuilt (two flat queries) in each process whenever the shared
+'places' version (flights.cache) has moved, i.e. after any Airport or City
+change or catalog import.
+"""
+
+import bisect
+import threading
+
+from django.db import transaction
+
+from .cache import bump_version, get_version
+from .db_router import primary_reads
+from .models import Airport, City
+
+AIRPORT = 'airport'
+CITY = 'city'
+
+# lower rank sorts first: exact code, then whole-name prefix, then word prefix
+RANK_CODE, RANK_NAME, RANK_WORD = 0, 1, 2
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+class PlaceIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.keys = []
+        self.entries = []
+        self.airports = {}   # id -> (code, name, city_id)
+        self.cities = {}     # id -> name
+
+    def rebuild(self):
+        version = get_version('places')
+        with primary_reads():
+            airports = {
+                pk: (code, name, city_id)
+                for pk, code, name, city_id in Airport.objects.values_list('pk', 'code', 'name', 'city_id').iterator()
+            }
+            cities = dict(City.objects.values_list('pk', 'name').iterator())
+
+        entries = []
+        for kind, places in ((AIRPORT, airports), (CITY, cities)):
+            for pk, place in places.items():
+                name = place[1] if kind == AIRPORT else place
+                if kind == AIRPORT:
+                    entries.append((normalize(place[0]), RANK_CODE, kind, pk))
+                full = normalize(name)
+                entries.append((full, RANK_NAME, kind, pk))
+                for word in full.split()[1:]:
+                    entries.append((word, RANK_WORD, kind, pk))
+        entries.sort()
+
+        with self._lock:
+            self.entries = entries
+            self.keys = [entry[0] for entry in entries]
+            self.airports, self.cities = airports, cities
+            self.version = version
+
+    def ensure_current(self):
+        if self.version is None or self.version != get_version('places'):
+            self.rebuild()
+
+    def search(self, query, limit=10, offset=0, kinds=(AIRPORT, CITY), scan_limit=2000):
+        """
+        Return ([(kind, id), ...], has_more) for places matching `query` as a prefix.
+
+        At most `scan_limit` index entries are examined, which bounds the cost
+        of very short queries.
+        """
+        query = normalize(query)
+        if not query:
+            return [], False
+
+        keys, entries = self.keys, self.entries
+        start = bisect.bisect_left(keys, query)
+        candidates = {}
+        for position in range(start, min(start + scan_limit, len(keys))):
+            key, rank, kind, pk = entries[position]
+            if not key.startswith(query):
+                break
+            if kind not in kinds:
+                continue
+            if rank == RANK_CODE and key != query:
+                rank = RANK_NAME
+            current = candidates.get((kind, pk))
+            if current is None or rank < current:
+                candidates[(kind, pk)] = rank
+
+        ranked = sorted(candidates, key=lambda place: (candidates[place], self._label(*place)))
+        page = ranked[offset:offset + limit]
+        return page, len(ranked) > offset + limit
+
+    def _label(self, kind, pk):
+        return self.airports[pk][1] if kind == AIRPORT else self.cities[pk]
+
+    def describe(self, kind, pk):
+        if kind == AIRPORT:
+            code, name, city_id = self.airports[pk]
+            return {
+                'type': AIRPORT, 'id': pk, 'code': code, 'name': name,
+                'city': {'id': city_id, 'name': self.cities.get(city_id)},
+            }
+        return {'type': CITY, 'id': pk, 'name': self.cities[pk]}
+
+
+place_index = PlaceIndex()
+
+
+def get_place_index():
+    place_index.ensure_current()
+    return place_index
+
+
+def places_changed():
+    transaction.on_commit(lambda: bump_version('places'))
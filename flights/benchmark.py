@@ -0,0 +1,269 @@
+"""
+Endpoint benchmarks with stored query budgets and timing baselines.
+
+Each `Scenario` requests one endpoint through the Django test client as a
+given kind of user, counting SQL queries and measuring wall-clock latency.
+`run_scenarios` reports, per scenario, the steady-state query count (the
+maximum seen after the warm-up requests) and p50/p95/p99 latencies.
+
+Budgets live in flights/benchmarks.json:
+
+    {"api_flight_list": {"queries": 2, "p95_ms": 35.0}, ...}
+
+`check_budgets` fails a scenario whose query count exceeds its budget (a
+regression such as a reintroduced N+1) or whose p95 exceeds the timing
+baseline by more than `tolerance`. Query budgets are data-independent, so the
+test suite enforces them on a tiny dataset; timing baselines depend on the
+machine and data size and are only checked by the `benchmark` command.
+
+`check_query_plans` EXPLAINs the filtered flight-search queries (see
+flights.filters) and reports any that would scan the whole flights table
+instead of using an index. On PostgreSQL sequential scans are disabled for
+the EXPLAIN, so the check asks whether a usable index exists rather than
+depending on table statistics.
+"""
+
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from .authentication import ACCESS_COOKIE, stateless_auth
+from .cache import bump_version
+from .filters import FlightSearchFilter
+from .models import Flight, Passenger
+from .roles import FLIGHT_MANAGERS
+from .serializers import CustomTokenObtainPairSerializer
+from .views import FlightViewSet
+
+BUDGETS_PATH = Path(__file__).with_name('benchmarks.json')
+
+ANONYMOUS, PASSENGER, MANAGER, ADMIN = 'anonymous', 'passenger', 'manager', 'admin'
+
+
+class Scenario:
+    """
+    A GET request to `path` (formatted with the BenchmarkContext attributes).
+
+    With `cold=True` the catalog version is bumped before every request, so
+    cached endpoints are measured on a cache miss.
+    """
+
+    def __init__(self, name, path, user=ANONYMOUS, cold=False):
+        self.name = name
+        self.path = path
+        self.user = user
+        self.cold = cold
+
+
+SCENARIOS = [
+    Scenario('api_flight_list', '/api/flights/', cold=True),
+    Scenario('api_flight_list_cached', '/api/flights/'),
+    Scenario('api_flight_search', '/api/flights/?origin_city={origin_city}&min_distance=500', cold=True),
+    Scenario('api_flight_detail', '/api/flights/{busy_flight}/', cold=True),
+    Scenario('api_my_flights', '/api/flights/my_flights/', user=PASSENGER),
+    Scenario('api_passengers', '/api/flights/{busy_flight}/passengers/', user=MANAGER),
+    Scenario('api_manifest', '/api/flights/{busy_flight}/manifest/', user=MANAGER),
+    Scenario('api_routes', '/api/routes/?origin={origin}&destination={destination}'),
+    Scenario('api_autocomplete', '/api/autocomplete/?q={place_prefix}'),
+    Scenario('api_stats_routes', '/api/stats/routes/?ordering=-load_factor', user=MANAGER),
+    Scenario('api_stats_cities', '/api/stats/cities/', user=MANAGER),
+    Scenario('async_flight_list', '/api/async/flights/', cold=True),
+    Scenario('async_my_flights', '/api/async/flights/my_flights/', user=PASSENGER),
+    Scenario('html_flight_list', '/'),
+    # rows recomposed from the cached per-flight fragments (flights.fragments)
+    Scenario('html_flight_list_recomposed', '/', cold=True),
+    Scenario('html_flight_detail', '/flights/{busy_flight}/', user=PASSENGER),
+    Scenario('html_my_flights', '/my_flights/', user=PASSENGER),
+    Scenario('html_flight_passengers', '/flights/{busy_flight}/passengers/', user=MANAGER),
+    Scenario('admin_flight_changelist', '/admin/flights/flight/', user=ADMIN),
+    Scenario('admin_passenger_changelist', '/admin/flights/passenger/', user=ADMIN),
+]
+
+
+class BenchmarkContext:
+    """Users and sample objects the scenarios run against."""
+
+    def __init__(self, prefix='bench'):
+        flight = Flight.objects.order_by('-passenger_count', 'pk').first()
+        if flight is None:
+            raise ValueError('No flights to benchmark; run generate_dataset first.')
+        self.busy_flight = flight.pk
+        self.origin = flight.origin_id
+        self.origin_code = flight.origin.code
+        self.origin_city = flight.origin.city_id
+        self.destination = flight.destination_id
+        self.place_prefix = flight.origin.city.name[:2]
+        self.name_prefix = flight.name[:3]
+
+        passenger = (
+            Passenger.objects.filter(flights__isnull=False)
+            .select_related('user').order_by('pk').first()
+        )
+        if passenger is None:
+            raise ValueError('No bookings to benchmark; run generate_dataset first.')
+
+        manager, _ = User.objects.get_or_create(username=f'{prefix}-manager')
+        manager.groups.add(Group.objects.get_or_create(name=FLIGHT_MANAGERS)[0])
+        admin, _ = User.objects.get_or_create(
+            username=f'{prefix}-admin', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        self.users = {PASSENGER: passenger.user, MANAGER: manager, ADMIN: admin}
+
+    def client_for(self, user):
+        client = Client()
+        if user == ANONYMOUS:
+            pass
+        elif stateless_auth():
+            refresh = CustomTokenObtainPairSerializer.get_token(self.users[user])
+            client.cookies[ACCESS_COOKIE] = str(refresh.access_token)
+        else:
+            client.force_login(self.users[user])
+        return client
+
+    def path_for(self, scenario):
+        return scenario.path.format(**vars(self))
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+def run_scenario(context, scenario, iterations=20, warmup=2):
+    client = context.client_for(scenario.user)
+    path = context.path_for(scenario)
+    timings, queries = [], 0
+    for i in range(warmup + iterations):
+        if scenario.cold:
+            bump_version('catalog')
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise AssertionError(f'{scenario.name}: GET {path} returned {response.status_code}')
+        if i >= warmup:
+            timings.append(elapsed)
+            queries = max(queries, len(captured))
+    return {
+        'queries': queries,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'p99_ms': round(_percentile(timings, 99), 2),
+    }
+
+
+def run_scenarios(context, names=None, iterations=20, warmup=2):
+    return {
+        scenario.name: run_scenario(context, scenario, iterations, warmup)
+        for scenario in SCENARIOS
+        if names is None or scenario.name in names
+    }
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def save_budgets(budgets, path=BUDGETS_PATH):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(budgets, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
+
+def check_budgets(results, budgets, tolerance=1.5, check_timing=True):
+    """Return a list of human-readable regressions (empty when everything is within budget)."""
+    failures = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            failures.append(f'{name}: no budget recorded')
+            continue
+        if result['queries'] > budget['queries']:
+            failures.append(f'{name}: {result["queries"]} queries, budget is {budget["queries"]}')
+        if check_timing and result['p95_ms'] > budget['p95_ms'] * tolerance:
+            failures.append(
+                f'{name}: p95 {result["p95_ms"]:.1f} ms, baseline {budget["p95_ms"]:.1f} ms (x{tolerance})'
+            )
+    return failures
+
+
+# ───────────────────────────────────────────────
+# Query plans
+# ───────────────────────────────────────────────
+
+class PlanCheck:
+    """
+    The flight-list query for `query` must not scan flights_flight in full.
+
+    `index` optionally names the index the plan has to mention; `vendors`
+    limits the check to database backends able to use an index for it
+    (SQLite cannot serve LIKE 'prefix%' from an index).
+    """
+
+    def __init__(self, name, query, index=None, vendors=None):
+        self.name = name
+        self.query = query
+        self.index = index
+        self.vendors = vendors
+
+
+PLAN_CHECKS = [
+    PlanCheck('route', 'origin={origin}&destination={destination}'),
+    PlanCheck('origin_code', 'origin={origin_code}'),
+    PlanCheck('destination', 'destination={destination}'),
+    PlanCheck('origin_city', 'origin_city={origin_city}', index='flight_route_idx'),
+    PlanCheck('distance_range', 'min_distance=500&max_distance=900', index='flight_distance_idx'),
+    PlanCheck('name_prefix', 'name={name_prefix}', index='flight_name_prefix_idx', vendors=('postgresql',)),
+]
+
+_FULL_SCANS = {
+    'postgresql': 'Seq Scan on flights_flight',
+    'sqlite': 'SCAN flights_flight',
+}
+
+
+def flight_search_queryset(query):
+    """The queryset FlightViewSet.list pages through for `?query`."""
+    view = FlightViewSet(action='list')
+    request = Request(RequestFactory().get(f'/api/flights/?{query}'))
+    queryset = FlightSearchFilter().filter_queryset(request, FlightViewSet.queryset.all(), view)
+    return queryset.order_by('id')[:view.paginator.get_page_size(request) + 1]
+
+
+def query_plan(queryset):
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def check_query_plans(context):
+    """Return a list of plan problems (empty when every search is index-backed)."""
+    failures = []
+    for check in PLAN_CHECKS:
+        if check.vendors and connection.vendor not in check.vendors:
+            continue
+        plan = query_plan(flight_search_queryset(check.query.format(**vars(context))))
+        full_scan = _FULL_SCANS.get(connection.vendor)
+        # "SCAN flights_flight USING INDEX ..." is an index walk, not a table scan
+        scans = [
+            line for line in plan.splitlines()
+            if full_scan and full_scan in line and 'INDEX' not in line
+        ]
+        if scans:
+            failures.append(f'{check.name}: full table scan\n{plan}')
+        elif check.index and check.index not in plan:
+            failures.append(f'{check.name}: {check.index} not used\n{plan}')
+    return failures
@@ -0,0 +1,228 @@
+"""
+Seat booking service.
+
+`book_seat` is the single write path used by both the API (`FlightViewSet.join`)
+and the HTML view (`flight_join_view`). It avoids the check-then-insert race of
+`passengers.filter(...).exists()` + `passengers.add(...)`:
+
+1. The through-table row is inserted first. The (flight_id, passenger_id)
+   unique constraint of the M2M table turns a duplicate join into an
+   IntegrityError, even when two requests race.
+2. The seat is then claimed with one conditional UPDATE::
+
+       UPDATE flight SET passenger_count = passenger_count + 1
+       WHERE id = %s AND (capacity IS NULL OR passenger_count < capacity)
+
+   The row lock taken by this UPDATE is held only until commit, so concurrent
+   joins on the same flight serialize on two short statements instead of a
+   SELECT ... FOR UPDATE around the whole request.
+
+If no row was updated the flight is full and the insert is rolled back.
+
+`bulk_book` / `bulk_cancel` apply many (flight, passenger) pairs at once with
+set-based lookups, one batched INSERT/DELETE on the through table and one
+count UPDATE per distinct delta. The involved flight rows are locked
+(in id order) for the duration, so the capacity arithmetic cannot race with
+`book_seat` or another bulk call.
+
+Queued mode (FLIGHTS_BOOKING_QUEUE): when a popular flight opens, many
+synchronous joins fight over the same Flight row. In this mode the join
+endpoints only insert a BookingRequest (`enqueue_booking`) and answer 202;
+the `process_bookings` worker drains the queue in id order with
+`process_booking_queue`, booking each batch through `bulk_book` (one locked
+pass per batch instead of one transaction per click) and storing every
+request's outcome in the same transaction. Clients poll the request's status
+(GET /api/bookings/<id>/, optionally long-polling with ?wait=).
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BookingRequest, BookingStatus, Flight, Passenger
+from .signals import FlightPassengers, apply_passenger_deltas, passengers_changed
+
+
+class _FlightFull(Exception):
+    pass
+
+
+def book_seat(flight_id, passenger_id):
+    """
+    Atomically add a passenger to a flight, respecting Flight.capacity.
+
+    Returns:
+        BookingStatus: BOOKED, ALREADY_JOINED or FULL.
+    """
+    has_room = Q(capacity__isnull=True) | Q(passenger_count__lt=F('capacity'))
+    try:
+        with transaction.atomic():
+            FlightPassengers.objects.create(flight_id=flight_id, passenger_id=passenger_id)
+            seated = (
+                Flight.objects.filter(pk=flight_id)
+                .filter(has_room)
+                .update(passenger_count=F('passenger_count') + 1)
+            )
+            if not seated:
+                raise _FlightFull
+            passengers_changed.send(sender=Flight, deltas={flight_id: 1})
+    except _FlightFull:
+        return BookingStatus.FULL
+    except IntegrityError:
+        if not FlightPassengers.objects.filter(flight_id=flight_id, passenger_id=passenger_id).exists():
+            raise
+        return BookingStatus.ALREADY_JOINED
+    return BookingStatus.BOOKED
+
+
+def _lock_flights(flight_ids):
+    return {
+        flight.pk: flight
+        for flight in Flight.objects.select_for_update()
+        .filter(pk__in=flight_ids)
+        .order_by('pk')
+        .only('id', 'capacity', 'passenger_count')
+    }
+
+
+def _existing_pairs(pairs):
+    flight_ids = {flight_id for flight_id, _ in pairs}
+    passenger_ids = {passenger_id for _, passenger_id in pairs}
+    return set(
+        FlightPassengers.objects.filter(flight_id__in=flight_ids, passenger_id__in=passenger_ids)
+        .values_list('flight_id', 'passenger_id')
+    )
+
+
+def bulk_book(pairs):
+    """
+    Book many (flight_id, passenger_id) pairs in one transaction.
+
+    Pairs are processed in order, so when a flight runs out of seats the
+    earliest requests win. Returns one BookingStatus per input pair:
+    BOOKED, ALREADY_JOINED (also for a pair repeated in the input), FULL or
+    NOT_FOUND.
+    """
+    pairs = [(int(flight_id), int(passenger_id)) for flight_id, passenger_id in pairs]
+    results = []
+    with transaction.atomic():
+        flights = _lock_flights({flight_id for flight_id, _ in pairs})
+        known_passengers = set(
+            Passenger.objects.filter(pk__in={passenger_id for _, passenger_id in pairs})
+            .values_list('pk', flat=True)
+        )
+        taken = _existing_pairs(pairs)
+        seats_left = {
+            flight.pk: None if flight.capacity is None else max(flight.capacity - flight.passenger_count, 0)
+            for flight in flights.values()
+        }
+
+        new_rows = []
+        for flight_id, passenger_id in pairs:
+            if flight_id not in flights or passenger_id not in known_passengers:
+                results.append(BookingStatus.NOT_FOUND)
+            elif (flight_id, passenger_id) in taken:
+                results.append(BookingStatus.ALREADY_JOINED)
+            elif seats_left[flight_id] == 0:
+                results.append(BookingStatus.FULL)
+            else:
+                if seats_left[flight_id] is not None:
+                    seats_left[flight_id] -= 1
+                taken.add((flight_id, passenger_id))
+                new_rows.append(FlightPassengers(flight_id=flight_id, passenger_id=passenger_id))
+                results.append(BookingStatus.BOOKED)
+
+        FlightPassengers.objects.bulk_create(new_rows)
+        apply_passenger_deltas(Counter(row.flight_id for row in new_rows))
+    return results
+
+
+def bulk_cancel(pairs):
+    """
+    Remove many (flight_id, passenger_id) pairs in one transaction.
+
+    Returns one BookingStatus per input pair: CANCELLED, NOT_JOINED or NOT_FOUND.
+    """
+    pairs = [(int(flight_id), int(passenger_id)) for flight_id, passenger_id in pairs]
+    results = []
+    with transaction.atomic():
+        flights = _lock_flights({flight_id for flight_id, _ in pairs})
+        booked = _existing_pairs(pairs)
+
+        by_flight = {}
+        for flight_id, passenger_id in pairs:
+            if flight_id not in flights:
+                results.append(BookingStatus.NOT_FOUND)
+            elif (flight_id, passenger_id) in booked:
+                booked.discard((flight_id, passenger_id))
+                by_flight.setdefault(flight_id, []).append(passenger_id)
+                results.append(BookingStatus.CANCELLED)
+            else:
+                results.append(BookingStatus.NOT_JOINED)
+
+        if by_flight:
+            match = Q()
+            for flight_id, passenger_ids in by_flight.items():
+                match |= Q(flight_id=flight_id, passenger_id__in=passenger_ids)
+            FlightPassengers.objects.filter(match).delete()
+            apply_passenger_deltas({
+                flight_id: -len(passenger_ids) for flight_id, passenger_ids in by_flight.items()
+            })
+    return results
+
+
+# ───────────────────────────────────────────────
+# Queued booking mode
+# ───────────────────────────────────────────────
+
+def booking_queue_enabled():
+    return getattr(settings, 'FLIGHTS_BOOKING_QUEUE', False)
+
+
+def enqueue_booking(flight_id, passenger_id):
+    """Queue a join and return its BookingRequest (the pending one if already queued)."""
+    try:
+        with transaction.atomic():
+            return BookingRequest.objects.create(flight_id=flight_id, passenger_id=passenger_id)
+    except IntegrityError:
+        pending = BookingRequest.objects.filter(
+            flight_id=flight_id, passenger_id=passenger_id, status=BookingStatus.QUEUED,
+        ).first()
+        if pending is None:
+            raise
+        return pending
+
+
+def process_booking_queue(batch_size=500):
+    """
+    Book the oldest `batch_size` queued requests in one transaction.
+
+    Returns a Counter of the resulting statuses (empty when the queue is empty).
+    Concurrent workers skip each other's rows on databases with SKIP LOCKED.
+    """
+    with transaction.atomic():
+        batch = list(
+            BookingRequest.objects.select_for_update(skip_locked=True)
+            .filter(status=BookingStatus.QUEUED)
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return Counter()
+        statuses = bulk_book([(request.flight_id, request.passenger_id) for request in batch])
+        now = timezone.now()
+        for request, result in zip(batch, statuses):
+            request.status, request.processed_at = result, now
+        BookingRequest.objects.bulk_update(batch, ['status', 'processed_at'])
+    return Counter(statuses)
+
+
+def purge_booking_requests(older_than=timedelta(days=1)):
+    """Delete processed requests older than `older_than`; returns the number deleted."""
+    deleted, _ = BookingRequest.objects.filter(
+        processed_at__lt=timezone.now() - older_than,
+    ).exclude(status=BookingStatus.QUEUED).delete()
+    return deleted
@@ -0,0 +1,218 @@
+"""
+Versioned response cache for the public flight catalog.
+
+Cached entries are keyed on a *catalog version*: a counter kept in the
+catalog cache backend that is bumped (after commit) whenever a Flight,
+Airport, City or passenger membership changes. Bumping the version makes every
+older entry unreachable, so nothing has to be deleted explicitly; stale
+entries simply age out through the backend's eviction (LocMemCache evicts in
+LRU order once MAX_ENTRIES is reached).
+
+The backend is the Django cache alias named by FLIGHTS_CATALOG_CACHE
+(default: 'catalog'), so switching between local-memory and file-based storage
+is a settings change. Use a file-based (or otherwise shared) backend when
+running several worker processes, otherwise each process keeps its own
+version counter and only sees its own invalidations.
+
+ETags are derived from (catalog version, request key) rather than from the
+response body, so a conditional GET can be answered with 304 before the
+viewset touches the ORM or the serializer.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from .db_router import primary_reads
+
+CATALOG_CACHE_ALIAS = getattr(settings, 'FLIGHTS_CATALOG_CACHE', 'catalog')
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'FLIGHTS_CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def _cache():
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+# ───────────────────────────────────────────────
+# Versions
+# ───────────────────────────────────────────────
+
+def _version_key(namespace):
+    return f'flights:version:{namespace}'
+
+
+def _seed():
+    # Seeding from the clock keeps versions monotonic even if the counter
+    # itself is evicted and has to be recreated.
+    return time.time_ns() // 1000
+
+
+def get_version(namespace='catalog'):
+    """Return the current version number of `namespace`."""
+    cache = _cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(namespace='catalog'):
+    """Async counterpart of `get_version`, for views running on the event loop."""
+    cache = _cache()
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _seed(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def get_versions(namespaces):
+    """Return {namespace: version} for several namespaces in one cache round trip."""
+    cache = _cache()
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _seed(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_version(namespace='catalog'):
+    """Increment the version of `namespace`, invalidating everything keyed on it."""
+    cache = _cache()
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _seed(), timeout=None)
+        return cache.get(key)
+
+
+def invalidate_catalog(flight_ids=None):
+    """
+    Bump the catalog version once the current transaction commits.
+
+    Also bumps the versions of the flights in `flight_ids` (used by the HTML
+    fragments of flights.fragments), or, when they are not known, the
+    `flights` generation shared by every flight.
+    """
+    def bump():
+        # catalog last: a list recomposed in between would otherwise reuse the
+        # old row fragments and be cached under the new catalog version
+        if flight_ids is None:
+            bump_version('flights')
+        else:
+            for flight_id in flight_ids:
+                bump_version(f'flight:{flight_id}')
+        bump_version('catalog')
+
+    transaction.on_commit(bump)
+
+
+# ───────────────────────────────────────────────
+# Hit / miss counters
+# ───────────────────────────────────────────────
+
+class CacheStats:
+    """Per-process counters used to size the catalog cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.not_modified = 0
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+catalog_stats = CacheStats()
+
+
+# ───────────────────────────────────────────────
+# ViewSet integration
+# ───────────────────────────────────────────────
+
+def catalog_entry(version, full_path, media_type):
+    """Return the (ETag, cache key) pair of a catalog response."""
+    digest = hashlib.sha1(f'{full_path}|{media_type}'.encode()).hexdigest()
+    return f'"{version}-{digest[:20]}"', f'flights:response:{version}:{digest}'
+
+
+class CatalogCacheMixin:
+    """
+    Serve `list` / `retrieve` of a public, user-independent viewset from the
+    catalog cache, with strong ETags and 304 handling.
+
+    Only JSON renderings of 200 responses are cached; the browsable API and
+    error responses always go through the normal code path.
+    """
+    cache_renderer_formats = ('json',)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None or renderer.format not in self.cache_renderer_formats:
+            return handler(request, *args, **kwargs)
+
+        etag, key = catalog_entry(
+            get_version('catalog'), request.get_full_path(), request.accepted_media_type
+        )
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            catalog_stats.record('not_modified')
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        cache = _cache()
+        entry = cache.get(key)
+        if entry is not None:
+            catalog_stats.record('hits')
+            content, content_type = entry
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            catalog_stats.record('misses')
+            with primary_reads():
+                response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(key, (response.content, response['Content-Type']), CATALOG_CACHE_TIMEOUT)
+
+        response['ETag'] = etag
+        return response
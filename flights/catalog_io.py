@@ -0,0 +1,286 @@
+"""
+Streaming CSV / NDJSON import and export of the flight catalog.
+
+Used by the `import_catalog` and `export_catalog` management commands.
+
+Records are read and written one at a time, so memory stays bounded by the
+chunk size rather than the file size:
+
+- imports resolve natural keys (city name, airport code, and for flights the
+  (name, origin code, destination code) triple) to primary keys through
+  in-memory maps and upsert each chunk with `bulk_create` / `bulk_update`
+  inside its own transaction;
+- exports read rows with `values_list(...).iterator()`, which uses a
+  server-side cursor on PostgreSQL.
+
+Column layout (identical for import and export):
+
+    cities:   name
+    airports: code, name, city
+    flights:  name, origin, destination, distance_km, capacity
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from .cache import invalidate_catalog
+from .models import Airport, City, Flight
+from .stats import rebuild_stats
+from . import autocomplete, events, routes
+
+COLUMNS = {
+    'cities': ['name'],
+    'airports': ['code', 'name', 'city'],
+    'flights': ['name', 'origin', 'destination', 'distance_km', 'capacity'],
+}
+
+FORMATS = ('csv', 'ndjson')
+
+
+class RowError(ValueError):
+    pass
+
+
+# ───────────────────────────────────────────────
+# Readers / writers
+# ───────────────────────────────────────────────
+
+def read_records(stream, fmt):
+    """
+    Yield (line_number, dict) pairs from a CSV or NDJSON text stream.
+
+    An NDJSON line that is not a JSON object is yielded with a RowError in
+    place of the dict, so it is reported like any other bad row (`checked`).
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                record = RowError(f'invalid JSON: {exc}')
+            else:
+                if not isinstance(record, dict):
+                    record = RowError(f'expected a JSON object, got {type(record).__name__}')
+            yield line_number, record
+
+
+def checked(record):
+    """Return a record of `read_records`, raising the RowError of an unreadable line."""
+    if isinstance(record, RowError):
+        raise record
+    return record
+
+
+class RecordWriter:
+    def __init__(self, stream, fmt, columns):
+        self.stream = stream
+        self.fmt = fmt
+        self.columns = columns
+        if fmt == 'csv':
+            self._csv = csv.writer(stream)
+            self._csv.writerow(columns)
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self._csv.writerow(['' if value is None else value for value in row])
+        else:
+            self.stream.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False))
+            self.stream.write('\n')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ───────────────────────────────────────────────
+# Field parsing
+# ───────────────────────────────────────────────
+
+# largest PositiveIntegerField value accepted by every supported database
+MAX_INTEGER = 2 ** 31 - 1
+
+
+def max_length(model, field):
+    return model._meta.get_field(field).max_length
+
+
+def text_field(record, column, required=True, limit=None):
+    """
+    Return the stripped text of `column`; `limit` is the max_length of the
+    model field it is stored in. Over-long values are row errors here rather
+    than a DataError that would abort the whole import on PostgreSQL.
+    """
+    value = record.get(column)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'missing "{column}"')
+    if limit is not None and len(value) > limit:
+        raise RowError(f'"{column}" is longer than {limit} characters')
+    return value
+
+
+def _int(record, column, required=True):
+    value = text_field(record, column, required)
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f'"{column}" must be an integer, got {value!r}')
+    if number < 0:
+        raise RowError(f'"{column}" must not be negative')
+    if number > MAX_INTEGER:
+        raise RowError(f'"{column}" must not be greater than {MAX_INTEGER}')
+    return number
+
+
+# ───────────────────────────────────────────────
+# Importers
+# ───────────────────────────────────────────────
+
+class CatalogImporter:
+    """
+    Upsert catalog records chunk by chunk.
+
+    `import_chunk` returns (created, updated) and records per-row problems in
+    `errors` as (line_number, message) without aborting the import.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.errors = []
+        self.city_ids = {}
+        self.airport_ids = {}
+        if kind in ('cities', 'airports'):
+            # duplicate names keep the first (lowest id) city
+            for name, pk in City.objects.order_by('-pk').values_list('name', 'pk'):
+                self.city_ids[name] = pk
+        if kind == 'flights':
+            self.airport_ids = dict(Airport.objects.values_list('code', 'pk'))
+
+    def import_chunk(self, chunk):
+        handler = getattr(self, f'_import_{self.kind}')
+        with transaction.atomic():
+            return handler(chunk)
+
+    def finish(self):
+        # bulk_create/bulk_update send no model signals
+        invalidate_catalog()
+        events.catalog_reloaded()
+        if self.kind != 'cities':
+            rebuild_stats()
+        routes.places_changed()
+        if self.kind != 'flights':
+            autocomplete.places_changed()
+
+    def _parse(self, chunk, parse):
+        rows = []
+        for line_number, record in chunk:
+            try:
+                rows.append(parse(checked(record)))
+            except RowError as exc:
+                self.errors.append((line_number, str(exc)))
+        return rows
+
+    def _ensure_cities(self, names):
+        missing = sorted({name for name in names if name not in self.city_ids})
+        for city in City.objects.bulk_create([City(name=name) for name in missing]):
+            self.city_ids[city.name] = city.pk
+        return len(missing)
+
+    def _import_cities(self, chunk):
+        names = self._parse(chunk, lambda record: text_field(record, 'name', limit=max_length(City, 'name')))
+        return self._ensure_cities(names), 0
+
+    def _import_airports(self, chunk):
+        rows = {}
+        for code, name, city in self._parse(chunk, lambda record: (
+            text_field(record, 'code', limit=max_length(Airport, 'code')),
+            text_field(record, 'name', limit=max_length(Airport, 'name')),
+            text_field(record, 'city', limit=max_length(City, 'name')),
+        )):
+            rows[code] = (name, city)  # last occurrence of a code wins
+        self._ensure_cities(city for _, city in rows.values())
+
+        existing = {airport.code: airport for airport in Airport.objects.filter(code__in=rows)}
+        to_create, to_update = [], []
+        for code, (name, city) in rows.items():
+            city_id = self.city_ids[city]
+            airport = existing.get(code)
+            if airport is None:
+                to_create.append(Airport(code=code, name=name, city_id=city_id))
+            elif (airport.name, airport.city_id) != (name, city_id):
+                airport.name, airport.city_id = name, city_id
+                to_update.append(airport)
+        Airport.objects.bulk_create(to_create)
+        Airport.objects.bulk_update(to_update, ['name', 'city'])
+        return len(to_create), len(to_update)
+
+    def _parse_flight(self, record):
+        origin, destination = text_field(record, 'origin'), text_field(record, 'destination')
+        for code in (origin, destination):
+            if code not in self.airport_ids:
+                raise RowError(f'unknown airport code {code!r}')
+        return (
+            text_field(record, 'name', limit=max_length(Flight, 'name')),
+            self.airport_ids[origin], self.airport_ids[destination],
+            _int(record, 'distance_km'), _int(record, 'capacity', required=False),
+        )
+
+    def _import_flights(self, chunk):
+        rows = {}
+        for name, origin_id, destination_id, distance_km, capacity in self._parse(chunk, self._parse_flight):
+            rows[(name, origin_id, destination_id)] = (distance_km, capacity)
+
+        existing = {}
+        candidates = Flight.objects.filter(
+            name__in={key[0] for key in rows},
+            origin_id__in={key[1] for key in rows},
+        ).only('id', 'name', 'origin_id', 'destination_id', 'distance_km', 'capacity')
+        for flight in candidates:
+            existing.setdefault((flight.name, flight.origin_id, flight.destination_id), flight)
+
+        to_create, to_update = [], []
+        for key, (distance_km, capacity) in rows.items():
+            flight = existing.get(key)
+            if flight is None:
+                name, origin_id, destination_id = key
+                to_create.append(Flight(
+                    name=name, origin_id=origin_id, destination_id=destination_id,
+                    distance_km=distance_km, capacity=capacity,
+                ))
+            elif (flight.distance_km, flight.capacity) != (distance_km, capacity):
+                flight.distance_km, flight.capacity = distance_km, capacity
+                to_update.append(flight)
+        Flight.objects.bulk_create(to_create)
+        Flight.objects.bulk_update(to_update, ['distance_km', 'capacity'])
+        return len(to_create), len(to_update)
+
+
+# ───────────────────────────────────────────────
+# Exporters
+# ───────────────────────────────────────────────
+
+EXPORT_QUERIES = {
+    'cities': lambda: City.objects.order_by('pk').values_list('name'),
+    'airports': lambda: Airport.objects.order_by('pk').values_list('code', 'name', 'city__name'),
+    'flights': lambda: Flight.objects.order_by('pk').values_list(
+        'name', 'origin__code', 'destination__code', 'distance_km', 'capacity',
+    ),
+}
+
+
+def export_rows(kind, chunk_size):
+    return EXPORT_QUERIES[kind]().iterator(chunk_size=chunk_size)
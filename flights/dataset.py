@@ -0,0 +1,148 @@
+"""
+Synthetic catalog and booking data for benchmarks and load tests.
+
+`generate_dataset` creates cities, airports, flights, users with passenger
+profiles and bookings at the requested scale with bulk inserts, then rebuilds
+the stored passenger counts once. Flight popularity is skewed (a few hot
+flights, a long tail) and flights with a capacity are never overbooked, so the
+data looks like what the endpoints see in production.
+
+Everything generated is tagged with `prefix` (city names end with " (<prefix>)",
+airport codes and usernames start with it), so `delete_dataset` can remove a
+previous run without touching real data.
+"""
+
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import autocomplete, events, routes
+from .cache import invalidate_catalog
+from .models import Airport, City, Flight, Passenger
+from .stats import rebuild_stats
+
+SYLLABLES = [
+    'ka', 'ra', 'ban', 'dor', 'she', 'mir', 'za', 'lan', 'teh', 'sa',
+    'van', 'gol', 'ab', 'har', 'nesh', 'ta', 'bar', 'kes', 'yaz', 'do',
+]
+
+
+def _name(rng, parts=(2, 3)):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(*parts))).title()
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def generate_dataset(cities=20, airports=60, flights=500, passengers=2000,
+                     bookings_per_passenger=3.0, seed=0, prefix='bench',
+                     password='bench-password', batch_size=1000):
+    """
+    Create a synthetic dataset and return the number of rows created per kind.
+
+    `bookings_per_passenger` is the average number of flights each passenger
+    joins; individual passengers join between 0 and twice that many.
+    """
+    rng = random.Random(seed)
+    code_prefix = prefix.upper()
+    bulk = {'batch_size': batch_size}
+
+    with transaction.atomic():
+        city_objs = City.objects.bulk_create(
+            [City(name=f'{_name(rng)} ({prefix})') for _ in range(cities)], **bulk
+        )
+        airport_objs = Airport.objects.bulk_create([
+            Airport(
+                name=f'{_name(rng)} International',
+                code=f'{code_prefix}{i}'[:10],
+                # every city gets an airport before any city gets a second one
+                city=city_objs[i] if i < len(city_objs) else rng.choice(city_objs),
+            )
+            for i in range(airports)
+        ], **bulk)
+
+        flight_objs = []
+        for i in range(flights):
+            origin, destination = rng.sample(airport_objs, 2)
+            flight_objs.append(Flight(
+                name=f'{code_prefix[:2]}{i:04d}',
+                origin=origin,
+                destination=destination,
+                distance_km=rng.randint(150, 12000),
+                capacity=None if rng.random() < 0.2 else rng.choice([50, 120, 180, 300, 450]),
+            ))
+        flight_objs = Flight.objects.bulk_create(flight_objs, **bulk)
+
+        # one hash for everyone: hashing per user would dominate the run time
+        password_hash = make_password(password)
+        user_objs = User.objects.bulk_create([
+            User(username=f'{prefix}-user-{i}', password=password_hash)
+            for i in range(passengers)
+        ], **bulk)
+        passenger_objs = Passenger.objects.bulk_create([
+            Passenger(
+                user=user, name=f'{_name(rng)} {_name(rng)}',
+                passport=f'{code_prefix[:4]}{i:08d}', phone=f'09{rng.randint(0, 10**9 - 1):09d}',
+            )
+            for i, user in enumerate(user_objs)
+        ], **bulk)
+
+        # Zipf-like popularity: the flight at rank r is chosen ~1/(r+1) as often
+        weights = [1 / (rank + 1) for rank in range(len(flight_objs))]
+        rng.shuffle(weights)
+        seats = {flight.pk: flight.capacity for flight in flight_objs}
+
+        def bookings():
+            for passenger in passenger_objs:
+                wanted = rng.randint(0, round(2 * bookings_per_passenger)) if flight_objs else 0
+                chosen = set(rng.choices(flight_objs, weights, k=wanted))
+                for flight in chosen:
+                    if seats[flight.pk] is not None:
+                        if seats[flight.pk] == 0:
+                            continue
+                        seats[flight.pk] -= 1
+                    yield Flight.passengers.through(flight_id=flight.pk, passenger_id=passenger.pk)
+
+        booked = 0
+        for batch in _batches(bookings(), batch_size):
+            Flight.passengers.through.objects.bulk_create(batch)
+            booked += len(batch)
+        Flight.objects.filter(pk__in=seats).rebuild_passenger_counts()
+
+        # bulk_create sends no model signals
+        rebuild_stats()
+        invalidate_catalog()
+        events.catalog_reloaded()
+        routes.places_changed()
+        autocomplete.places_changed()
+
+    return {
+        'cities': len(city_objs),
+        'airports': len(airport_objs),
+        'flights': len(flight_objs),
+        'passengers': len(passenger_objs),
+        'bookings': booked,
+    }
+
+
+def delete_dataset(prefix='bench'):
+    """Remove everything a previous `generate_dataset(prefix=...)` created."""
+    with transaction.atomic():
+        users = User.objects.filter(username__startswith=f'{prefix}-')
+        # drop the bookings in one statement instead of per-passenger signal handling
+        Flight.passengers.through.objects.filter(passenger__user__in=users).delete()
+        deleted_users, _ = users.delete()
+        deleted_cities, _ = City.objects.filter(name__endswith=f' ({prefix})').delete()
+        Flight.objects.rebuild_passenger_counts()
+        rebuild_stats()
+        invalidate_catalog()
+        events.catalog_reloaded()
+        routes.places_changed()
+        autocomplete.places_changed()
+    return deleted_users + deleted_cities
@@ -0,0 +1,218 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+`ReplicaRouter` sends reads of flights models (catalog, bookings, stats) to
+the aliases listed in FLIGHTS_READ_REPLICAS and everything else to the
+primary (`default`):
+
+- writes always go to the primary;
+- reads go to the primary inside a transaction on the primary (a booking
+  re-reading what it just locked), during unsafe requests (POST, PUT, ...)
+  and for the FLIGHTS_REPLICA_STICKY_SECONDS after the client last wrote, so
+  a new booking shows up in my_flights even while the replicas lag;
+- auth, session and admin models always stay on the primary, so a user can
+  log in right after registering;
+- a replica is probed with `SELECT 1` at most every
+  FLIGHTS_REPLICA_HEALTH_INTERVAL seconds per process; failing replicas are
+  skipped, and reads fall back to the primary when none is healthy.
+
+Reads that fill a shared cache keyed by a version bumped on commit (the
+catalog responses and HTML fragments of flights.cache / flights.fragments,
+the route and place indexes) run inside `primary_reads()`: filled from a
+lagging replica, stale data would be stored under the new version and served
+to every client until the next change.
+
+Stickiness is carried by a cookie set by `ReplicaPinningMiddleware`, so it
+needs no shared server-side state. With no replicas configured every read
+goes to the primary and the cookie is never set.
+
+Local setup with two SQLite files:
+
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    FLIGHTS_READ_REPLICAS = ['replica']
+
+and `manage.py sync_sqlite_replicas` to copy the primary over the replica
+(SQLite has no replication; the copy stands in for it, lag included).
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = DEFAULT_DB_ALIAS
+PRIMARY_COOKIE = 'db_primary'
+# apps whose reads may be served by a replica
+REPLICA_APPS = {'flights'}
+
+_routing = ContextVar('flights_db_routing', default=None)
+
+
+def read_replicas():
+    return list(getattr(settings, 'FLIGHTS_READ_REPLICAS', ()))
+
+
+class RoutingState:
+    """Routing decisions of the current request (mutable, so threads run through sync_to_async share it)."""
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the flights reads of the block to the primary (see the module docstring).
+
+    Meant for read-only blocks: a write inside it does not pin the client.
+    """
+    token = _routing.set(RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaHealth:
+    """Per-process cache of replica health probes."""
+
+    def __init__(self):
+        self._results = {}   # alias -> (healthy, checked_at)
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'FLIGHTS_REPLICA_HEALTH_INTERVAL', 10)
+        now = time.monotonic()
+        with self._lock:
+            result = self._results.get(alias)
+        if result is not None and now - result[1] < interval:
+            return result[0]
+
+        healthy = self.probe(alias)
+        if not healthy and (result is None or result[0]):
+            logger.warning('Read replica %r is unavailable; reading from the primary instead', alias)
+        self.record(alias, healthy, now)
+        return healthy
+
+    def record(self, alias, healthy, checked_at=None):
+        with self._lock:
+            self._results[alias] = (healthy, time.monotonic() if checked_at is None else checked_at)
+
+    @staticmethod
+    def probe(alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except (DatabaseError, ConnectionDoesNotExist, ImproperlyConfigured):
+            if alias in connections:
+                connections[alias].close()
+            return False
+        return True
+
+    def status(self):
+        with self._lock:
+            return {alias: healthy for alias, (healthy, _) in sorted(self._results.items())}
+
+    def reset(self):
+        with self._lock:
+            self._results.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return PRIMARY
+        state = _routing.get()
+        if state is not None and state.pinned:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        healthy = [alias for alias in read_replicas() if replica_health.is_healthy(alias)]
+        return random.choice(healthy) if healthy else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # the rest of this request, and the client's next requests, read their own writes
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *read_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        if db in read_replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Track writes per request and pin the client to the primary for
+    FLIGHTS_REPLICA_STICKY_SECONDS after one (see the module docstring).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self._state_for(request)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        state = self._state_for(request)
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(response, state)
+
+    @staticmethod
+    def _state_for(request):
+        return RoutingState(pinned=request.method not in SAFE_METHODS or PRIMARY_COOKIE in request.COOKIES)
+
+    @staticmethod
+    def _finish(response, state):
+        if state.wrote and read_replicas():
+            response.set_cookie(
+                PRIMARY_COOKIE, '1', max_age=getattr(settings, 'FLIGHTS_REPLICA_STICKY_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,222 @@
+"""
+Change feed of the flight catalog: an outbox table streamed over SSE.
+
+Recording (called from flights.signals, inside the writer's transaction, so
+an event exists exactly when its change committed):
+
+- flight saves and deletes record `created` / `updated` / `deleted`; the
+  first two carry the flight in the FlightSerializer format;
+- every membership change (`passengers_changed`) records one `passengers`
+  event per flight with its new passenger_count;
+- bulk paths that bypass model signals (catalog import, synthetic datasets)
+  record a single `reload` event telling clients to refetch the list.
+
+Streaming (GET /api/events/flights/, flights.async_views.flight_events):
+every ASGI worker runs one `EventBroadcaster` per event loop, which polls the
+table once per FLIGHTS_EVENTS_POLL_INTERVAL for all connected clients and
+fans the new rows out to them, so the database sees one small indexed query
+per interval per process however many browser tabs are listening.
+
+Clients resume with the standard `Last-Event-ID` header (or `?last_event_id=`
+on the first connection): the missed events are replayed from the table
+before the live feed, or a `reload` event is sent when more than
+CATCH_UP_LIMIT were missed. Without an id the stream starts at "now".
+`?flight=<id>` (repeatable) limits the stream to some flights; `reload`
+events are always delivered.
+
+Ids come from a sequence, and on PostgreSQL a transaction can commit after
+one holding a higher id. The broadcaster therefore keeps polling for the
+ids it skipped over for GAP_TIMEOUT seconds, so such late events are still
+delivered (after their successors).
+"""
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Flight, FlightEvent
+from .serializers import FlightSerializer
+
+POLL_INTERVAL = getattr(settings, 'FLIGHTS_EVENTS_POLL_INTERVAL', 1.0)
+# a stream ends after this long; EventSource reconnects with Last-Event-ID (seconds)
+STREAM_LIFETIME = getattr(settings, 'FLIGHTS_EVENTS_STREAM_SECONDS', 5 * 60)
+HEARTBEAT_INTERVAL = 15
+RECONNECT_MS = 3000
+CATCH_UP_LIMIT = 1000
+GAP_TIMEOUT = 5
+# larger jumps in the id sequence (e.g. many rolled-back inserts) are not tracked
+MAX_GAP = 100
+# events buffered per client; a client that falls further behind is disconnected
+QUEUE_SIZE = 1000
+POLL_BATCH = 500
+
+_OVERFLOW = object()
+
+
+# ───────────────────────────────────────────────
+# Recording (called from flights.signals)
+# ───────────────────────────────────────────────
+
+def _flight_data(flight_id):
+    flight = Flight.objects.select_related('origin__city', 'destination__city').filter(pk=flight_id).first()
+    return FlightSerializer(flight).data if flight is not None else None
+
+
+def flight_saved(flight, created):
+    data = _flight_data(flight.pk)
+    if data is not None:
+        FlightEvent.objects.create(
+            kind=FlightEvent.CREATED if created else FlightEvent.UPDATED, flight_id=flight.pk, data=data,
+        )
+
+
+def flight_deleted(flight):
+    FlightEvent.objects.create(kind=FlightEvent.DELETED, flight_id=flight.pk, data={'id': flight.pk})
+
+
+def passengers_changed(deltas):
+    FlightEvent.objects.bulk_create([
+        FlightEvent(kind=FlightEvent.PASSENGERS, flight_id=pk, data={'id': pk, 'passenger_count': count})
+        for pk, count in Flight.objects.filter(pk__in=deltas).order_by('pk').values_list('pk', 'passenger_count')
+    ])
+
+
+def catalog_reloaded():
+    FlightEvent.objects.create(kind=FlightEvent.RELOAD)
+
+
+def purge_events(older_than=timedelta(days=1)):
+    """Delete events older than `older_than`; returns the number deleted."""
+    deleted, _ = FlightEvent.objects.filter(created_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+# ───────────────────────────────────────────────
+# Streaming
+# ───────────────────────────────────────────────
+
+def format_event(event):
+    data = json.dumps({'kind': event.kind, 'flight': event.flight_id, **event.data}, separators=(',', ':'))
+    return f'id: {event.pk}\nevent: {event.kind}\ndata: {data}\n\n'
+
+
+def _matches(event, flight_ids):
+    return not flight_ids or event.flight_id is None or event.flight_id in flight_ids
+
+
+async def latest_event_id():
+    return (await FlightEvent.objects.aaggregate(latest=Max('pk')))['latest'] or 0
+
+
+class EventBroadcaster:
+    """Poll the outbox for the clients of one event loop (see the module docstring)."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.cursor = None
+        self.gaps = {}      # skipped id -> monotonic deadline
+        self._task = None
+
+    async def subscribe(self):
+        """Return a queue receiving every event with an id above the current cursor."""
+        if self.cursor is None:
+            latest = await latest_event_id()
+            if self.cursor is None:
+                self.cursor = latest
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            # the next subscriber starts from "now" again
+            self.cursor = None
+            self.gaps.clear()
+
+    async def _run(self):
+        while self.subscribers:
+            for event in await self.poll():
+                for queue in list(self.subscribers):
+                    try:
+                        queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        self.subscribers.discard(queue)
+                        queue.get_nowait()
+                        queue.put_nowait(_OVERFLOW)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def poll(self):
+        now = time.monotonic()
+        self.gaps = {pk: deadline for pk, deadline in self.gaps.items() if deadline > now}
+        query = Q(pk__gt=self.cursor)
+        if self.gaps:
+            query |= Q(pk__in=list(self.gaps))
+        events = [event async for event in FlightEvent.objects.filter(query).order_by('pk')[:POLL_BATCH]]
+        for event in events:
+            self.gaps.pop(event.pk, None)
+            if event.pk > self.cursor:
+                skipped = range(max(self.cursor + 1, event.pk - MAX_GAP), event.pk)
+                self.gaps.update((pk, now + GAP_TIMEOUT) for pk in skipped)
+                self.cursor = event.pk
+        return events
+
+
+_broadcasters = WeakKeyDictionary()
+
+
+def get_broadcaster():
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = _broadcasters[loop] = EventBroadcaster()
+    return broadcaster
+
+
+async def event_stream(last_event_id=None, flight_ids=(), lifetime=None):
+    """Yield the SSE frames of one client connection."""
+    flight_ids = set(flight_ids)
+    broadcaster = get_broadcaster()
+    # subscribe before the catch-up read, so nothing committed in between is lost
+    queue = await broadcaster.subscribe()
+    try:
+        yield f'retry: {RECONNECT_MS}\n\n'
+        replayed = set()
+        if last_event_id is not None:
+            missed = FlightEvent.objects.filter(pk__gt=last_event_id).order_by('pk')
+            if flight_ids:
+                missed = missed.filter(Q(flight_id__in=flight_ids) | Q(flight_id__isnull=True))
+            events = [event async for event in missed[:CATCH_UP_LIMIT + 1]]
+            if len(events) > CATCH_UP_LIMIT:
+                # too far behind: tell the client to refetch, then continue live
+                latest = await latest_event_id()
+                yield format_event(FlightEvent(pk=latest, kind=FlightEvent.RELOAD))
+            else:
+                for event in events:
+                    replayed.add(event.pk)
+                    yield format_event(event)
+
+        deadline = time.monotonic() + (STREAM_LIFETIME if lifetime is None else lifetime)
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(HEARTBEAT_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                if deadline > time.monotonic():
+                    yield ': keepalive\n\n'
+                continue
+            if event is _OVERFLOW:
+                break
+            if event.pk not in replayed and _matches(event, flight_ids):
+                yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,137 @@
+"""
+Serializer-free read path for the flight catalog.
+
+Building a page of flights through `FlightSerializer` instantiates a Flight,
+two Airports and two Cities per row and walks the nested serializer fields
+of each. The read endpoints (FlightViewSet list/retrieve/my_flights and the
+async views) instead:
+
+1. fetch flat tuples with `values_list`, in the one joined query the
+   select_related queryset would run (`flight_rows`);
+2. turn each tuple into the FlightSerializer output with a row builder
+   built once, at import time, from FlightSerializer's own readable
+   fields, so the two cannot drift apart (`build_flight`);
+3. render with orjson when it is installed (`FastJSONRenderer`).
+
+The builder supports serializers made of plain model fields and nested
+serializers of non-null relations; anything else (method fields, dotted
+sources, `many=True`) is rejected with ImproperlyConfigured when the module
+is imported, rather than producing a different schema.
+
+orjson is optional: without it `FastJSONRenderer` renders exactly like
+DRF's JSONRenderer. With it, the output is byte-for-byte the same except
+for floats written with an exponent (`1e16` for `1e+16`); data orjson
+cannot encode (integers beyond 64 bits, non-string keys) falls back to the
+json module.
+"""
+
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.query import ValuesListIterable
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import TimedJSONRenderer, timed
+from .serializers import FlightSerializer
+
+try:
+    import orjson
+except ImportError:  # optional; FastJSONRenderer falls back to the json module
+    orjson = None
+
+# fields whose to_representation() returns the database value unchanged
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField)
+
+
+# ───────────────────────────────────────────────
+# Row builders
+# ───────────────────────────────────────────────
+
+def row_builder(serializer_class):
+    """
+    Return (columns, build) for `serializer_class`.
+
+    `columns` are the `values_list` lookups to fetch; `build(row)` turns one
+    fetched tuple into the serializer's representation.
+
+    Each serializer level is a closure zipping its keys with one `itemgetter`
+    call. A level with nested serializers first appends their dicts to the
+    row, and its itemgetter picks them up from the end (negative positions).
+    """
+    columns = []
+
+    def level_builder(serializer, prefix):
+        names, positions, nested = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.Serializer) and not field.allow_null:
+                positions.append(None)  # resolved below, once the number of nested levels is known
+                nested.append(level_builder(field, prefix + field.source + '__'))
+            elif isinstance(field, PLAIN_FIELDS) and field.source.isidentifier():
+                columns.append(prefix + field.source)
+                positions.append(len(columns) - 1)
+            else:
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{prefix}{name} cannot be built from values_list rows.'
+                )
+            names.append(name)
+
+        nested_positions = iter(range(-len(nested), 0))
+        positions = [next(nested_positions) if position is None else position for position in positions]
+        pick = itemgetter(*positions) if len(positions) > 1 else lambda row: tuple(row[i] for i in positions)
+        names, nested = tuple(names), tuple(nested)
+        if not nested:
+            return lambda row: dict(zip(names, pick(row)))
+        return lambda row: dict(zip(names, pick(row + tuple([build(row) for build in nested]))))
+
+    build = level_builder(serializer_class(), '')
+    return tuple(columns), build
+
+
+FLIGHT_COLUMNS, build_flight = row_builder(FlightSerializer)
+
+
+class FlightRowIterable(ValuesListIterable):
+    """Yield FlightSerializer-shaped dicts for a `values_list(*FLIGHT_COLUMNS)` queryset."""
+
+    def __iter__(self):
+        return map(build_flight, super().__iter__())
+
+
+def flight_rows(queryset):
+    """
+    Turn a Flight queryset into one yielding FlightSerializer-shaped dicts.
+
+    The result can still be filtered, ordered, sliced and paginated (the
+    cursor paginator reads the dicts' 'id').
+    """
+    rows = queryset.values_list(*FLIGHT_COLUMNS)
+    rows._iterable_class = FlightRowIterable
+    return rows
+
+
+# ───────────────────────────────────────────────
+# Rendering
+# ───────────────────────────────────────────────
+
+class FastJSONRenderer(TimedJSONRenderer):
+    """TimedJSONRenderer using orjson for compact output when it is available."""
+    _encoder = JSONEncoder()
+    # datetimes go through DRF's encoder, which formats them differently from orjson
+    _options = orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            with timed('render'):
+                content = orjson.dumps(data, default=self._encoder.default, option=self._options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # like JSONRenderer, keep the output a strict JavaScript subset
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,69 @@
+"""
+Server-side filtering of the flight catalog.
+
+`FlightSearchFilter` narrows FlightViewSet querysets by query parameters:
+
+    origin, destination             airport id or code
+    origin_city, destination_city   city id
+    min_distance, max_distance      distance_km range (inclusive)
+    name                            case-sensitive name prefix
+
+Every filter maps onto an index added in migration 0006 (or a foreign-key
+index): (origin, destination) and (destination, origin) for airport filters,
+airport.city for city filters, distance_km for ranges, and a pattern-ops
+index on name for prefixes. The plans are checked by flights.benchmark.
+"""
+
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import FlightFilterSerializer
+
+
+def _airport_lookup(side, value):
+    # isdecimal, not isdigit: '²' is a digit that int() rejects
+    if value.isdecimal():
+        return {f'{side}_id': int(value)}
+    return {f'{side}__code': value.upper()}
+
+
+class FlightSearchFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        if view.action not in ('list', None):
+            return queryset
+        query = FlightFilterSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        filters = {}
+        for side in ('origin', 'destination'):
+            if side in params:
+                filters.update(_airport_lookup(side, params[side]))
+            if f'{side}_city' in params:
+                filters[f'{side}__city_id'] = params[f'{side}_city']
+        if 'min_distance' in params:
+            filters['distance_km__gte'] = params['min_distance']
+        if 'max_distance' in params:
+            filters['distance_km__lte'] = params['max_distance']
+        if 'name' in params:
+            filters['name__startswith'] = params['name']
+        return queryset.filter(**filters) if filters else queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': description,
+                'schema': {'type': kind},
+            }
+            for name, kind, description in (
+                ('origin', 'string', 'Origin airport id or code'),
+                ('destination', 'string', 'Destination airport id or code'),
+                ('origin_city', 'integer', 'Origin city id'),
+                ('destination_city', 'integer', 'Destination city id'),
+                ('min_distance', 'integer', 'Minimum distance_km (inclusive)'),
+                ('max_distance', 'integer', 'Maximum distance_km (inclusive)'),
+                ('name', 'string', 'Flight name prefix (case-sensitive)'),
+            )
+        ]
@@ -1,14 +1,47 @@
 from django import forms
+from django.urls import reverse
 from .models import Flight, Airport
 
+# largest BigAutoField id: anything above cannot exist and overflows the query
+MAX_AIRPORT_ID = 2 ** 63 - 1
+
+
+class AirportSearchSelect(forms.Select):
+    """
+    Select that renders only the currently selected airport.
+
+    Other options are fetched on demand from the autocomplete API
+    (see the script in flight_form.html), so rendering the form costs one
+    small query for the selected ids however many airports exist.
+    Validation still goes through ModelChoiceField, which looks up only the
+    submitted id.
+    """
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = reverse('autocomplete')
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # a tampered value (not a decimal number, or out of the id range) is
+        # left to the field's validation; isdigit would let '²' through to int()
+        selected_ids = [int(v) for v in value if str(v).isdecimal() and int(v) <= MAX_AIRPORT_ID]
+        airports = Airport.objects.filter(pk__in=selected_ids) if selected_ids else []
+
+        options = [self.create_option(name, '', '---------', not airports, 0, attrs=attrs)]
+        for index, airport in enumerate(airports, start=1):
+            options.append(self.create_option(name, airport.pk, str(airport), True, index, attrs=attrs))
+        return [(None, options, 0)]
+
 
 class FlightForm(forms.ModelForm):
     class Meta:
         model = Flight
-        fields = ['name', 'origin', 'destination', 'distance_km']
+        fields = ['name', 'origin', 'destination', 'distance_km', 'capacity']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
-            'origin': forms.Select(attrs={'class': 'form-select'}),
-            'destination': forms.Select(attrs={'class': 'form-select'}),
+            'origin': AirportSearchSelect(attrs={'class': 'form-select'}),
+            'destination': AirportSearchSelect(attrs={'class': 'form-select'}),
             'distance_km': forms.NumberInput(attrs={'class': 'form-control'}),
+            'capacity': forms.NumberInput(attrs={'class': 'form-control'}),
         }
@@ -0,0 +1,128 @@
+"""
+Fragment cache of the HTML flight list and detail pages.
+
+Most of each page is the same for every visitor; only the action buttons
+depend on who is looking. The shared markup is cached in pieces:
+
+- one row fragment (name, route, distance, passenger count) and one detail
+  card per flight, keyed by the flight's own version (`flight:<id>` in
+  flights.cache), which is bumped when the flight or its membership changes,
+  and by the `flights` generation, bumped by airport/city changes and bulk
+  loads that do not know which flights they touched;
+- the composed rows of the whole list, per role (anonymous, passenger,
+  manager), keyed by the catalog version.
+
+A cached list page therefore costs one version lookup and one cache read.
+After a booking only the list entry and that flight's row are stale: the
+list is recomposed from the cached rows, re-rendering just the changed one.
+The role-dependent action cells are rendered once per composition with a
+marker id and spliced into every row, and the per-user parts of the detail
+page (CSRF token, manager links) are rendered around the cached card.
+
+Fragments live in the catalog cache backend (FLIGHTS_CATALOG_CACHE) for
+FLIGHTS_CATALOG_CACHE_TIMEOUT; size its MAX_ENTRIES for about three entries
+per flight (version, row, card).
+"""
+
+from django.core.cache import caches
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import CATALOG_CACHE_ALIAS, CATALOG_CACHE_TIMEOUT, get_version, get_versions
+from .db_router import primary_reads
+from .models import Flight
+
+ANONYMOUS, PASSENGER, MANAGER = 'anonymous', 'passenger', 'manager'
+
+ROW_TEMPLATE = 'flights/_flight_row.html'
+ACTIONS_TEMPLATE = 'flights/_flight_actions.html'
+CARD_TEMPLATE = 'flights/_flight_card.html'
+# stands in for the flight id while the action cells are rendered once per list
+_ID_MARKER = 2147483647
+
+
+def _flights():
+    return Flight.objects.select_related('origin__city', 'destination__city')
+
+
+def _fragment_keys(kind, flight_ids):
+    """Return {flight_id: cache key} for the current version of each flight."""
+    versions = get_versions(['flights', *(f'flight:{pk}' for pk in flight_ids)])
+    generation = versions['flights']
+    return {
+        pk: f'flights:fragment:{kind}:{pk}:{generation}.{versions[f"flight:{pk}"]}'
+        for pk in flight_ids
+    }
+
+
+# ───────────────────────────────────────────────
+# Flight list
+# ───────────────────────────────────────────────
+
+def row_fragments(flight_ids):
+    """Return {flight_id: row cells} for the flights of `flight_ids` that exist."""
+    cache = caches[CATALOG_CACHE_ALIAS]
+    keys = _fragment_keys('row', flight_ids)
+    found = cache.get_many(list(keys.values()))
+    rows = {pk: found[key] for pk, key in keys.items() if key in found}
+
+    missing = [pk for pk in flight_ids if pk not in rows]
+    if missing:
+        flights = _flights()
+        if len(missing) * 2 <= len(flight_ids):
+            flights = flights.filter(pk__in=missing)
+        template = get_template(ROW_TEMPLATE)
+        rendered = {
+            flight.pk: template.render({'flight': flight})
+            for flight in flights if flight.pk in keys and flight.pk not in rows
+        }
+        cache.set_many({keys[pk]: row for pk, row in rendered.items()}, CATALOG_CACHE_TIMEOUT)
+        rows.update(rendered)
+    return rows
+
+
+def _compose_rows(role):
+    flight_ids = list(Flight.objects.order_by('pk').values_list('pk', flat=True))
+    rows = row_fragments(flight_ids)
+    if role == ANONYMOUS:
+        actions = None
+    else:
+        actions = render_to_string(
+            ACTIONS_TEMPLATE, {'flight_id': _ID_MARKER, 'is_manager': role == MANAGER},
+        ).split(str(_ID_MARKER))
+    return ''.join(
+        f'<tr class="align-middle">{rows[pk]}{str(pk).join(actions) if actions else ""}</tr>\n'
+        for pk in flight_ids if pk in rows
+    )
+
+
+def flight_list_rows(role):
+    """Return the table rows of the flight list page for `role` (safe HTML)."""
+    cache = caches[CATALOG_CACHE_ALIAS]
+    key = f'flights:fragment:list:{get_version("catalog")}:{role}'
+    rows = cache.get(key)
+    if rows is None:
+        with primary_reads():
+            rows = _compose_rows(role)
+        cache.set(key, rows, CATALOG_CACHE_TIMEOUT)
+    return mark_safe(rows)
+
+
+# ───────────────────────────────────────────────
+# Flight detail
+# ───────────────────────────────────────────────
+
+def flight_card(flight_id):
+    """Return (name, card HTML) of a flight, or None if it does not exist."""
+    cache = caches[CATALOG_CACHE_ALIAS]
+    key = _fragment_keys('card', [flight_id])[flight_id]
+    entry = cache.get(key)
+    if entry is None:
+        with primary_reads():
+            flight = _flights().filter(pk=flight_id).first()
+        if flight is None:
+            return None
+        entry = (flight.name, render_to_string(CARD_TEMPLATE, {'flight': flight}))
+        cache.set(key, entry, CATALOG_CACHE_TIMEOUT)
+    name, card = entry
+    return name, mark_safe(card)
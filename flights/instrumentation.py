@@ -0,0 +1,298 @@
+"""
+Per-request SQL and timing instrumentation.
+
+`InstrumentationMiddleware` measures, for every request:
+
+- the number of SQL queries and the time spent in the database (through an
+  execute wrapper installed on every connection as it is opened),
+- the time spent rendering templates (`TimedDjangoTemplates` backend) and
+  rendering JSON (`TimedJSONRenderer`),
+- the time spent turning model instances into primitives (serializers using
+  `TimedRepresentationMixin`),
+- the total time spent in the view and the inner middleware.
+
+The numbers are sent back in a `Server-Timing` header, requests slower than
+FLIGHTS_SLOW_REQUEST_MS are logged to the 'flights.instrumentation' logger
+together with their SQL, and per-route histograms are kept in memory
+(`request_metrics`) and exported in the Prometheus text format by
+flights.views.MetricsView. Histograms are per process.
+
+The measurements of the current request live in a context variable, so the
+same code works for sync views and async views (including ORM calls run
+through sync_to_async).
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = getattr(settings, 'FLIGHTS_SLOW_REQUEST_MS', 500)
+# statements kept per request for the slow-request log
+SQL_LOG_LIMIT = 100
+
+_current = ContextVar('flights_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.sql = []
+        self.sections = {'render': 0.0, 'serialize': 0.0}
+        self._depth = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper: time every statement run on an instrumented connection."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.sql) < SQL_LOG_LIMIT:
+                self.sql.append((elapsed, sql))
+
+    @contextmanager
+    def section(self, name):
+        # nested calls (e.g. a serializer inside a serializer) are counted once
+        depth = self._depth.get(name, 0)
+        self._depth[name] = depth + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[name] = depth
+            if depth == 0:
+                self.sections[name] += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection (`instrument_connection`).
+
+    The async ORM runs queries in sync_to_async threads, on those threads'
+    connections; the request's metrics reach them through the context variable.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def instrument_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        # outermost, so connection.execute_wrapper() blocks still pop their own wrapper
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def timed(section):
+    """Add the time spent in the block to `section` of the current request, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+    else:
+        with metrics.section(section):
+            yield
+
+
+# ───────────────────────────────────────────────
+# Histograms
+# ───────────────────────────────────────────────
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in sorted(self._series.items())}
+        for labels, values in series.items():
+            label_text = ','.join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {values[-1]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetricsRegistry:
+    # route is the URL name (e.g. 'flight-list'), which keeps the label set bounded
+    LABELS = ('route', 'method')
+
+    def __init__(self):
+        seconds = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+        self.duration = Histogram(
+            'flights_request_duration_seconds', 'Time spent handling the request.', seconds, self.LABELS,
+        )
+        self.db = Histogram(
+            'flights_request_db_seconds', 'Time spent in SQL queries per request.', seconds, self.LABELS,
+        )
+        self.queries = Histogram(
+            'flights_request_queries', 'Number of SQL queries per request.',
+            (0, 1, 2, 5, 10, 20, 50, 100, 200), self.LABELS,
+        )
+
+    def record(self, route, method, total, metrics):
+        labels = (route, method)
+        self.duration.observe(labels, total)
+        self.db.observe(labels, metrics.db_time)
+        self.queries.observe(labels, metrics.queries)
+
+    def reset(self):
+        for histogram in (self.duration, self.db, self.queries):
+            histogram.reset()
+
+    def render(self):
+        lines = []
+        for histogram in (self.duration, self.db, self.queries):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetricsRegistry()
+
+
+# ───────────────────────────────────────────────
+# Middleware
+# ───────────────────────────────────────────────
+
+class InstrumentationMiddleware:
+    """Measure every request; see the module docstring."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    @staticmethod
+    def _start():
+        # connections opened before this module was imported missed connection_created
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match.route) if match is not None else 'unmatched'
+        request_metrics.record(route, request.method, total, metrics)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'serialize;dur={metrics.sections["serialize"] * 1000:.1f}',
+            f'render;dur={metrics.sections["render"] * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        if total * 1000 >= SLOW_REQUEST_MS:
+            statements = '\n'.join(f'  [{elapsed * 1000:.1f} ms] {sql}' for elapsed, sql in metrics.sql)
+            logger.warning(
+                'Slow request: %s %s took %.0f ms (%d queries, %.0f ms in db)\n%s',
+                request.method, request.get_full_path(), total * 1000,
+                metrics.queries, metrics.db_time * 1000, statements,
+            )
+        return response
+
+
+# ───────────────────────────────────────────────
+# Timed rendering
+# ───────────────────────────────────────────────
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TimedRepresentationMixin:
+    """Count a serializer's to_representation() towards the 'serialize' timing."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('render'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from flights.benchmark import (
+    BUDGETS_PATH, SCENARIOS, BenchmarkContext, check_budgets, check_query_plans,
+    load_budgets, run_scenarios, save_budgets,
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure latency percentiles and query counts per endpoint and compare them to the stored budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Scenario names (default: all)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--prefix', default='bench', help='Prefix of the benchmark users')
+        parser.add_argument('--budgets', default=str(BUDGETS_PATH))
+        parser.add_argument('--tolerance', type=float, default=1.5,
+                            help='Allowed p95 slowdown factor against the stored baseline')
+        parser.add_argument('--no-timing', action='store_true', help='Only check query budgets')
+        parser.add_argument('--update', action='store_true',
+                            help='Store the measured numbers as the new budgets instead of checking')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or None
+        unknown = set(names or ()) - {scenario.name for scenario in SCENARIOS}
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}')
+
+        # the test client needs 'testserver' in ALLOWED_HOSTS
+        setup_test_environment()
+        try:
+            try:
+                context = BenchmarkContext(options['prefix'])
+            except ValueError as exc:
+                raise CommandError(exc)
+            results = run_scenarios(context, names, options['iterations'], options['warmup'])
+            plan_failures = check_query_plans(context)
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f'{"scenario":<28} {"queries":>7} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<28} {result["queries"]:>7} {result["p50_ms"]:>8.1f} '
+                f'{result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f}'
+            )
+
+        if options['update']:
+            for failure in plan_failures:
+                self.stderr.write(failure)
+            budgets = load_budgets(options['budgets']) if names else {}
+            budgets.update({name: {'queries': r['queries'], 'p95_ms': r['p95_ms']} for name, r in results.items()})
+            save_budgets(budgets, options['budgets'])
+            self.stdout.write(self.style.SUCCESS(f'✓ budgets written to {options["budgets"]}'))
+            return
+
+        failures = plan_failures + check_budgets(
+            results, load_budgets(options['budgets']),
+            tolerance=options['tolerance'], check_timing=not options['no_timing'],
+        )
+        if failures:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('✓ all scenarios within budget'))
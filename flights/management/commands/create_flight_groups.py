@@ -34,3 +34,18 @@ class Command(BaseCommand):
                     '⚠ گروه "Flight Managers" قبلاً وجود داشت'
                 )
             )
+
+        # ساخت گروه Group Organizers (رزرو گروهی برای مسافران دیگر)
+        _, created = Group.objects.get_or_create(name='Group Organizers')
+        if created:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    '✓ گروه "Group Organizers" با موفقیت ساخته شد'
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    '⚠ گروه "Group Organizers" قبلاً وجود داشت'
+                )
+            )
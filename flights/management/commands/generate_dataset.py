@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from flights.dataset import delete_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic cities, airports, flights, passengers and bookings for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=20)
+        parser.add_argument('--airports', type=int, default=60)
+        parser.add_argument('--flights', type=int, default=500)
+        parser.add_argument('--passengers', type=int, default=2000)
+        parser.add_argument('--bookings-per-passenger', type=float, default=3.0,
+                            help='Average number of flights each passenger joins')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench',
+                            help='Tag for generated rows (usernames, airport codes, city names)')
+        parser.add_argument('--reset', action='store_true',
+                            help='Delete the rows of a previous run with the same prefix first')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['airports'] < 2:
+            raise CommandError('At least 2 airports are needed to create flights.')
+
+        if options['reset']:
+            self.stdout.write(f'Deleted {delete_dataset(prefix)} rows of the previous "{prefix}" dataset')
+        elif User.objects.filter(username__startswith=f'{prefix}-user-').exists():
+            raise CommandError(f'A "{prefix}" dataset already exists; use --reset or another --prefix.')
+
+        started = time.monotonic()
+        created = generate_dataset(
+            cities=options['cities'],
+            airports=options['airports'],
+            flights=options['flights'],
+            passengers=options['passengers'],
+            bookings_per_passenger=options['bookings_per_passenger'],
+            seed=options['seed'],
+            prefix=prefix,
+        )
+        elapsed = time.monotonic() - started
+        summary = ', '.join(f'{count} {kind}' for kind, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f'✓ created {summary} in {elapsed:.1f}s'))
@@ -0,0 +1,55 @@
+import io
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.catalog_io import COLUMNS, FORMATS, CatalogImporter, chunked, read_records
+
+
+class Command(BaseCommand):
+    help = 'Stream cities, airports or flights from a CSV/NDJSON file and upsert them in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(COLUMNS))
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS, help='Default: guessed from the file extension')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as exc:
+                raise CommandError(exc)
+
+        importer = CatalogImporter(options['kind'])
+        created = updated = rows = 0
+        started = time.monotonic()
+        with stream:
+            for chunk in chunked(read_records(stream, fmt), options['chunk_size']):
+                chunk_created, chunk_updated = importer.import_chunk(chunk)
+                created += chunk_created
+                updated += chunk_updated
+                rows += len(chunk)
+                if options['verbosity'] >= 2:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(f'  {rows} rows read ({rows / elapsed:,.0f} rows/s)')
+        importer.finish()
+
+        for line_number, message in importer.errors:
+            self.stderr.write(f'line {line_number}: {message}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {options["kind"]}: {created} created, {updated} updated, '
+            f'{len(importer.errors)} skipped — {rows} rows in {elapsed:.1f}s '
+            f'({rows / elapsed if elapsed else rows:,.0f} rows/s)'
+        ))
@@ -0,0 +1,59 @@
+import io
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.catalog_io import FORMATS, chunked, read_records
+from flights.onboarding import PassengerOnboarder
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users with Passenger profiles from a CSV/NDJSON file '
+        '(columns: username, password, email, first_name, last_name, name, phone, passport)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=FORMATS, help='Default: guessed from the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int,
+                            help='Password hashing processes (default: FLIGHTS_ONBOARDING_WORKERS or every CPU)')
+        parser.add_argument('--skip-password-validation', action='store_true',
+                            help='Do not run AUTH_PASSWORD_VALIDATORS on the passwords')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as exc:
+                raise CommandError(exc)
+
+        created = rows = 0
+        started = time.monotonic()
+        with stream, PassengerOnboarder(
+            workers=options['workers'], validate_passwords=not options['skip_password_validation'],
+        ) as onboarder:
+            for chunk in chunked(read_records(stream, fmt), options['chunk_size']):
+                created += len(onboarder.onboard_chunk(chunk))
+                rows += len(chunk)
+                if options['verbosity'] >= 2:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(f'  {rows} rows read ({rows / elapsed:,.0f} rows/s)')
+
+        for line_number, message in onboarder.errors:
+            self.stderr.write(f'line {line_number}: {message}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {created} passengers created, {len(onboarder.errors)} skipped — '
+            f'{rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else rows:,.0f} rows/s)'
+        ))
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.booking import process_booking_queue, purge_booking_requests
+
+
+class Command(BaseCommand):
+    help = 'Drain the queued booking requests (FLIGHTS_BOOKING_QUEUE) in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of waiting for more requests')
+        parser.add_argument('--retention-hours', type=float, default=24,
+                            help='Processed requests older than this are deleted (hourly)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        retention = timedelta(hours=options['retention_hours'])
+        next_purge = 0
+        total = 0
+        try:
+            while True:
+                if time.monotonic() >= next_purge:
+                    purged = purge_booking_requests(retention)
+                    if purged and options['verbosity'] >= 2:
+                        self.stdout.write(f'  purged {purged} processed requests')
+                    next_purge = time.monotonic() + 60 * 60
+
+                started = time.monotonic()
+                statuses = process_booking_queue(options['batch_size'])
+                if statuses:
+                    processed = sum(statuses.values())
+                    total += processed
+                    if options['verbosity'] >= 2:
+                        summary = ', '.join(f'{count} {status}' for status, count in sorted(statuses.items()))
+                        self.stdout.write(
+                            f'  {processed} requests in {(time.monotonic() - started) * 1000:.0f} ms: {summary}'
+                        )
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✓ processed {total} booking requests'))
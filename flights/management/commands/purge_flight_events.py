@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from flights.events import purge_events
+
+
+class Command(BaseCommand):
+    help = 'Delete old rows of the flight change feed (flights.events)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=float, default=24,
+                            help='Keep the events of this many recent hours, for clients resuming a stream')
+
+    def handle(self, *args, **options):
+        deleted = purge_events(timedelta(hours=options['older_than_hours']))
+        self.stdout.write(self.style.SUCCESS(f'✓ deleted {deleted} flight events'))
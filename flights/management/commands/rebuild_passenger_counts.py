@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from flights.cache import invalidate_catalog
+from flights.models import Flight
+from flights.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute Flight.passenger_count from the flights_flight_passengers table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'flight_ids', nargs='*', type=int,
+            help='Only rebuild these flights (default: all flights)',
+        )
+
+    def handle(self, *args, **options):
+        flights = Flight.objects.all()
+        if options['flight_ids']:
+            flights = flights.filter(pk__in=options['flight_ids'])
+
+        with transaction.atomic():
+            updated = flights.rebuild_passenger_counts()
+            # the route/airport/city totals are derived from passenger_count
+            rebuild_stats()
+            # a queryset update sends no signals
+            invalidate_catalog(options['flight_ids'] or None)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ passenger_count rebuilt for {updated} flight(s)')
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from flights.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the route, airport and city statistics from the flight catalog'
+
+    def handle(self, *args, **options):
+        routes, airports, cities = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ statistics rebuilt: {routes} route(s), {airports} airport(s), {cities} city(ies)'
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from flights.db_router import PRIMARY, read_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database over the SQLite read replicas '
+        '(local stand-in for replication; see flights.db_router)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float,
+                            help='Keep copying every N seconds (simulates replication lag)')
+
+    def handle(self, *args, **options):
+        aliases = read_replicas()
+        if not aliases:
+            raise CommandError('FLIGHTS_READ_REPLICAS is empty.')
+        for alias in [PRIMARY, *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'"{alias}" is not an SQLite database; replicate it with the database itself.')
+
+        while True:
+            connections[PRIMARY].ensure_connection()
+            for alias in aliases:
+                connections[alias].ensure_connection()
+                connections[PRIMARY].connection.backup(connections[alias].connection)
+                self.stdout.write(f'✓ copied {PRIMARY} to {alias}')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,66 @@
+"""
+Streaming passenger manifests.
+
+Manifest rows are read straight from the flights_flight_passengers through
+table with one joined `values_list` query (flight, passenger and user columns
+together) and `.iterator()`, which uses a server-side cursor on PostgreSQL.
+Rows are encoded one at a time, so a manifest of any size is produced with
+constant memory and the first bytes go out as soon as the query starts
+returning rows.
+"""
+
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from .models import Flight
+
+MANIFEST_COLUMNS = ['flight_id', 'flight', 'passenger_id', 'name', 'passport', 'phone', 'username']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def manifest_rows(flight_ids=None, chunk_size=2000):
+    """Yield manifest tuples ordered by flight and passenger id."""
+    rows = Flight.passengers.through.objects.order_by('flight_id', 'passenger_id')
+    if flight_ids is not None:
+        rows = rows.filter(flight_id__in=flight_ids)
+    return rows.values_list(
+        'flight_id', 'flight__name',
+        'passenger_id', 'passenger__name', 'passenger__passport', 'passenger__phone',
+        'passenger__user__username',
+    ).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() hands the encoded line back to csv.writer."""
+    def write(self, value):
+        return value
+
+
+def encode_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(MANIFEST_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def encode_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(MANIFEST_COLUMNS, row)), ensure_ascii=False) + '\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def manifest_response(rows, fmt, filename):
+    response = StreamingHttpResponse(ENCODERS[fmt](rows), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
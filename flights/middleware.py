@@ -1,17 +1,148 @@
+import time
+
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils.functional import SimpleLazyObject
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import (
+    ACCESS_COOKIE, REFRESH_COOKIE, set_jwt_cookies, verify_access_token,
+)
+from .serializers import CustomTokenObtainPairSerializer
+
+
 class JWTAuthFromCookieMiddleware:
     """If an 'access_token' cookie exists, copy it into Authorization header for downstream auth.
 
     This allows DRF's JWTAuthentication to work with browser requests that send the cookie.
+
+    When the access token is expired or expires within FLIGHTS_JWT_REFRESH_THRESHOLD
+    and a 'refresh_token' cookie is present, a fresh access token is minted (with
+    up-to-date role claims), used for the current request and sent back as a cookie.
+    Verified tokens are shared with CachedJWTAuthentication, so the signature is
+    checked only once per token.
+
+    The middleware is both sync and async capable: under ASGI it runs on the
+    event loop and only the (rare) refresh, which reads the database, is moved
+    to a thread.
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.refresh_threshold = getattr(
+            settings, 'FLIGHTS_JWT_REFRESH_THRESHOLD', 5 * 60
+        )
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # If Authorization header not set and cookie present, set the header
-        if 'HTTP_AUTHORIZATION' not in request.META:
-            token = request.COOKIES.get('access_token')
-            if token:
-                request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        if self.async_mode:
+            return self.__acall__(request)
+        token, raw_refresh = self._cookie_tokens(request)
+        refreshed = self._refresh(raw_refresh) if raw_refresh else None
+        self._authorize(request, token, refreshed)
 
         response = self.get_response(request)
+        if refreshed is not None:
+            set_jwt_cookies(response, refreshed)
         return response
+
+    async def __acall__(self, request):
+        token, raw_refresh = self._cookie_tokens(request)
+        refreshed = await sync_to_async(self._refresh)(raw_refresh) if raw_refresh else None
+        self._authorize(request, token, refreshed)
+
+        response = await self.get_response(request)
+        if refreshed is not None:
+            set_jwt_cookies(response, refreshed)
+        return response
+
+    def _cookie_tokens(self, request):
+        """
+        Return (access cookie, refresh cookie to exchange), either of which may be None.
+
+        The refresh cookie is only returned when the access token must be renewed.
+        """
+        # If Authorization header not set and cookie present, use the cookies
+        if 'HTTP_AUTHORIZATION' in request.META:
+            return None, None
+        token = request.COOKIES.get(ACCESS_COOKIE)
+        raw_refresh = request.COOKIES.get(REFRESH_COOKIE)
+        if raw_refresh and self._needs_refresh(token):
+            return token, raw_refresh
+        return token, None
+
+    @staticmethod
+    def _authorize(request, token, refreshed):
+        if refreshed is not None:
+            token = str(refreshed.access_token)
+        if token:
+            request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    def _needs_refresh(self, token):
+        validated = verify_access_token(token) if token else None
+        if validated is None:
+            return True
+        return validated['exp'] - time.time() < self.refresh_threshold
+
+    def _refresh(self, raw_refresh):
+        """Exchange the refresh cookie for a new refresh/access pair, or return None."""
+        try:
+            refresh = RefreshToken(raw_refresh)
+            user = User.objects.get(pk=refresh['user_id'], is_active=True)
+        except (TokenError, KeyError, User.DoesNotExist):
+            return None
+        return CustomTokenObtainPairSerializer.get_token(user)
+
+
+# ───────────────────────────────────────────────
+# Stateless (JWT-only) authentication
+# ───────────────────────────────────────────────
+
+def _token_user_lookup(request):
+    """Return the User filter named by the request's bearer token, or None."""
+    scheme, _, raw_token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme != 'Bearer' or not raw_token:
+        return None
+    token = verify_access_token(raw_token)
+    if token is None or jwt_settings.USER_ID_CLAIM not in token:
+        return None
+    return {jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM], 'is_active': True}
+
+
+def get_token_user(request):
+    lookup = _token_user_lookup(request)
+    user = User.objects.filter(**lookup).first() if lookup else None
+    return user or AnonymousUser()
+
+
+async def aget_token_user(request):
+    if not hasattr(request, '_acached_user'):
+        lookup = _token_user_lookup(request)
+        user = await User.objects.filter(**lookup).afirst() if lookup else None
+        request._acached_user = user or AnonymousUser()
+    return request._acached_user
+
+
+class JWTCookieAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware for FLIGHTS_STATELESS_AUTH: `request.user` comes
+    from the access token instead of the session.
+
+    JWTAuthFromCookieMiddleware turns the 'access_token' cookie into a bearer
+    header and renews it near expiry; the user is looked up lazily, on first
+    access, from that header. Nothing is read from or written to django_session.
+    """
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_token_user(request))
+        request.auser = partial(aget_token_user, request)
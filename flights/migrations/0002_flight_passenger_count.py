@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_passenger_count(apps, schema_editor):
+    Flight = apps.get_model('flights', 'Flight')
+    through = Flight.passengers.through
+    actual = (
+        through.objects.filter(flight_id=OuterRef('pk'))
+        .order_by()
+        .values('flight_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Flight.objects.update(passenger_count=Coalesce(Subquery(actual), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='passenger_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد مسافران'),
+        ),
+        migrations.RunPython(backfill_passenger_count, migrations.RunPython.noop),
+    ]
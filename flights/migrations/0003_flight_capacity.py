@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0002_flight_passenger_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum number of passengers; leave empty for no limit.', null=True, verbose_name='ظرفیت'),
+        ),
+    ]
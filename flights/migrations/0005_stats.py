@@ -0,0 +1,55 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_stats(apps, schema_editor):
+    from flights.stats import rebuild_stats
+    rebuild_stats(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0004_passenger_organizer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirportStats',
+            fields=[
+                ('airport', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='flights.airport')),
+                ('departing_flights', models.PositiveIntegerField(default=0)),
+                ('arriving_flights', models.PositiveIntegerField(default=0)),
+                ('departing_passengers', models.PositiveIntegerField(default=0)),
+                ('arriving_passengers', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CityStats',
+            fields=[
+                ('city', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='flights.city')),
+                ('departing_flights', models.PositiveIntegerField(default=0)),
+                ('arriving_flights', models.PositiveIntegerField(default=0)),
+                ('departing_passengers', models.PositiveIntegerField(default=0)),
+                ('arriving_passengers', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RouteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flight_count', models.PositiveIntegerField(default=0, verbose_name='تعداد پروازها')),
+                ('passenger_count', models.PositiveIntegerField(default=0, verbose_name='تعداد مسافران')),
+                ('seats', models.PositiveIntegerField(default=0, verbose_name='ظرفیت کل')),
+                ('seated_passengers', models.PositiveIntegerField(default=0)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flights.airport')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flights.airport')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('origin', 'destination'), name='unique_route_stats')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
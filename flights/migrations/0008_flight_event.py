@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0007_booking_request'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Flight created'), ('updated', 'Flight updated'), ('deleted', 'Flight deleted'), ('passengers', 'Passenger count changed'), ('reload', 'Catalog reloaded in bulk')], max_length=20)),
+                ('flight_id', models.IntegerField(blank=True, null=True)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['flight_id', 'id'], name='flight_event_flight_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 
 from django.db import models
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
 from django.contrib.auth.models import User
 
 class City(models.Model):
@@ -17,21 +19,213 @@ class Passenger(models.Model):
     name = models.CharField(max_length=100)
     passport = models.CharField(max_length=20, unique=True)
     phone = models.CharField(max_length=15, blank=True)
+    # the Group Organizer who books for this passenger (flights bulk-bookings)
+    organizer = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='organized_passengers',
+    )
     
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
+class BookingStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    BOOKED = 'booked', 'Booked'
+    ALREADY_JOINED = 'already_joined', 'Already joined'
+    FULL = 'full', 'Flight is full'
+    NOT_FOUND = 'not_found', 'Flight or passenger not found'
+    CANCELLED = 'cancelled', 'Cancelled'
+    NOT_JOINED = 'not_joined', 'Not joined'
+
+
+class FlightQuerySet(models.QuerySet):
+    def apply_passenger_deltas(self, deltas):
+        """
+        Shift the stored passenger_count of several flights in place.
+
+        `deltas` maps flight id -> signed change. Flights sharing the same delta
+        are updated with a single UPDATE ... SET passenger_count = passenger_count + n,
+        so the change commits (or rolls back) together with the through-table write.
+        """
+        by_delta = {}
+        for flight_id, delta in deltas.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(flight_id)
+        for delta, flight_ids in by_delta.items():
+            self.filter(pk__in=flight_ids).update(passenger_count=F('passenger_count') + delta)
+
+    def rebuild_passenger_counts(self):
+        """Recompute passenger_count from the through table for every flight in the queryset."""
+        through = Flight.passengers.through
+        actual = (
+            through.objects.filter(flight_id=OuterRef('pk'))
+            .order_by()
+            .values('flight_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return self.update(passenger_count=Coalesce(Subquery(actual), Value(0)))
+
+
 class Flight(models.Model):
     name = models.CharField(max_length=50)
     origin = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name="departing_flights")
     destination = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name="arriving_flights")
     distance_km = models.PositiveIntegerField()
     passengers = models.ManyToManyField(Passenger, blank=True, related_name="flights")
-    
+    # denormalized len(passengers); maintained by flights.signals, rebuilt by `rebuild_passenger_counts`
+    passenger_count = models.PositiveIntegerField('تعداد مسافران', default=0, editable=False)
+    capacity = models.PositiveIntegerField(
+        'ظرفیت', null=True, blank=True,
+        help_text='Maximum number of passengers; leave empty for no limit.',
+    )
+
+    objects = FlightQuerySet.as_manager()
+
     class Meta:
         permissions = [
             ("can_manage_flights", "Can add/edit/delete flights"),
         ]
+        # serve the search filters of flights.filters
+        indexes = [
+            models.Index(fields=['origin', 'destination'], name='flight_route_idx'),
+            models.Index(fields=['destination', 'origin'], name='flight_route_reverse_idx'),
+            models.Index(fields=['distance_km'], name='flight_distance_idx'),
+            # LIKE 'prefix%' on PostgreSQL needs the pattern operator class
+            models.Index(fields=['name'], name='flight_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.name}: {self.origin} → {self.destination}"
+
+    @property
+    def is_full(self):
+        return self.capacity is not None and self.passenger_count >= self.capacity
+
+    def book(self, passenger):
+        """Reserve a seat for `passenger`; returns a BookingStatus (see flights.booking)."""
+        from .booking import book_seat
+        return book_seat(self.pk, passenger.pk)
+
+    def save(self, *args, **kwargs):
+        # passenger_count is owned by the through-table signals; a plain save of a
+        # (possibly stale) instance must never overwrite it.
+        if self.pk is not None and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'passenger_count'
+            ]
+        super().save(*args, **kwargs)
+
+class BookingRequest(models.Model):
+    """
+    A join accepted in queued booking mode (FLIGHTS_BOOKING_QUEUE).
+
+    Created as QUEUED; the `process_bookings` worker books it and stores the
+    resulting BookingStatus (see flights.booking).
+    """
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='booking_requests')
+    passenger = models.ForeignKey(Passenger, on_delete=models.CASCADE, related_name='booking_requests')
+    status = models.CharField('وضعیت', max_length=20, choices=BookingStatus.choices, default=BookingStatus.QUEUED)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # one pending request per seat; repeated clicks return the same request
+            models.UniqueConstraint(
+                fields=['flight', 'passenger'], condition=Q(status='queued'),
+                name='unique_queued_booking_request',
+            ),
+        ]
+        indexes = [
+            # the worker reads the queue head in id order
+            models.Index(fields=['id'], condition=Q(status='queued'), name='booking_request_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.passenger_id} → {self.flight_id} ({self.status})"
+
+
+class FlightEvent(models.Model):
+    """
+    Append-only change feed of the flight catalog (see flights.events).
+
+    Written in the same transaction as the change it describes; `flight_id` is
+    a plain column so the events of deleted flights survive.
+    """
+    CREATED, UPDATED, DELETED, PASSENGERS, RELOAD = 'created', 'updated', 'deleted', 'passengers', 'reload'
+    KINDS = [
+        (CREATED, 'Flight created'),
+        (UPDATED, 'Flight updated'),
+        (DELETED, 'Flight deleted'),
+        (PASSENGERS, 'Passenger count changed'),
+        (RELOAD, 'Catalog reloaded in bulk'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    flight_id = models.IntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # per-flight subscriptions read one flight's events in id order
+            models.Index(fields=['flight_id', 'id'], name='flight_event_flight_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.name}: {self.origin} → {self.destination}"
\ No newline at end of file
+        return f"#{self.pk} {self.kind} {self.flight_id or ''}".strip()
+
+
+# ───────────────────────────────────────────────
+# Aggregated statistics (maintained by flights.stats)
+# ───────────────────────────────────────────────
+
+class StatsQuerySet(models.QuerySet):
+    def with_load_factor(self):
+        """Annotate seated_passengers / seats (NULL for routes without capacity-limited flights)."""
+        return self.annotate(load_factor=Round(
+            Cast('seated_passengers', FloatField()) / NullIf('seats', 0), 4,
+        ))
+
+    def with_passengers(self):
+        """Annotate departing + arriving passengers of an airport or city."""
+        return self.annotate(passengers=F('departing_passengers') + F('arriving_passengers'))
+
+
+class RouteStats(models.Model):
+    """Per (origin, destination) totals over all flights of the route."""
+    origin = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name='+')
+    destination = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name='+')
+    flight_count = models.PositiveIntegerField('تعداد پروازها', default=0)
+    passenger_count = models.PositiveIntegerField('تعداد مسافران', default=0)
+    # capacity-limited flights only: the load factor is seated_passengers / seats
+    seats = models.PositiveIntegerField('ظرفیت کل', default=0)
+    seated_passengers = models.PositiveIntegerField(default=0)
+
+    objects = StatsQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'destination'], name='unique_route_stats'),
+        ]
+
+
+class AirportStats(models.Model):
+    airport = models.OneToOneField(Airport, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    departing_flights = models.PositiveIntegerField(default=0)
+    arriving_flights = models.PositiveIntegerField(default=0)
+    departing_passengers = models.PositiveIntegerField(default=0)
+    arriving_passengers = models.PositiveIntegerField(default=0)
+
+    objects = StatsQuerySet.as_manager()
+
+
+class CityStats(models.Model):
+    city = models.OneToOneField(City, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    departing_flights = models.PositiveIntegerField(default=0)
+    arriving_flights = models.PositiveIntegerField(default=0)
+    departing_passengers = models.PositiveIntegerField(default=0)
+    arriving_passengers = models.PositiveIntegerField(default=0)
+
+    objects = StatsQuerySet.as_manager()
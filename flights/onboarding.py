@@ -0,0 +1,282 @@
+"""
+Bulk onboarding of users with passenger profiles.
+
+Registration creates one User (paying a full password hash) and then one
+Passenger per request, and the generated `P-{id:06d}` passport needs the
+user id first. For a charter or corporate group of thousands of people
+`PassengerOnboarder` does the same work in bulk, chunk by chunk:
+
+1. records are validated up front (username format, duplicates within the
+   batch and in the database, password validators, field lengths);
+2. the passwords of the valid rows are hashed in a process pool, so PBKDF2
+   runs on every core instead of one hash after the other;
+3. users and then passengers are inserted with `bulk_create` inside one
+   transaction per chunk; generated passports are derived from the ids the
+   user insert returns, with no per-row round trip.
+
+Invalid rows are reported in `errors` as (row_number, message) and skipped;
+they never abort the rest of the batch. Used by the bulk_register API action
+and the `onboard_passengers` management command. The command starts a pool
+of its own; web requests share one small pool per server process
+(`web_pool`), so a request never starts processes of its own.
+
+Record fields: username, password (required), email, first_name, last_name,
+name (defaults to the full name or username), phone, passport (defaults to
+the generated `P-{id:06d}`).
+"""
+
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection, transaction
+
+from .catalog_io import RowError, checked, max_length, text_field
+from .models import Passenger
+
+COLUMNS = ['username', 'password', 'email', 'first_name', 'last_name', 'name', 'phone', 'passport']
+
+# passports of this shape are generated from the user id and cannot be chosen
+GENERATED_PASSPORT = re.compile(r'P-\d+')
+
+
+def generated_passport(user_id):
+    return f'P-{user_id:06d}'
+
+
+_web_pool = None
+_web_pool_lock = threading.Lock()
+
+
+def web_workers():
+    return getattr(settings, 'FLIGHTS_ONBOARDING_WEB_WORKERS', 2)
+
+
+def web_pool():
+    """
+    Return the hashing pool shared by the requests of this process.
+
+    It has FLIGHTS_ONBOARDING_WEB_WORKERS processes, is started on first use
+    and lives as long as the process; None when that setting is 1 or less.
+    Workers are spawned, not forked: forking a threaded server is unsafe.
+    """
+    global _web_pool
+    if web_workers() <= 1:
+        return None
+    with _web_pool_lock:
+        if _web_pool is None:
+            _web_pool = ProcessPoolExecutor(
+                max_workers=web_workers(), mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+    return _web_pool
+
+
+def _messages(exc):
+    return '; '.join(exc.messages)
+
+
+class PassengerOnboarder:
+    """
+    Create users and passenger profiles chunk by chunk.
+
+    `workers` is the size of the hashing process pool (default: every CPU,
+    FLIGHTS_ONBOARDING_WORKERS); with 1 or less passwords are hashed in this
+    process. Pass `pool` to hash in an existing pool of `workers` processes
+    instead of starting one. Use as a context manager, or call `close()`, to
+    shut down the pool it started.
+    """
+
+    def __init__(self, workers=None, validate_passwords=True, pool=None):
+        if workers is None:
+            workers = getattr(settings, 'FLIGHTS_ONBOARDING_WORKERS', None) or os.cpu_count() or 1
+        self.workers = workers
+        self.validate_passwords = validate_passwords
+        self.errors = []
+        self._usernames = set()
+        self._passports = set()
+        self._pool = pool
+        self._owns_pool = pool is None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown()
+        self._pool = None
+
+    def onboard_chunk(self, chunk):
+        """
+        Onboard `chunk`, a list of (row_number, record) pairs.
+
+        Returns the created rows as (row_number, user_id, passenger_id, passport).
+        """
+        rows = self._validate(chunk)
+        if not rows:
+            return []
+        hashes = self._hash([row['password'] for row in rows])
+        try:
+            with transaction.atomic():
+                return self._insert(rows, hashes)
+        except IntegrityError:
+            # a concurrent registration took a username or passport between the
+            # validation queries and the insert: fall back to one row at a time
+            return self._insert_one_by_one(rows, hashes)
+
+    # ── validation ──
+
+    def _parse(self, record):
+        username = text_field(record, 'username')
+        try:
+            User.username_validator(username)
+        except ValidationError as exc:
+            raise RowError(_messages(exc))
+        if username in self._usernames:
+            raise RowError(f'duplicate username {username!r} in this batch')
+
+        row = {
+            'username': username,
+            'password': text_field(record, 'password'),
+            'email': text_field(record, 'email', required=False),
+            'first_name': text_field(record, 'first_name', required=False),
+            'last_name': text_field(record, 'last_name', required=False),
+            'phone': text_field(record, 'phone', required=False),
+            'passport': text_field(record, 'passport', required=False) or None,
+        }
+        row['name'] = (
+            text_field(record, 'name', required=False)
+            or f"{row['first_name']} {row['last_name']}".strip()
+            or username
+        )
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError as exc:
+                raise RowError(_messages(exc))
+        for model, field in (
+            (User, 'username'), (User, 'email'), (User, 'first_name'), (User, 'last_name'),
+            (Passenger, 'name'), (Passenger, 'phone'), (Passenger, 'passport'),
+        ):
+            if row[field] and len(row[field]) > max_length(model, field):
+                raise RowError(f'"{field}" is longer than {max_length(model, field)} characters')
+
+        passport = row['passport']
+        if passport is not None:
+            if GENERATED_PASSPORT.fullmatch(passport):
+                raise RowError(f'passport {passport!r} is reserved for generated passports')
+            if passport in self._passports:
+                raise RowError(f'duplicate passport {passport!r} in this batch')
+
+        if self.validate_passwords:
+            user = User(username=username, email=row['email'],
+                        first_name=row['first_name'], last_name=row['last_name'])
+            try:
+                validate_password(row['password'], user)
+            except ValidationError as exc:
+                raise RowError(_messages(exc))
+
+        self._usernames.add(username)
+        if passport is not None:
+            self._passports.add(passport)
+        return row
+
+    def _validate(self, chunk):
+        parsed = []
+        for row_number, record in chunk:
+            try:
+                parsed.append((row_number, self._parse(checked(record))))
+            except RowError as exc:
+                self.errors.append((row_number, str(exc)))
+
+        taken_usernames = set(User.objects.filter(
+            username__in=[row['username'] for _, row in parsed],
+        ).values_list('username', flat=True))
+        taken_passports = set(Passenger.objects.filter(
+            passport__in=[row['passport'] for _, row in parsed if row['passport']],
+        ).values_list('passport', flat=True))
+
+        rows = []
+        for row_number, row in parsed:
+            if row['username'] in taken_usernames:
+                self.errors.append((row_number, f'username {row["username"]!r} is already taken'))
+            elif row['passport'] in taken_passports:
+                self.errors.append((row_number, f'passport {row["passport"]!r} is already registered'))
+            else:
+                rows.append({**row, 'row_number': row_number})
+        return rows
+
+    # ── hashing ──
+
+    def _hash(self, passwords):
+        if self.workers <= 1 or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+        if self._pool is None:
+            # with the spawn/forkserver start methods the worker is a fresh
+            # interpreter; it must not unpickle anything from this module first
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._pool.map(make_password, passwords, chunksize=chunksize))
+
+    # ── inserts ──
+
+    @staticmethod
+    def _user(row, password_hash):
+        return User(
+            username=row['username'], password=password_hash, email=row['email'],
+            first_name=row['first_name'], last_name=row['last_name'],
+        )
+
+    @staticmethod
+    def _passenger(row, user):
+        return Passenger(
+            user=user, name=row['name'], phone=row['phone'],
+            passport=row['passport'] or generated_passport(user.pk),
+        )
+
+    def _insert(self, rows, hashes):
+        users = User.objects.bulk_create([self._user(row, password) for row, password in zip(rows, hashes)])
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids = dict(User.objects.filter(
+                username__in=[user.username for user in users],
+            ).values_list('username', 'pk'))
+            for user in users:
+                user.pk = ids[user.username]
+        passengers = Passenger.objects.bulk_create([
+            self._passenger(row, user) for row, user in zip(rows, users)
+        ])
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids = dict(Passenger.objects.filter(user__in=users).values_list('user_id', 'pk'))
+            for passenger in passengers:
+                passenger.pk = ids[passenger.user_id]
+        return [
+            (row['row_number'], user.pk, passenger.pk, passenger.passport)
+            for row, user, passenger in zip(rows, users, passengers)
+        ]
+
+    def _insert_one_by_one(self, rows, hashes):
+        created = []
+        for row, password_hash in zip(rows, hashes):
+            try:
+                with transaction.atomic():
+                    user = self._user(row, password_hash)
+                    user.save()
+                    passenger = self._passenger(row, user)
+                    passenger.save()
+            except IntegrityError:
+                self.errors.append((row['row_number'], 'username or passport is already taken'))
+            else:
+                created.append((row['row_number'], user.pk, passenger.pk, passenger.passport))
+        return created
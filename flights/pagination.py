@@ -0,0 +1,24 @@
+"""
+Keyset (cursor) pagination for the flight booking API.
+
+Pages are addressed by an opaque cursor encoding the last primary key seen,
+so every page is a `WHERE id > %s ORDER BY id LIMIT n` range scan on the
+primary-key index. Deep pages cost the same as the first one, unlike
+OFFSET-based pagination.
+"""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered by the (unique, indexed) primary key.
+
+    Page size defaults to REST_FRAMEWORK['PAGE_SIZE'] and can be lowered or raised
+    per request with ?page_size=, up to the hard cap in
+    REST_FRAMEWORK['MAX_PAGE_SIZE'].
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 200)
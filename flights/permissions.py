@@ -1,16 +1,28 @@
 # flights/permissions.py (فایل جدید)
 from rest_framework.permissions import BasePermission
 
+from .roles import is_flight_manager, is_group_organizer, is_manager_or_admin
+
 class IsFlightManager(BasePermission):
     """
     فقط اعضای گروه 'Flight Managers' می‌تونند پروازها رو اضافه/ویرایش کنند
+    (نقش از claim توکن JWT یا کش نقش‌ها خوانده می‌شود)
     """
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name='Flight Managers').exists()
+        return bool(request.user and is_flight_manager(request.user, request.auth))
 
 class IsPassenger(BasePermission):
     """
     تمام کاربران احراز‌شده می‌تونند پرواز به لیستشون اضافه کنند
     """
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated
\ No newline at end of file
+        return request.user and request.user.is_authenticated
+
+class IsBookingOrganizer(BasePermission):
+    """
+    مدیران پرواز، ادمین‌ها و اعضای گروه 'Group Organizers' می‌تونند برای مسافران دیگر رزرو گروهی انجام دهند
+    (برگزارکننده فقط برای مسافرانی که organizer آن‌هاست؛ در bulk_bookings بررسی می‌شود)
+    """
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and (is_manager_or_admin(user, request.auth) or is_group_organizer(user)))
@@ -0,0 +1,221 @@
+"""
+Token-bucket rate limiting shared by every worker process on a host.
+
+`RateLimitMiddleware` checks the limits of the expensive write endpoints
+(token issue, login and registration, which hash passwords, and flight
+joins) in `process_view`: after URL resolution but before the view runs, so
+a rejected request costs no password hashing and no ORM query.
+
+Limits are configured per URL name in FLIGHTS_RATE_LIMITS:
+
+    FLIGHTS_RATE_LIMITS = {
+        'token_obtain_pair': ['ip:10/m'],
+        'flight-join': ['user:30/m', 'ip:120/m', 'flight:20/s'],
+    }
+
+Each rule is `<scope>:<requests>/<period>` with the period one of s, m, h, d
+(as in DRF throttle rates). A bucket holds `requests` tokens and refills at
+requests/period, so short bursts up to the limit are allowed. Scopes:
+
+- `ip`: the client address (REMOTE_ADDR);
+- `user`: the user id of the request's JWT, or else its session cookie;
+  anonymous requests are not limited by `user` rules;
+- `flight`: the `pk` of the flight in the URL, shared by all clients, to
+  absorb stampedes on one popular flight.
+
+Only unsafe methods (POST, PUT, ...) are limited. Buckets live in a small
+SQLite file (FLIGHTS_RATELIMIT_PATH, by default in the temp directory; point
+it at /dev/shm for a RAM-backed file). Each check is one UPSERT that refills
+and takes a token atomically, so processes need no other coordination. If the
+store fails, requests are let through and the error is logged.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import verify_access_token
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+SCOPES = ('ip', 'user', 'flight')
+# on average, one check in this many also deletes the buckets that are full again
+CLEANUP_EVERY = 1000
+
+
+class Rule:
+    def __init__(self, spec):
+        try:
+            self.scope, rate = spec.split(':', 1)
+            requests, period = rate.split('/', 1)
+            self.capacity = int(requests)
+            self.period = PERIODS[period.strip()[0]]
+        except (ValueError, KeyError, IndexError):
+            raise ImproperlyConfigured(f'Invalid rate limit {spec!r}; expected e.g. "ip:10/m".')
+        if self.scope not in SCOPES or self.capacity < 1:
+            raise ImproperlyConfigured(f'Invalid rate limit {spec!r}; scopes are {", ".join(SCOPES)}.')
+        self.spec = spec
+        self.rate = self.capacity / self.period   # tokens per second
+
+
+class TokenBucketStore:
+    """Buckets in an SQLite file; one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # counters are disposable: skip fsync
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                ' key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, rule, now=None):
+        """Take one token from `key`'s bucket; return 0 when allowed, else the seconds to wait."""
+        now = time.time() if now is None else now
+        connection = self._connection()
+        refilled = f'min({rule.capacity}, tokens + (:now - updated) * :rate)'
+        cursor = connection.execute(
+            'INSERT INTO buckets (key, tokens, updated, full_at) VALUES (:key, :capacity - 1, :now, :now + 1 / :rate)'
+            f' ON CONFLICT (key) DO UPDATE SET tokens = {refilled} - 1, updated = :now,'
+            f' full_at = :now + ({rule.capacity} - ({refilled} - 1)) / :rate'
+            f' WHERE {refilled} >= 1',
+            {'key': key, 'capacity': rule.capacity, 'now': now, 'rate': rule.rate},
+        )
+        if random.randrange(CLEANUP_EVERY) == 0:
+            connection.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+        if cursor.rowcount:
+            return 0
+        row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        tokens = min(rule.capacity, row[0] + (now - row[1]) * rule.rate) if row else 0
+        return max((1 - tokens) / rule.rate, 0.001)
+
+    def reset(self):
+        self._connection().execute('DELETE FROM buckets')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = getattr(settings, 'FLIGHTS_RATELIMIT_PATH', None) or os.path.join(
+        tempfile.gettempdir(), 'flights-ratelimit.sqlite3',
+    )
+    with _stores_lock:
+        store = _stores.get(str(path))
+        if store is None:
+            store = _stores[str(path)] = TokenBucketStore(str(path))
+    return store
+
+
+def load_rules():
+    return {
+        route: [Rule(spec) for spec in specs]
+        for route, specs in getattr(settings, 'FLIGHTS_RATE_LIMITS', {}).items()
+    }
+
+
+# ───────────────────────────────────────────────
+# Client identity
+# ───────────────────────────────────────────────
+
+def _user_identity(request):
+    scheme, _, raw_token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme == 'Bearer' and raw_token:
+        token = verify_access_token(raw_token)
+        if token is not None and jwt_settings.USER_ID_CLAIM in token:
+            return f'jwt:{token[jwt_settings.USER_ID_CLAIM]}'
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return 'session:' + hashlib.sha256(session_key.encode()).hexdigest()[:32]
+    return None
+
+
+def bucket_key(rule, route, request, view_kwargs):
+    """The bucket `rule` charges for this request, or None when the rule does not apply."""
+    if rule.scope == 'ip':
+        subject = request.META.get('REMOTE_ADDR')
+    elif rule.scope == 'user':
+        subject = _user_identity(request)
+    else:
+        subject = view_kwargs.get('pk')
+    if subject is None:
+        return None
+    return f'{route}|{rule.spec}|{subject}'
+
+
+# ───────────────────────────────────────────────
+# Middleware
+# ───────────────────────────────────────────────
+
+class RateLimitMiddleware:
+    """Enforce FLIGHTS_RATE_LIMITS before the view runs (see the module docstring)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = load_rules()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS or not self.rules:
+            return None
+        route = request.resolver_match.view_name
+        rules = self.rules.get(route)
+        if not rules:
+            return None
+
+        store = get_store()
+        wait = 0
+        try:
+            for rule in rules:
+                key = bucket_key(rule, route, request, view_kwargs)
+                if key is not None:
+                    wait = max(wait, store.take(key, rule))
+        except sqlite3.Error:
+            logger.exception('Rate limit store %s failed; letting the request through', store.path)
+            return None
+        if wait:
+            return self._throttled(request, wait)
+        return None
+
+    @staticmethod
+    def _throttled(request, wait):
+        seconds = math.ceil(wait)
+        message = f'Request was throttled. Expected available in {seconds} seconds.'
+        if request.path.startswith('/api/'):
+            response = JsonResponse({'detail': message}, status=429)
+        else:
+            response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(seconds)
+        return response
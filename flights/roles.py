@@ -0,0 +1,80 @@
+"""
+Role resolution for authorization checks.
+
+A user's group names are loaded at most once per request (memoized on the
+user object) and cached across requests in the default cache. The cache entry
+is dropped when the user's group membership changes, and every entry is
+invalidated at once when a Group is renamed or deleted.
+
+When a request is authenticated with one of our JWTs, the `is_flight_manager`
+claim written at token creation is trusted as-is, so permission checks on
+token-authenticated endpoints need no database round trip. The trade-off is
+that a role change only reaches such clients when their access token is
+renewed (ACCESS_TOKEN_LIFETIME).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import bump_version, get_version
+
+FLIGHT_MANAGERS = 'Flight Managers'
+GROUP_ORGANIZERS = 'Group Organizers'
+
+ROLES_CACHE_TIMEOUT = getattr(settings, 'FLIGHTS_ROLES_CACHE_TIMEOUT', 15 * 60)
+
+
+def _roles_key(user_id):
+    return f'flights:roles:{get_version("roles")}:{user_id}'
+
+
+def get_user_roles(user):
+    """Return the frozenset of group names `user` belongs to."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_flight_roles', None)
+    if roles is not None:
+        return roles
+
+    key = _roles_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+    user._flight_roles = roles
+    return roles
+
+
+def is_flight_manager(user, token=None):
+    """
+    Check membership of the 'Flight Managers' group.
+
+    Args:
+        user: The user instance to check.
+        token: The validated JWT of the request (`request.auth`), if any.
+    """
+    if token is not None and 'is_flight_manager' in token:
+        return bool(token['is_flight_manager'])
+    return FLIGHT_MANAGERS in get_user_roles(user)
+
+
+def is_manager_or_admin(user, token=None):
+    """Staff members and Flight Managers may manage flights."""
+    return bool(user and user.is_authenticated and (user.is_staff or is_flight_manager(user, token)))
+
+
+def is_group_organizer(user):
+    """Group organizers may book and cancel seats on behalf of other passengers."""
+    return GROUP_ORGANIZERS in get_user_roles(user)
+
+
+def forget_user_roles(user_ids):
+    """Drop the cached roles of `user_ids` once the current transaction commits."""
+    keys = [_roles_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_all_roles():
+    transaction.on_commit(lambda: bump_version('roles'))
@@ -0,0 +1,198 @@
+"""
+Multi-leg route search over the Airport/Flight graph.
+
+Airports are nodes and flights are directed edges weighted by `distance_km`.
+`RouteIndex` keeps the adjacency lists in memory:
+
+- it is built on first use (in each worker process) with three flat
+  `values_list` queries;
+- flight creates/edits/deletes committed in this process are applied
+  incrementally (see flights.signals);
+- changes made by other processes are noticed through the shared 'routes'
+  version (flights.cache), which triggers a rebuild on the next search.
+
+`search` returns the k shortest itineraries (by total distance) with at most
+`max_legs` flights, never visiting an airport twice. It is a best-first
+search that expands each (airport, legs used) state at most k times, so its
+cost is bounded by k * max_legs * edges rather than by the number of paths.
+"""
+
+import heapq
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+from .cache import bump_version, get_version
+from .db_router import primary_reads
+from .models import Airport, City, Flight
+
+
+class RouteIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.airports = {}       # airport_id -> (code, name, city_id)
+        self.codes = {}          # upper-case code -> airport_id
+        self.cities = {}         # city_id -> name
+        self.flights = {}        # flight_id -> (origin_id, destination_id, distance_km, name)
+        self.out_edges = defaultdict(dict)   # origin_id -> {flight_id: (destination_id, distance_km)}
+        self.city_airports = defaultdict(set)
+
+    # ── maintenance ──────────────────────────────
+
+    def rebuild(self):
+        version = get_version('routes')
+        # the graph is kept until the version changes again: never build it from a replica
+        with primary_reads():
+            airports = {
+                pk: (code, name, city_id)
+                for pk, code, name, city_id in Airport.objects.values_list('pk', 'code', 'name', 'city_id').iterator()
+            }
+            cities = dict(City.objects.values_list('pk', 'name').iterator())
+            flights = {
+                pk: (origin_id, destination_id, distance_km, name)
+                for pk, origin_id, destination_id, distance_km, name in Flight.objects.values_list(
+                    'pk', 'origin_id', 'destination_id', 'distance_km', 'name'
+                ).iterator()
+            }
+
+        out_edges = defaultdict(dict)
+        for flight_id, (origin_id, destination_id, distance_km, _) in flights.items():
+            out_edges[origin_id][flight_id] = (destination_id, distance_km)
+        city_airports = defaultdict(set)
+        for airport_id, (_, _, city_id) in airports.items():
+            city_airports[city_id].add(airport_id)
+        codes = {code.upper(): airport_id for airport_id, (code, _, _) in airports.items()}
+
+        with self._lock:
+            self.airports, self.cities, self.flights, self.codes = airports, cities, flights, codes
+            self.out_edges, self.city_airports = out_edges, city_airports
+            self.version = version
+
+    def ensure_current(self):
+        if self.version is None or self.version != get_version('routes'):
+            self.rebuild()
+
+    def _advance_version(self):
+        """Publish a local change; stay current only if no other process changed the graph meanwhile."""
+        seen = self.version
+        new_version = bump_version('routes')
+        if seen is not None and new_version == seen + 1:
+            self.version = new_version
+
+    def flight_saved(self, flight_id, origin_id, destination_id, distance_km, name):
+        with self._lock:
+            if self.version is not None:
+                self._discard_flight(flight_id)
+                self.flights[flight_id] = (origin_id, destination_id, distance_km, name)
+                self.out_edges[origin_id][flight_id] = (destination_id, distance_km)
+            self._advance_version()
+
+    def flight_deleted(self, flight_id):
+        with self._lock:
+            if self.version is not None:
+                self._discard_flight(flight_id)
+            self._advance_version()
+
+    def _discard_flight(self, flight_id):
+        old = self.flights.pop(flight_id, None)
+        if old is not None:
+            self.out_edges[old[0]].pop(flight_id, None)
+
+    # ── queries ──────────────────────────────────
+
+    def airports_in_city(self, city_id):
+        return set(self.city_airports.get(city_id, ()))
+
+    def airport_by_code(self, code):
+        return self.codes.get(code.upper())
+
+    def search(self, sources, targets, k=3, max_legs=3):
+        """
+        Return up to `k` itineraries as (total_distance_km, [flight_id, ...]),
+        shortest first.
+        """
+        with self._lock:
+            out_edges = self.out_edges
+            results = []
+            expanded = defaultdict(int)
+            heap = [(0, 0, source, (source,), ()) for source in sources]
+            heapq.heapify(heap)
+
+            while heap and len(results) < k:
+                cost, legs, airport_id, visited, path = heapq.heappop(heap)
+                if path and airport_id in targets:
+                    results.append((cost, list(path)))
+                    continue
+                if legs == max_legs:
+                    continue
+                state = (airport_id, legs)
+                expanded[state] += 1
+                if expanded[state] > k:
+                    continue
+                last_leg = legs + 1 == max_legs
+                for flight_id, (destination_id, distance_km) in out_edges.get(airport_id, {}).items():
+                    if destination_id in visited:
+                        continue
+                    # prune branches that can no longer end at a target
+                    if last_leg and destination_id not in targets:
+                        continue
+                    if expanded[(destination_id, legs + 1)] >= k and destination_id not in targets:
+                        continue
+                    heapq.heappush(heap, (
+                        cost + distance_km, legs + 1, destination_id,
+                        visited + (destination_id,), path + (flight_id,),
+                    ))
+            return results
+
+    def find_itineraries(self, sources, targets, k=3, max_legs=3):
+        """
+        `search` and `describe_itinerary` under one hold of the lock, so a
+        flight deleted by a concurrent commit cannot vanish between the two.
+        """
+        with self._lock:
+            return [
+                self.describe_itinerary(total, flight_ids)
+                for total, flight_ids in self.search(sources, targets, k=k, max_legs=max_legs)
+            ]
+
+    def describe_airport(self, airport_id):
+        code, name, city_id = self.airports[airport_id]
+        return {'id': airport_id, 'code': code, 'name': name, 'city': {'id': city_id, 'name': self.cities.get(city_id)}}
+
+    def describe_itinerary(self, total_distance_km, flight_ids):
+        legs = []
+        for flight_id in flight_ids:
+            origin_id, destination_id, distance_km, name = self.flights[flight_id]
+            legs.append({
+                'id': flight_id,
+                'name': name,
+                'origin': self.describe_airport(origin_id),
+                'destination': self.describe_airport(destination_id),
+                'distance_km': distance_km,
+            })
+        return {'total_distance_km': total_distance_km, 'legs': len(legs), 'flights': legs}
+
+
+route_index = RouteIndex()
+
+
+def get_route_index():
+    route_index.ensure_current()
+    return route_index
+
+
+def flight_saved(flight):
+    values = (flight.pk, flight.origin_id, flight.destination_id, flight.distance_km, flight.name)
+    transaction.on_commit(lambda: route_index.flight_saved(*values))
+
+
+def flight_deleted(flight):
+    flight_id = flight.pk
+    transaction.on_commit(lambda: route_index.flight_deleted(flight_id))
+
+
+def places_changed():
+    """Airport/City edits are rare: let every process rebuild on its next search."""
+    transaction.on_commit(lambda: bump_version('routes'))
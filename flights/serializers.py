@@ -1,8 +1,12 @@
 # flights/serializers.py (فایل جدید)
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
-from .models import Flight, Passenger, Airport, City
+from .models import BookingRequest, Flight, Passenger, Airport, City, RouteStats, AirportStats, CityStats
+from .instrumentation import TimedRepresentationMixin
+from .roles import is_flight_manager
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -10,7 +14,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
         token['username'] = user.username
-        token['is_flight_manager'] = user.groups.filter(name='Flight Managers').exists()
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token['is_flight_manager'] = is_flight_manager(user)
         return token
 
 
@@ -28,26 +34,23 @@ class AirportSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'code', 'city']
 
 
-class FlightSerializer(serializers.ModelSerializer):
+class FlightSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     origin = AirportSerializer(read_only=True)
     destination = AirportSerializer(read_only=True)
     origin_id = serializers.IntegerField(write_only=True)
     destination_id = serializers.IntegerField(write_only=True)
-    passenger_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Flight
         fields = [
             'id', 'name', 'origin', 'destination',
             'origin_id', 'destination_id',
-            'distance_km', 'passenger_count'
+            'distance_km', 'capacity', 'passenger_count'
         ]
-    
-    def get_passenger_count(self, obj):
-        return obj.passengers.count()
+        read_only_fields = ['passenger_count']
 
 
-class PassengerSerializer(serializers.ModelSerializer):
+class PassengerSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     
     class Meta:
@@ -65,7 +68,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password', 'first_name', 'last_name', 'groups', 'is_flight_manager']
     
     def get_is_flight_manager(self, obj):
-        return obj.groups.filter(name='Flight Managers').exists()
+        return is_flight_manager(obj)
     
     def create(self, validated_data):
         user = User.objects.create_user(
@@ -75,4 +78,145 @@ class UserSerializer(serializers.ModelSerializer):
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', '')
         )
-        return user
\ No newline at end of file
+        return user
+
+
+class BookingPairSerializer(serializers.Serializer):
+    flight = serializers.IntegerField(min_value=1)
+    passenger = serializers.IntegerField(min_value=1)
+
+
+class BookingRequestSerializer(serializers.ModelSerializer):
+    """A queued join (see flights.booking); `status_url` is where to poll for the outcome."""
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookingRequest
+        fields = ['id', 'flight', 'passenger', 'status', 'created_at', 'processed_at', 'status_url']
+
+    def get_status_url(self, obj):
+        return reverse('booking_status', args=[obj.pk])
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    """Payload of POST /api/flights/bulk-bookings/: pairs to add and/or remove."""
+    max_items = getattr(settings, 'FLIGHTS_BULK_BOOKING_MAX_ITEMS', 1000)
+
+    add = BookingPairSerializer(many=True, required=False, default=list)
+    remove = BookingPairSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        total = len(attrs['add']) + len(attrs['remove'])
+        if not total:
+            raise serializers.ValidationError('Provide at least one item in "add" or "remove".')
+        if total > self.max_items:
+            raise serializers.ValidationError(f'At most {self.max_items} items per request.')
+        return attrs
+
+
+class BulkOnboardingSerializer(serializers.Serializer):
+    """
+    Payload of POST /api/users/bulk_register/.
+
+    Rows are validated one by one by flights.onboarding, so a bad row is
+    reported in the response instead of rejecting the whole request.
+    """
+    max_items = getattr(settings, 'FLIGHTS_BULK_ONBOARDING_MAX_ITEMS', 5000)
+
+    users = serializers.ListField(
+        child=serializers.DictField(child=serializers.CharField(allow_blank=True, allow_null=True)),
+        allow_empty=False,
+        help_text='username, password, and optionally email, first_name, last_name, name, phone, passport',
+    )
+
+    def validate_users(self, users):
+        if len(users) > self.max_items:
+            raise serializers.ValidationError(
+                f'At most {self.max_items} users per request; use the onboard_passengers command for more.'
+            )
+        return users
+
+
+class RouteSearchQuerySerializer(serializers.Serializer):
+    """Query parameters of GET /api/routes/: one origin and one destination, by airport or city."""
+    origin = serializers.CharField(required=False, help_text='Origin airport id or code')
+    destination = serializers.CharField(required=False, help_text='Destination airport id or code')
+    origin_city = serializers.IntegerField(required=False)
+    destination_city = serializers.IntegerField(required=False)
+    k = serializers.IntegerField(min_value=1, max_value=10, default=3)
+    max_legs = serializers.IntegerField(min_value=1, max_value=5, default=3)
+
+    def validate(self, attrs):
+        for side in ('origin', 'destination'):
+            if (side in attrs) == (f'{side}_city' in attrs):
+                raise serializers.ValidationError(f'Provide exactly one of "{side}" or "{side}_city".')
+        return attrs
+
+
+class FlightFilterSerializer(serializers.Serializer):
+    """Query parameters of GET /api/flights/ (see flights.filters)."""
+    origin = serializers.CharField(required=False, max_length=10, help_text='Origin airport id or code')
+    destination = serializers.CharField(required=False, max_length=10, help_text='Destination airport id or code')
+    origin_city = serializers.IntegerField(required=False, min_value=1)
+    destination_city = serializers.IntegerField(required=False, min_value=1)
+    min_distance = serializers.IntegerField(required=False, min_value=0)
+    max_distance = serializers.IntegerField(required=False, min_value=0)
+    name = serializers.CharField(required=False, max_length=50)
+
+    def validate(self, attrs):
+        if attrs.get('min_distance', 0) > attrs.get('max_distance', float('inf')):
+            raise serializers.ValidationError('"min_distance" must not exceed "max_distance".')
+        return attrs
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Query parameters of GET /api/autocomplete/."""
+    q = serializers.CharField(max_length=100, trim_whitespace=True)
+    type = serializers.ChoiceField(choices=['airport', 'city'], required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    offset = serializers.IntegerField(min_value=0, max_value=1000, default=0)
+
+
+class RouteStatsSerializer(serializers.ModelSerializer):
+    origin = AirportSerializer(read_only=True)
+    destination = AirportSerializer(read_only=True)
+    load_factor = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = RouteStats
+        fields = [
+            'origin', 'destination', 'flight_count', 'passenger_count',
+            'seats', 'seated_passengers', 'load_factor',
+        ]
+
+
+class AirportStatsSerializer(serializers.ModelSerializer):
+    airport = AirportSerializer(read_only=True)
+    passengers = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = AirportStats
+        fields = [
+            'airport', 'passengers', 'departing_flights', 'arriving_flights',
+            'departing_passengers', 'arriving_passengers',
+        ]
+
+
+class CityStatsSerializer(serializers.ModelSerializer):
+    city = CitySerializer(read_only=True)
+    passengers = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = CityStats
+        fields = [
+            'city', 'passengers', 'departing_flights', 'arriving_flights',
+            'departing_passengers', 'arriving_passengers',
+        ]
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """Query parameters of GET /api/stats/<kind>/; `ordering` is checked against the kind by the view."""
+    ordering = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 200), default=50,
+    )
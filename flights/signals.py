@@ -0,0 +1,202 @@
+"""
+Signal handlers that keep denormalized flight data in sync.
+
+Flight.passenger_count mirrors the number of rows in the
+flights_flight_passengers through table. Every path that touches that table
+(forward and reverse `add`/`remove`/`clear`/`set`, admin edits, and the cascade
+when a Passenger is deleted) adjusts the count inside the same transaction as
+the through-table write.
+
+Once the counts are adjusted, `passengers_changed` is sent with the same
+{flight_id: delta} mapping. The booking service (flights.booking) writes the
+through table directly and sends it as well, so receivers interested in
+membership changes only need to listen to this one signal.
+
+Catalog changes (flights, airports, cities, membership) also bump the
+response-cache version used by flights.cache (and the versions of the changed
+flights, which key the HTML fragments of flights.fragments), and group membership changes
+drop the cached roles of flights.roles. Committed flight changes are applied
+to the in-memory route graph of flights.routes; airport/city changes also
+invalidate the autocomplete index of flights.autocomplete. Membership, flight
+and airport changes also update the aggregates of flights.stats, and flight
+and membership changes are recorded in the change feed of flights.events.
+"""
+
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, pre_delete, pre_save, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .cache import invalidate_catalog
+from .models import Airport, City, Flight, Passenger
+from .roles import forget_all_roles, forget_user_roles
+from . import autocomplete, events, routes, stats
+
+FlightPassengers = Flight.passengers.through
+
+# sender=Flight, deltas={flight_id: signed change in passenger count}
+passengers_changed = Signal()
+
+
+def apply_passenger_deltas(deltas):
+    """Persist count changes and notify `passengers_changed` receivers."""
+    deltas = {flight_id: delta for flight_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Flight.objects.apply_passenger_deltas(deltas)
+    passengers_changed.send(sender=Flight, deltas=deltas)
+
+
+def _deltas_for(instance, reverse, pk_set, sign):
+    """Translate an m2m_changed payload into {flight_id: delta}."""
+    if not reverse:
+        return {instance.pk: sign * len(pk_set)}
+    return {flight_id: sign for flight_id in pk_set}
+
+
+@receiver(m2m_changed, sender=FlightPassengers)
+def update_passenger_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Flight.passenger_count in step with the passengers relation.
+
+    - post_add: Django reports only the ids it actually inserted, so the count
+      can be incremented directly.
+    - pre_remove / pre_clear: Django reports the *requested* ids, so the rows
+      that really exist are looked up before deletion and applied afterwards.
+    """
+    if action == 'post_add':
+        apply_passenger_deltas(_deltas_for(instance, reverse, pk_set, +1))
+
+    elif action in ('pre_remove', 'pre_clear'):
+        rows = FlightPassengers.objects.filter(**{
+            'passenger_id' if reverse else 'flight_id': instance.pk,
+        })
+        if action == 'pre_remove':
+            rows = rows.filter(**{'flight_id__in' if reverse else 'passenger_id__in': pk_set})
+        existing = set(rows.values_list('flight_id' if reverse else 'passenger_id', flat=True))
+        instance._pending_passenger_deltas = _deltas_for(instance, reverse, existing, -1)
+
+    elif action in ('post_remove', 'post_clear'):
+        deltas = instance.__dict__.pop('_pending_passenger_deltas', None)
+        if deltas:
+            apply_passenger_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Passenger)
+def remember_passenger_flights(sender, instance, **kwargs):
+    """Deleting a Passenger cascades through rows without firing m2m_changed."""
+    instance._pending_passenger_deltas = {
+        flight_id: -1
+        for flight_id in FlightPassengers.objects.filter(passenger_id=instance.pk)
+        .values_list('flight_id', flat=True)
+    }
+
+
+@receiver(post_delete, sender=Passenger)
+def release_passenger_seats(sender, instance, **kwargs):
+    deltas = instance.__dict__.pop('_pending_passenger_deltas', None)
+    if deltas:
+        apply_passenger_deltas(deltas)
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_catalog_cache(sender, **kwargs):
+    # any number of flights show the airport or city
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def invalidate_flight_cache(sender, instance, **kwargs):
+    invalidate_catalog([instance.pk])
+
+
+@receiver(passengers_changed, sender=Flight)
+def invalidate_passenger_counts_cache(sender, deltas, **kwargs):
+    invalidate_catalog(list(deltas))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        forget_user_roles([instance.pk])
+    elif pk_set:
+        forget_user_roles(pk_set)
+    else:
+        # group.user_set.clear(): the affected users are no longer known
+        forget_all_roles()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_roles(sender, **kwargs):
+    forget_all_roles()
+
+
+@receiver(post_save, sender=Flight)
+def index_saved_flight(sender, instance, **kwargs):
+    routes.flight_saved(instance)
+
+
+@receiver(post_delete, sender=Flight)
+def unindex_deleted_flight(sender, instance, **kwargs):
+    routes.flight_deleted(instance)
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def reindex_places(sender, **kwargs):
+    routes.places_changed()
+    autocomplete.places_changed()
+
+
+@receiver(passengers_changed, sender=Flight)
+def update_passenger_stats(sender, deltas, **kwargs):
+    stats.passengers_changed(deltas)
+
+
+@receiver(pre_save, sender=Flight)
+@receiver(pre_delete, sender=Flight)
+def remember_flight_stats(sender, instance, **kwargs):
+    stats.remember_flight(instance)
+
+
+@receiver(post_save, sender=Flight)
+def update_saved_flight_stats(sender, instance, **kwargs):
+    stats.flight_saved(instance)
+
+
+@receiver(post_delete, sender=Flight)
+def update_deleted_flight_stats(sender, instance, **kwargs):
+    stats.flight_deleted(instance)
+
+
+@receiver(pre_save, sender=Airport)
+def remember_airport_city(sender, instance, **kwargs):
+    stats.remember_airport(instance)
+
+
+@receiver(post_save, sender=Airport)
+def move_airport_stats(sender, instance, **kwargs):
+    stats.airport_saved(instance)
+
+
+@receiver(post_save, sender=Flight)
+def record_saved_flight(sender, instance, created, **kwargs):
+    events.flight_saved(instance, created)
+
+
+@receiver(post_delete, sender=Flight)
+def record_deleted_flight(sender, instance, **kwargs):
+    events.flight_deleted(instance)
+
+
+@receiver(passengers_changed, sender=Flight)
+def record_passenger_counts(sender, deltas, **kwargs):
+    events.passengers_changed(deltas)
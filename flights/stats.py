@@ -0,0 +1,207 @@
+"""
+Route, airport and city statistics.
+
+RouteStats, AirportStats and CityStats hold running totals (flights,
+passengers, seats) so dashboards read precomputed rows instead of grouping
+over Flight and the through table on every refresh.
+
+They are kept up to date incrementally from flights.signals:
+
+- `passengers_changed` (every join/leave path, including bulk bookings and
+  passenger deletion) shifts the passenger totals of the affected routes,
+  airports and cities;
+- Flight saves and deletes subtract the flight's previous contribution (read
+  before the write) and add the new one, so route, capacity or endpoint edits
+  move the numbers to the right rows;
+- an Airport moved to another city carries its totals over.
+
+Every change is a `SET col = col + n` UPDATE inside the caller's transaction.
+Rows are updated in a fixed order to avoid lock-order deadlocks between
+concurrent bookings.
+
+Bulk paths that bypass model signals (catalog import, synthetic datasets,
+passenger-count repairs) call `rebuild_stats`, which recomputes everything
+with a few GROUP BY queries; `manage.py rebuild_stats` does the same.
+"""
+
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import AirportStats, CityStats, Flight, RouteStats
+
+# update order: routes, then airports, then cities, each by key
+_MODEL_ORDER = {RouteStats: 0, AirportStats: 1, CityStats: 2}
+
+
+def _new_changes():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def _flight_states(flight_ids):
+    """Return {flight_id: (origin, destination, origin city, destination city, capacity, passengers)}."""
+    return {
+        pk: state
+        for pk, *state in Flight.objects.filter(pk__in=flight_ids).values_list(
+            'pk', 'origin_id', 'destination_id', 'origin__city_id', 'destination__city_id',
+            'capacity', 'passenger_count',
+        )
+    }
+
+
+def _contribute(changes, state, flights, passengers):
+    """Add `flights` flights and `passengers` passengers of a flight shaped like `state`."""
+    origin_id, destination_id, origin_city_id, destination_city_id, capacity, _ = state
+    route = changes[(RouteStats, (origin_id, destination_id))]
+    route['flight_count'] += flights
+    route['passenger_count'] += passengers
+    if capacity is not None:
+        route['seats'] += flights * capacity
+        route['seated_passengers'] += passengers
+
+    for model, departing_key, arriving_key in (
+        (AirportStats, origin_id, destination_id),
+        (CityStats, origin_city_id, destination_city_id),
+    ):
+        departing = changes[(model, departing_key)]
+        departing['departing_flights'] += flights
+        departing['departing_passengers'] += passengers
+        arriving = changes[(model, arriving_key)]
+        arriving['arriving_flights'] += flights
+        arriving['arriving_passengers'] += passengers
+
+
+def _lookup(model, key):
+    if model is RouteStats:
+        return {'origin_id': key[0], 'destination_id': key[1]}
+    return {'pk': key}
+
+
+def _apply(changes, create=False):
+    """Write the accumulated deltas; with `create=True` missing rows are inserted first."""
+    for model, key in sorted(changes, key=lambda item: (_MODEL_ORDER[item[0]], item[1])):
+        fields = {name: delta for name, delta in changes[(model, key)].items() if delta}
+        if not fields:
+            continue
+        lookup = _lookup(model, key)
+        if create:
+            model.objects.bulk_create([model(**lookup)], ignore_conflicts=True)
+        model.objects.filter(**lookup).update(**{
+            name: F(name) + delta for name, delta in fields.items()
+        })
+
+
+# ───────────────────────────────────────────────
+# Incremental updates (called from flights.signals)
+# ───────────────────────────────────────────────
+
+def passengers_changed(deltas):
+    changes = _new_changes()
+    for flight_id, state in _flight_states(deltas).items():
+        _contribute(changes, state, 0, deltas[flight_id])
+    _apply(changes)
+
+
+def remember_flight(flight):
+    """Before a save/delete: record the flight's current contribution."""
+    if flight.pk is not None:
+        flight._stats_before = _flight_states([flight.pk]).get(flight.pk)
+
+
+def flight_saved(flight):
+    before = flight.__dict__.pop('_stats_before', None)
+    after = _flight_states([flight.pk]).get(flight.pk)
+    changes = _new_changes()
+    if before is not None:
+        _contribute(changes, before, -1, -before[-1])
+    if after is not None:
+        _contribute(changes, after, +1, after[-1])
+    _apply(changes, create=True)
+
+
+def flight_deleted(flight):
+    before = flight.__dict__.pop('_stats_before', None)
+    if before is not None:
+        changes = _new_changes()
+        _contribute(changes, before, -1, -before[-1])
+        _apply(changes)
+
+
+def remember_airport(airport):
+    if airport.pk is not None:
+        airport._stats_city_id = (
+            type(airport).objects.filter(pk=airport.pk).values_list('city_id', flat=True).first()
+        )
+
+
+def airport_saved(airport):
+    old_city_id = airport.__dict__.pop('_stats_city_id', None)
+    if old_city_id is None or old_city_id == airport.city_id:
+        return
+    totals = AirportStats.objects.filter(pk=airport.pk).values(
+        'departing_flights', 'arriving_flights', 'departing_passengers', 'arriving_passengers',
+    ).first()
+    if totals:
+        changes = _new_changes()
+        for name, value in totals.items():
+            changes[(CityStats, old_city_id)][name] -= value
+            changes[(CityStats, airport.city_id)][name] += value
+        _apply(changes, create=True)
+
+
+# ───────────────────────────────────────────────
+# Full rebuild
+# ───────────────────────────────────────────────
+
+def rebuild_stats(apps=global_apps):
+    """
+    Recompute every statistics row from Flight.passenger_count.
+
+    `apps` lets data migrations pass their historical app registry.
+    Returns the number of (route, airport, city) rows written.
+    """
+    Flight = apps.get_model('flights', 'Flight')
+    RouteStats = apps.get_model('flights', 'RouteStats')
+    AirportStats = apps.get_model('flights', 'AirportStats')
+    CityStats = apps.get_model('flights', 'CityStats')
+    zero = lambda expression: Coalesce(expression, 0)
+
+    with transaction.atomic():
+        routes = [
+            RouteStats(
+                origin_id=origin_id, destination_id=destination_id, flight_count=flights,
+                passenger_count=passengers, seats=seats, seated_passengers=seated,
+            )
+            for origin_id, destination_id, flights, passengers, seats, seated
+            in Flight.objects.order_by().values_list('origin_id', 'destination_id').annotate(
+                flights=Count('pk'),
+                passengers=zero(Sum('passenger_count')),
+                seats=zero(Sum('capacity')),
+                seated=zero(Sum('passenger_count', filter=Q(capacity__isnull=False))),
+            )
+        ]
+
+        places = {AirportStats: defaultdict(dict), CityStats: defaultdict(dict)}
+        for model, departing_key, arriving_key in (
+            (AirportStats, 'origin_id', 'destination_id'),
+            (CityStats, 'origin__city_id', 'destination__city_id'),
+        ):
+            for direction, key_field in (('departing', departing_key), ('arriving', arriving_key)):
+                rows = Flight.objects.order_by().values_list(key_field).annotate(
+                    flights=Count('pk'), passengers=zero(Sum('passenger_count')),
+                )
+                for key, flights, passengers in rows:
+                    places[model][key][f'{direction}_flights'] = flights
+                    places[model][key][f'{direction}_passengers'] = passengers
+
+        RouteStats.objects.all().delete()
+        AirportStats.objects.all().delete()
+        CityStats.objects.all().delete()
+        RouteStats.objects.bulk_create(routes, batch_size=1000)
+        for model, rows in places.items():
+            model.objects.bulk_create([model(pk=key, **values) for key, values in rows.items()], batch_size=1000)
+
+    return len(routes), len(places[AirportStats]), len(places[CityStats])
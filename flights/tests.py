@@ -1,3 +1,1267 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import global_settings, settings
+from django.contrib.auth.models import Group, User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import VerifiedTokenCache, verified_tokens
+from .benchmark import (
+    SCENARIOS, BenchmarkContext, check_budgets, check_query_plans, load_budgets, run_scenario,
+)
+from .booking import book_seat, process_booking_queue
+from .cache import bump_version, invalidate_catalog
+from .dataset import delete_dataset, generate_dataset
+from .db_router import PRIMARY_COOKIE, ReplicaPinningMiddleware, ReplicaRouter, replica_health
+from .events import event_stream
+from .fastpath import FastJSONRenderer, flight_rows, row_builder
+from .forms import FlightForm
+from .manifest import MANIFEST_COLUMNS
+from .models import (
+    Airport, AirportStats, BookingStatus, City, CityStats, Flight, FlightEvent, Passenger, RouteStats,
+)
+from .onboarding import web_pool
+from .ratelimit import Rule, TokenBucketStore
+from .roles import FLIGHT_MANAGERS, GROUP_ORGANIZERS, get_user_roles, is_flight_manager
+from .routes import route_index
+from .serializers import CustomTokenObtainPairSerializer, FlightSerializer
+from .stats import rebuild_stats
+from airport_project import urls as project_urls
+
+# the project's URLs as routed with FLIGHTS_STATELESS_AUTH (ROOT_URLCONF=__name__)
+urlpatterns = project_urls.stateless_admin_urls + project_urls.urlpatterns
+
+
+def create_catalog(flights=0, passengers=0):
+    """Two cities, four airports, `flights` flights and `passengers` passengers without bookings."""
+    cities = City.objects.bulk_create([City(name='West'), City(name='East')])
+    airports = [
+        Airport.objects.create(code=f'AP{i}', name=f'Airport {i}', city=cities[i % 2]) for i in range(4)
+    ]
+    for i in range(flights):
+        Flight.objects.create(
+            name=f'FL{i}', origin=airports[i % 4], destination=airports[(i + 1) % 4], distance_km=100 + i,
+        )
+    for i in range(passengers):
+        create_passenger(f'passenger{i}')
+
+
+def create_passenger(username, **fields):
+    user = User.objects.create_user(username)
+    return Passenger.objects.create(user=user, name=username.title(), passport=f'X{user.pk:07d}', **fields)
+
+
+class PassengerCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=2, passengers=3)
+
+    def assertCounts(self):
+        for flight in Flight.objects.all():
+            self.assertEqual(flight.passenger_count, flight.passengers.count(), flight)
+
+    def test_m2m_changes_adjust_the_count(self):
+        first, second = Flight.objects.all()
+        a, b, c = Passenger.objects.all()
+        first.passengers.add(a, b)
+        first.passengers.add(a)  # already there: no delta
+        c.flights.add(first, second)
+        self.assertCounts()
+        self.assertEqual(Flight.objects.get(pk=first.pk).passenger_count, 3)
+
+        first.passengers.remove(a, c)
+        b.flights.remove(second)  # not booked: no delta
+        self.assertCounts()
+        second.passengers.set([a, b])
+        c.flights.clear()
+        self.assertCounts()
+
+        a.delete()
+        self.assertCounts()
+        self.assertEqual(Flight.objects.get(pk=second.pk).passenger_count, 1)
+
+    def test_rebuild_passenger_counts(self):
+        flight = Flight.objects.first()
+        flight.passengers.add(*Passenger.objects.all())
+        Flight.objects.update(passenger_count=42)
+        call_command('rebuild_passenger_counts', str(flight.pk), stdout=StringIO())
+        self.assertEqual(Flight.objects.get(pk=flight.pk).passenger_count, 3)
+        self.assertEqual(Flight.objects.exclude(pk=flight.pk).get().passenger_count, 42)
+
+        call_command('rebuild_passenger_counts', stdout=StringIO())
+        self.assertCounts()
+
+
+class SeatBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=1, passengers=3)
+        cls.flight = Flight.objects.get()
+        Flight.objects.update(capacity=1)
+        cls.passengers = list(Passenger.objects.select_related('user').order_by('pk'))
+
+    def test_capacity_is_checked_by_the_update(self):
+        stale = Flight.objects.get()  # loaded while the seat is still free
+        self.assertFalse(stale.is_full)
+        first, second, _ = self.passengers
+        self.assertEqual(book_seat(self.flight.pk, first.pk), BookingStatus.BOOKED)
+        self.assertEqual(book_seat(stale.pk, second.pk), BookingStatus.FULL)
+        self.assertEqual(book_seat(self.flight.pk, first.pk), BookingStatus.ALREADY_JOINED)
+
+        self.assertEqual(list(self.flight.passengers.all()), [first])
+        self.assertEqual(Flight.objects.get().passenger_count, 1)
+
+    def test_join_answers_409_when_full(self):
+        first, second, _ = self.passengers
+        self.client.force_login(first.user)
+        self.assertEqual(self.client.post(f'/api/flights/{self.flight.pk}/join/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/flights/{self.flight.pk}/join/').status_code, 400)
+
+        self.client.force_login(second.user)
+        response = self.client.post(f'/api/flights/{self.flight.pk}/join/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], BookingStatus.FULL)
+        self.assertRedirects(
+            self.client.post(f'/flights/{self.flight.pk}/register/'), f'/flights/{self.flight.pk}/',
+            fetch_redirect_response=False,
+        )
+        self.assertFalse(second.flights.exists())
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=25)
+
+    def test_pages_follow_the_id_order(self):
+        ids, url = [], '/api/flights/?page_size=10'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 10)
+            ids.extend(flight['id'] for flight in page['results'])
+            url = page['next']
+        self.assertEqual(ids, list(Flight.objects.order_by('pk').values_list('pk', flat=True)))
+
+        last = self.client.get(page['previous']).json()
+        self.assertEqual([flight['id'] for flight in last['results']], ids[10:20])
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(len(self.client.get('/api/flights/', {'page_size': 7}).json()['results']), 7)
+        with mock.patch('flights.pagination.IdCursorPagination.max_page_size', 20):
+            self.assertEqual(len(self.client.get('/api/flights/', {'page_size': 1000}).json()['results']), 20)
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=3)
+        cls.flight = Flight.objects.first()
+
+    def setUp(self):
+        caches['catalog'].clear()
+
+    def test_etag_and_invalidation(self):
+        url = f'/api/flights/{self.flight.pk}/'
+        first = self.client.get(url)
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, first.content)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.objects.get(pk=self.flight.pk).save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.objects.filter(pk=self.flight.pk).update(name='RENAMED')
+            invalidate_catalog()
+        self.assertEqual(self.client.get(url).json()['name'], 'RENAMED')
+        self.assertEqual(self.client.get('/api/flights/').json()['results'][0]['name'], 'RENAMED')
+
+
+class RoleCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('roles-user')
+        cls.managers = Group.objects.create(name=FLIGHT_MANAGERS)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def roles(self):
+        # a fresh instance per request, as the authentication backends load it
+        return get_user_roles(User.objects.get(pk=self.user.pk))
+
+    def test_roles_are_cached_until_membership_changes(self):
+        self.assertEqual(self.roles(), frozenset())
+        with self.assertNumQueries(1):
+            self.roles()  # the user query only
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.managers)
+        self.assertEqual(self.roles(), {FLIGHT_MANAGERS})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.managers.name = 'Renamed'
+            self.managers.save()
+        self.assertEqual(self.roles(), {'Renamed'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.managers.user_set.clear()
+        self.assertEqual(self.roles(), frozenset())
+
+    def test_token_claim_is_trusted(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(is_flight_manager(self.user, {'is_flight_manager': True}))
+        self.assertFalse(is_flight_manager(self.user, {'is_flight_manager': False}))
+
+
+class JWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=2, passengers=1)
+        passenger = Passenger.objects.select_related('user').get()
+        passenger.flights.add(Flight.objects.first())
+        cls.user = passenger.user
+
+    def setUp(self):
+        verified_tokens.clear()
+        self.addCleanup(verified_tokens.clear)
+
+    def test_verified_token_lru(self):
+        tokens = VerifiedTokenCache(maxsize=2, max_ttl=60)
+        now = time.time()
+        tokens.set('a', {'exp': now + 30})
+        tokens.set('b', {'exp': now + 30})
+        tokens.get('a')
+        tokens.set('c', {'exp': now + 30})
+        self.assertIsNone(tokens.get('b'))  # least recently used
+        self.assertIsNotNone(tokens.get('a'))
+
+        tokens.set('expired', {'exp': now - 1})
+        self.assertIsNone(tokens.get('expired'))
+        with mock.patch('flights.authentication.time.time', return_value=now + 31):
+            self.assertIsNone(tokens.get('a'))
+        with mock.patch('flights.authentication.time.time', return_value=now + 61):
+            tokens.set('long', {'exp': now + 3600})  # capped by max_ttl
+        with mock.patch('flights.authentication.time.time', return_value=now + 122):
+            self.assertIsNone(tokens.get('long'))
+
+    def test_token_is_verified_once(self):
+        access = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+        self.assertEqual(self.client.get('/api/flights/my_flights/', **headers).status_code, 200)
+        with mock.patch('rest_framework_simplejwt.authentication.JWTAuthentication.get_validated_token') as verify:
+            response = self.client.get('/api/flights/my_flights/', **headers)
+        self.assertEqual(response.status_code, 200)
+        verify.assert_not_called()
+
+    def test_expired_access_cookie_is_refreshed(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        access = refresh.access_token
+        access.set_exp(lifetime=-timedelta(seconds=1))
+        self.client.cookies['access_token'] = str(access)
+        self.assertEqual(self.client.get('/api/flights/my_flights/').status_code, 401)
+
+        self.client.cookies['refresh_token'] = str(refresh)
+        response = self.client.get('/api/flights/my_flights/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        renewed = response.cookies['access_token'].value
+        self.assertNotEqual(renewed, str(access))
+        self.assertEqual(str(AccessToken(renewed)['user_id']), str(self.user.pk))
+
+
+class BulkBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=2)
+        cls.organizer = User.objects.create_user('organizer')
+        cls.organizer.groups.add(Group.objects.create(name=GROUP_ORGANIZERS))
+        cls.passengers = [
+            create_passenger(f'traveller{i}', organizer=cls.organizer if i < 2 else None) for i in range(3)
+        ]
+
+    def setUp(self):
+        # roles cached by earlier tests for a reused user id
+        caches['default'].clear()
+
+    def _post(self, user, add=(), remove=()):
+        self.client.force_login(user)
+        return self.client.post('/api/flights/bulk-bookings/', {
+            'add': [{'flight': flight.pk, 'passenger': passenger.pk} for flight, passenger in add],
+            'remove': [{'flight': flight.pk, 'passenger': passenger.pk} for flight, passenger in remove],
+        }, content_type='application/json')
+
+    def test_organizer_books_their_passengers(self):
+        flight = Flight.objects.first()
+        own, other, _ = self.passengers
+        response = self._post(self.organizer, add=[(flight, own), (flight, other), (flight, own)])
+        self.assertEqual(response.status_code, 200)
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['booked', 'booked', 'already_joined'])
+
+        response = self._post(self.organizer, remove=[(flight, own)])
+        self.assertEqual(response.json()['results'][0]['status'], 'cancelled')
+        flight.refresh_from_db()
+        self.assertEqual(flight.passenger_count, 1)
+
+    def test_organizer_cannot_book_other_passengers(self):
+        flight = Flight.objects.first()
+        own, _, stranger = self.passengers
+        response = self._post(self.organizer, add=[(flight, own), (flight, stranger)])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['passengers'], [stranger.pk])
+        self.assertFalse(flight.passengers.exists())
+
+    def test_requires_organizer_or_manager(self):
+        flight = Flight.objects.first()
+        stranger = self.passengers[2]
+        self.assertEqual(self._post(stranger.user, add=[(flight, stranger)]).status_code, 403)
+
+        admin = User.objects.create_user('bulk-admin', is_staff=True)
+        response = self._post(admin, add=[(flight, stranger)])
+        self.assertEqual(response.json()['results'][0]['status'], 'booked')
+
+
+class RouteSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cities = City.objects.bulk_create([City(name='West'), City(name='East')])
+        cls.airports = {
+            code: Airport.objects.create(code=code, name=f'Airport {code}', city=cities[code == 'DDD'])
+            for code in ('AAA', 'BBB', 'CCC', 'DDD')
+        }
+        for name, origin, destination, distance_km in (
+            ('AB', 'AAA', 'BBB', 100), ('BC', 'BBB', 'CCC', 100), ('AC', 'AAA', 'CCC', 300),
+            ('CD', 'CCC', 'DDD', 50), ('AD', 'AAA', 'DDD', 1000), ('DA', 'DDD', 'AAA', 1),
+        ):
+            Flight.objects.create(
+                name=name, origin=cls.airports[origin], destination=cls.airports[destination],
+                distance_km=distance_km,
+            )
+
+    def setUp(self):
+        caches['catalog'].clear()  # a new 'routes' version: rebuild from this test's data
+
+    def routes(self, **query):
+        response = self.client.get('/api/routes/', query)
+        self.assertEqual(response.status_code, 200)
+        return [
+            ([flight['name'] for flight in itinerary['flights']], itinerary['total_distance_km'])
+            for itinerary in response.json()['results']
+        ]
+
+    def test_shortest_itineraries(self):
+        self.assertEqual(self.routes(origin='aaa', destination='DDD'), [
+            (['AB', 'BC', 'CD'], 250), (['AC', 'CD'], 350), (['AD'], 1000),
+        ])
+        self.assertEqual(self.routes(origin='AAA', destination='DDD', max_legs=2, k=1), [(['AC', 'CD'], 350)])
+        east = self.airports['DDD'].city_id
+        self.assertEqual(self.routes(origin_city=east, destination=str(self.airports['BBB'].pk)), [
+            (['DA', 'AB'], 101),
+        ])
+        self.assertEqual(self.client.get('/api/routes/', {'origin': 'XXX', 'destination': 'DDD'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/routes/', {'origin': 'AAA'}).status_code, 400)
+
+    def test_flight_changes_are_applied(self):
+        self.routes(origin='AAA', destination='DDD')
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.objects.create(
+                name='BD', origin=self.airports['BBB'], destination=self.airports['DDD'], distance_km=10,
+            )
+            Flight.objects.get(name='AD').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.routes(origin='AAA', destination='DDD', k=2), [
+                (['AB', 'BD'], 110), (['AB', 'BC', 'CD'], 250),
+            ])
+
+    def test_non_decimal_airport_id(self):
+        response = self.client.get('/api/routes/', {'origin': '²', 'destination': 'DDD'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_flight_deleted_during_a_search(self):
+        self.routes(origin='AAA', destination='DDD')  # build the index
+        search, deleters = route_index.search, []
+
+        def search_then_delete(*args, **kwargs):
+            itineraries = search(*args, **kwargs)
+            # another thread commits the deletion of a flight that was just found
+            deleter = threading.Thread(target=route_index.flight_deleted, args=(itineraries[0][1][0],))
+            deleter.start()
+            deleter.join(timeout=0.2)
+            deleters.append(deleter)
+            return itineraries
+
+        with mock.patch.object(route_index, 'search', side_effect=search_then_delete):
+            self.assertEqual(self.routes(origin='AAA', destination='DDD', k=1), [(['AB', 'BC', 'CD'], 250)])
+        deleters[0].join()
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tehran, mashhad = City.objects.create(name='Tehran'), City.objects.create(name='Mashhad')
+        for code, name, city in (
+            ('IKA', 'Imam Khomeini International', tehran),
+            ('THR', 'Mehrabad International', tehran),
+            ('MHD', 'Mashhad International', mashhad),
+        ):
+            Airport.objects.create(code=code, name=name, city=city)
+
+    def setUp(self):
+        caches['catalog'].clear()  # a new 'places' version: rebuild from this test's data
+
+    def lookup(self, q, **params):
+        response = self.client.get('/api/autocomplete/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        places = [place.get('code') or place['name'] for place in response.json()['results']]
+        return places, response.json()['next_offset']
+
+    def test_prefix_lookup(self):
+        self.assertEqual(self.lookup('thr'), (['THR'], None))
+        self.assertEqual(self.lookup('  TEH '), (['Tehran'], None))
+        self.assertEqual(self.lookup('ma'), (['Mashhad', 'MHD'], None))
+        self.assertEqual(self.lookup('ma', type='city'), (['Mashhad'], None))
+        self.assertEqual(self.lookup('int', limit=2), (['IKA', 'MHD'], 2))
+        self.assertEqual(self.lookup('int', limit=2, offset=2), (['THR'], None))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.lookup('xyz'), ([], None))
+        self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'a', 'type': 'x'}).status_code, 400)
+
+    def test_place_changes_rebuild_the_index(self):
+        self.assertEqual(self.lookup('tab'), ([], None))
+        with self.captureOnCommitCallbacks(execute=True):
+            Airport.objects.create(code='TBZ', name='Tabriz', city=City.objects.create(name='Tabriz'))
+        places, _ = self.lookup('tab')
+        self.assertEqual(sorted(places), ['TBZ', 'Tabriz'])
+
+
+class ManifestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=3, passengers=8)
+        flights = list(Flight.objects.order_by('pk'))
+        for i, passenger in enumerate(Passenger.objects.order_by('pk')):
+            passenger.flights.add(flights[i % 3], flights[i % 2])
+        cls.manager = User.objects.create_user('manifest-manager', is_staff=True)
+        cls.manager.groups.add(Group.objects.create(name=FLIGHT_MANAGERS))
+        cls.flight = Flight.objects.order_by('-passenger_count').first()
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.manager)
+
+    def stream(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_flight_manifest(self):
+        passengers = list(self.flight.passengers.order_by('pk').select_related('user'))
+        response, content = self.stream(f'/api/flights/{self.flight.pk}/manifest/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn(f'manifest-{self.flight.pk}.csv', response['Content-Disposition'])
+        lines = content.splitlines()
+        self.assertEqual(lines[0], ','.join(MANIFEST_COLUMNS))
+        self.assertEqual(
+            [line.split(',')[2] for line in lines[1:]], [str(passenger.pk) for passenger in passengers],
+        )
+
+        _, content = self.stream(f'/api/flights/{self.flight.pk}/manifest/', type='ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows[0]['username'], passengers[0].user.username)
+        self.assertEqual({row['flight_id'] for row in rows}, {self.flight.pk})
+
+        _, content = self.stream(f'/flights/{self.flight.pk}/manifest.csv')
+        self.assertEqual(len(content.splitlines()), len(passengers) + 1)
+
+    def test_all_manifests(self):
+        _, content = self.stream('/api/flights/manifest/', type='ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), Flight.passengers.through.objects.count())
+        self.assertEqual(rows, sorted(rows, key=lambda row: (row['flight_id'], row['passenger_id'])))
+
+        self.assertEqual(self.client.get('/api/flights/manifest/', {'type': 'xml'}).status_code, 400)
+        self.client.force_login(Passenger.objects.first().user)
+        self.assertEqual(self.client.get('/api/flights/manifest/').status_code, 403)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=5, passengers=2)
+        Flight.objects.filter(pk=Flight.objects.order_by('pk')[0].pk).update(capacity=1)
+        cls.flights = list(Flight.objects.select_related('origin__city', 'destination__city').order_by('pk'))
+        cls.tokens = [
+            str(CustomTokenObtainPairSerializer.get_token(passenger.user).access_token)
+            for passenger in Passenger.objects.select_related('user').order_by('pk')
+        ]
+
+    def setUp(self):
+        caches['catalog'].clear()
+
+    def bearer(self, token):
+        return {'Authorization': f'Bearer {token}'}
+
+    async def test_list_and_detail_match_the_api(self):
+        expected = FlightSerializer(self.flights, many=True).data
+        results, url = [], '/api/async/flights/?page_size=2'
+        while url:
+            page = (await self.async_client.get(url)).json()
+            results.extend(page['results'])
+            url = page['next']
+        self.assertEqual(results, expected)
+
+        flight = self.flights[1]
+        detail = await self.async_client.get(f'/api/async/flights/{flight.pk}/')
+        self.assertEqual(detail.json(), (await self.async_client.get(f'/api/flights/{flight.pk}/')).json())
+        cached = await self.async_client.get(
+            f'/api/async/flights/{flight.pk}/', headers={'If-None-Match': detail['ETag']},
+        )
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual((await self.async_client.get('/api/async/flights/999999/')).status_code, 404)
+        self.assertEqual((await self.async_client.get('/api/async/flights/?after_id=-1')).status_code, 400)
+
+    async def test_join_and_my_flights(self):
+        flight = self.flights[0]
+        join = f'/api/async/flights/{flight.pk}/join/'
+        self.assertEqual((await self.async_client.post(join)).status_code, 401)
+
+        first, second = self.tokens
+        self.assertEqual((await self.async_client.post(join, headers=self.bearer(first))).status_code, 200)
+        self.assertEqual((await self.async_client.post(join, headers=self.bearer(first))).status_code, 400)
+        full = await self.async_client.post(join, headers=self.bearer(second))
+        self.assertEqual(full.status_code, 409)
+        self.assertEqual(full.json()['status'], BookingStatus.FULL)
+
+        mine = await self.async_client.get('/api/async/flights/my_flights/', headers=self.bearer(first))
+        self.assertEqual([row['id'] for row in mine.json()['results']], [flight.pk])
+        mine = await self.async_client.get('/api/async/flights/my_flights/', headers=self.bearer(second))
+        self.assertEqual(mine.json()['results'], [])
+        self.assertEqual((await self.async_client.get('/api/async/flights/my_flights/')).status_code, 401)
+
+
+class FlightFormTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=1, passengers=0, seed=15)
+
+    def test_widget_renders_only_the_selected_airport(self):
+        airport = Airport.objects.first()
+        form = FlightForm(initial={'origin': airport.pk})
+        with self.assertNumQueries(1):
+            html = str(form['origin'])
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn(f'value="{airport.pk}" selected', html)
+
+    def test_invalid_airport_id(self):
+        for origin in ('abc', '²', '9' * 30):
+            with self.subTest(origin=origin):
+                form = FlightForm(data={'name': 'F1', 'origin': origin, 'destination': '999999', 'distance_km': 10})
+                self.assertFalse(form.is_valid())
+                self.assertEqual(set(form.errors), {'origin', 'destination'})
+                self.assertIn('<option value="" selected>', str(form['origin']))
+
+
+class DatasetTests(TestCase):
+    def test_generate_dataset(self):
+        created = generate_dataset(
+            cities=3, airports=6, flights=20, passengers=30, bookings_per_passenger=2, seed=1,
+        )
+        self.assertEqual(created['flights'], 20)
+        self.assertEqual(created['passengers'], 30)
+        self.assertEqual(created['bookings'], Flight.passengers.through.objects.count())
+
+        for flight in Flight.objects.all():
+            self.assertEqual(flight.passenger_count, flight.passengers.count())
+            if flight.capacity is not None:
+                self.assertLessEqual(flight.passenger_count, flight.capacity)
+
+    def test_delete_dataset(self):
+        generate_dataset(cities=2, airports=4, flights=10, passengers=10, seed=2)
+        delete_dataset()
+        self.assertFalse(Flight.objects.exists())
+        self.assertFalse(Flight.passengers.through.objects.exists())
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every benchmark scenario must stay within its stored query budget, and its
+    query count must not grow with the amount of data (no N+1).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(
+            cities=4, airports=8, flights=30, passengers=40, bookings_per_passenger=3, seed=3,
+        )
+
+    def setUp(self):
+        for alias in ('default', 'catalog'):
+            caches[alias].clear()
+
+    def measure(self):
+        context = BenchmarkContext()
+        return {
+            scenario.name: run_scenario(context, scenario, iterations=2, warmup=1)
+            for scenario in SCENARIOS
+        }
+
+    def test_query_budgets(self):
+        failures = check_budgets(self.measure(), load_budgets(), check_timing=False)
+        self.assertEqual(failures, [])
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small = self.measure()
+        # run the on-commit invalidation so the in-memory indexes see the new data
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_dataset(
+                cities=4, airports=8, flights=60, passengers=80, bookings_per_passenger=3,
+                seed=4, prefix='more',
+            )
+        large = self.measure()
+        for name, result in small.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(large[name]['queries'], result['queries'])
+
+    def test_flight_search_uses_indexes(self):
+        self.assertEqual(check_query_plans(BenchmarkContext()), [])
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=3, passengers=1, seed=13)
+
+    def setUp(self):
+        caches['catalog'].clear()
+
+    def test_sync_request_counts_queries(self):
+        response = self.client.get('/api/flights/')
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    async def test_async_requests_count_queries(self):
+        # the async ORM queries from sync_to_async threads, not the event loop's
+        for path in ('/api/async/flights/', '/api/flights/'):
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+
+class StatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(flights=4, passengers=4)
+        cls.flights = list(Flight.objects.select_related('origin').order_by('pk'))
+        cls.passengers = list(Passenger.objects.select_related('user').order_by('pk'))
+        cls.manager = User.objects.create_user('stats-manager')
+        cls.manager.groups.add(Group.objects.create(name=FLIGHT_MANAGERS))
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def snapshot(self):
+        """Non-empty statistics rows by model and natural key."""
+        rows = {}
+        for model, key in (
+            (RouteStats, ('origin_id', 'destination_id')), (AirportStats, ('airport_id',)), (CityStats, ('city_id',)),
+        ):
+            for row in model.objects.values():
+                row.pop('id', None)
+                natural = tuple(row.pop(name) for name in key)
+                if any(row.values()):
+                    rows[(model.__name__, natural)] = row
+        return rows
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_stats()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_incremental_updates_match_a_rebuild(self):
+        first, second, third, _ = self.flights
+        a, b, c, d = self.passengers
+        self.assertMatchesRebuild()
+
+        first.capacity = 2
+        first.save()
+        self.assertEqual(book_seat(first.pk, a.pk), BookingStatus.BOOKED)
+        first.passengers.add(b)
+        second.passengers.add(a, b, c)
+        c.flights.add(third)
+        self.assertMatchesRebuild()
+        self.assertEqual(RouteStats.objects.get(origin=first.origin_id).seated_passengers, 2)
+
+        second.passengers.remove(b)
+        d.flights.add(second)
+        c.delete()
+        self.assertMatchesRebuild()
+
+        # an edit moves the flight's totals to its new route, airports and cities
+        first.destination = third.origin
+        first.capacity = None
+        first.save()
+        self.assertMatchesRebuild()
+        second.delete()
+        self.assertMatchesRebuild()
+
+        airport = third.origin
+        airport.city = City.objects.exclude(pk=airport.city_id).first()
+        airport.save()
+        self.assertMatchesRebuild()
+
+    def test_stats_view(self):
+        first, second, _, _ = self.flights
+        first.passengers.add(*self.passengers[:3])
+        second.passengers.add(self.passengers[3])
+        self.client.force_login(self.manager)
+
+        routes = self.client.get('/api/stats/routes/').json()['results']
+        self.assertEqual([route['passenger_count'] for route in routes], [3, 1, 0, 0])
+        routes = self.client.get('/api/stats/routes/', {'ordering': 'passenger_count', 'limit': 2}).json()['results']
+        self.assertEqual([route['passenger_count'] for route in routes], [0, 0])
+        airports = self.client.get('/api/stats/airports/').json()['results']
+        # `first` arrives where `second` departs: 3 arriving + 1 departing passengers
+        self.assertEqual((airports[0]['airport']['id'], airports[0]['passengers']), (second.origin_id, 4))
+        airports = self.client.get('/api/stats/airports/', {'ordering': '-departing_passengers'}).json()['results']
+        self.assertEqual((airports[0]['airport']['id'], airports[0]['passengers']), (first.origin_id, 3))
+
+        for kind, ordering in (('routes', 'departing_flights'), ('cities', '-seats'), ('airports', 'bogus')):
+            with self.subTest(kind=kind, ordering=ordering):
+                response = self.client.get(f'/api/stats/{kind}/', {'ordering': ordering})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/stats/flights/').status_code, 404)
+
+    def test_stats_view_requires_a_flight_manager(self):
+        self.client.force_login(self.passengers[0].user)
+        self.assertEqual(self.client.get('/api/stats/routes/').status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/stats/cities/').status_code, 401)
+
+
+class FlightSearchFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=3, airports=6, flights=40, passengers=5, seed=6)
+        cls.flight = Flight.objects.select_related('origin').first()
+
+    def ids(self, query):
+        response = self.client.get('/api/flights/', query)
+        self.assertEqual(response.status_code, 200)
+        return {flight['id'] for flight in response.json()['results']}
+
+    def test_filters(self):
+        flight = self.flight
+        flights = Flight.objects.all()
+        cases = [
+            ({'origin': flight.origin.code.lower()}, flights.filter(origin=flight.origin_id)),
+            ({'origin': flight.origin_id, 'destination': flight.destination_id},
+             flights.filter(origin=flight.origin_id, destination=flight.destination_id)),
+            ({'destination_city': flight.destination.city_id},
+             flights.filter(destination__city=flight.destination.city_id)),
+            ({'min_distance': 1000, 'max_distance': 5000},
+             flights.filter(distance_km__range=(1000, 5000))),
+            ({'name': flight.name[:3]}, flights.filter(name__startswith=flight.name[:3])),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(self.ids({**query, 'page_size': 200}), set(expected.values_list('pk', flat=True)))
+
+    def test_non_ascii_digits(self):
+        self.assertEqual(self.ids({'origin': '²'}), set())  # not a decimal: looked up as a code
+        persian = str(self.flight.origin_id).translate(str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹'))
+        expected = Flight.objects.filter(origin=self.flight.origin_id).values_list('pk', flat=True)
+        self.assertEqual(self.ids({'origin': persian, 'page_size': 200}), set(expected))
+
+    def test_invalid_range(self):
+        response = self.client.get('/api/flights/', {'min_distance': 10, 'max_distance': 5})
+        self.assertEqual(response.status_code, 400)
+
+
+class CatalogImportTests(TestCase):
+    def _import(self, command, *args, content):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write(content)
+        self.addCleanup(Path(file.name).unlink)
+        stdout, stderr = StringIO(), StringIO()
+        call_command(command, *args, file.name, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_bad_ndjson_lines_are_skipped(self):
+        stdout, stderr = self._import('import_catalog', 'airports', content=(
+            '{"code": "AAA", "name": "Alpha", "city": "Ankara"}\n'
+            '{"code": "BBB", "name": \n'
+            '["CCC", "Charlie", "Cairo"]\n'
+            '{"code": "DDD", "city": "Dubai"}\n'
+        ))
+        self.assertIn('1 created, 0 updated, 3 skipped', stdout)
+        self.assertEqual(stderr.splitlines(), [
+            'line 2: invalid JSON: Expecting value: line 1 column 24 (char 23)',
+            'line 3: expected a JSON object, got list',
+            'line 4: missing "name"',
+        ])
+        self.assertQuerySetEqual(Airport.objects.values_list('code', flat=True), ['AAA'])
+
+    def test_over_long_and_out_of_range_values_are_skipped(self):
+        def ndjson(*records):
+            return ''.join(json.dumps(record) + '\n' for record in records)
+
+        stdout, stderr = self._import('import_catalog', 'airports', content=ndjson(
+            {'code': 'AAA', 'name': 'Alpha', 'city': 'Ankara'},
+            {'code': 'B' * 11, 'name': 'Bravo', 'city': 'Berlin'},
+            {'code': 'CCC', 'name': 'Charlie', 'city': 'C' * 101},
+        ))
+        self.assertIn('1 created, 0 updated, 2 skipped', stdout)
+        self.assertEqual(stderr.splitlines(), [
+            'line 2: "code" is longer than 10 characters',
+            'line 3: "city" is longer than 100 characters',
+        ])
+
+        flight = {'name': 'F1', 'origin': 'AAA', 'destination': 'AAA', 'distance_km': 10}
+        stdout, stderr = self._import('import_catalog', 'flights', content=ndjson(
+            flight, {**flight, 'name': 'F' * 51}, {**flight, 'name': 'F3', 'capacity': 2 ** 31},
+        ))
+        self.assertIn('1 created, 0 updated, 2 skipped', stdout)
+        self.assertEqual(stderr.splitlines(), [
+            'line 2: "name" is longer than 50 characters',
+            'line 3: "capacity" must not be greater than 2147483647',
+        ])
+
+    def test_bad_ndjson_lines_are_skipped_by_onboarding(self):
+        stdout, stderr = self._import('onboard_passengers', '--workers', '1', content=(
+            'not json\n'
+            '{"username": "erin", "password": "Str0ng-passphrase"}\n'
+        ))
+        self.assertIn('1 passengers created, 1 skipped', stdout)
+        self.assertTrue(stderr.startswith('line 1: invalid JSON'))
+        self.assertTrue(Passenger.objects.filter(user__username='erin').exists())
+
+
+@override_settings(
+    FLIGHTS_ONBOARDING_WEB_WORKERS=1,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class BulkOnboardingTests(TestCase):
+    def test_bulk_register(self):
+        admin = User.objects.create_user('onboarding-admin', is_staff=True)
+        User.objects.create_user('taken')
+        self.client.force_login(admin)
+        users = [
+            {'username': 'alice', 'password': 'Str0ng-passphrase', 'first_name': 'Alice'},
+            {'username': 'bob', 'password': 'Str0ng-passphrase', 'passport': 'X1234567'},
+            {'username': 'taken', 'password': 'Str0ng-passphrase'},
+            {'username': 'alice', 'password': 'Str0ng-passphrase'},
+            {'username': 'carol', 'password': '123'},
+            {'username': 'dave', 'password': 'Str0ng-passphrase', 'passport': 'P-000001'},
+        ]
+        response = self.client.post('/api/users/bulk_register/', {'users': users}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['created', 'created', 'error', 'error', 'error', 'error'])
+
+        alice = Passenger.objects.select_related('user').get(user__username='alice')
+        self.assertEqual(alice.passport, f'P-{alice.user_id:06d}')
+        self.assertEqual(alice.name, 'Alice')
+        self.assertTrue(alice.user.check_password('Str0ng-passphrase'))
+        self.assertEqual(Passenger.objects.get(user__username='bob').passport, 'X1234567')
+
+    # spawned workers hash with the hashers of the project settings
+    @override_settings(FLIGHTS_ONBOARDING_WEB_WORKERS=2, PASSWORD_HASHERS=global_settings.PASSWORD_HASHERS)
+    def test_requests_share_the_hashing_pool(self):
+        self.client.force_login(User.objects.create_user('onboarding-admin', is_staff=True))
+        for batch in range(2):
+            users = [{'username': f'pooled{batch}-{i}', 'password': 'Str0ng-passphrase'} for i in range(3)]
+            response = self.client.post('/api/users/bulk_register/', {'users': users}, content_type='application/json')
+            self.assertEqual(response.json()['created'], 3)
+            if batch == 0:
+                pool = web_pool()
+        self.assertIs(web_pool(), pool)
+        for user in User.objects.filter(username__startswith='pooled'):
+            self.assertTrue(user.check_password('Str0ng-passphrase'))
+
+    def test_requires_staff(self):
+        response = self.client.post('/api/users/bulk_register/', {'users': []}, content_type='application/json')
+        self.assertIn(response.status_code, (401, 403))
+
+
+@override_settings(
+    FLIGHTS_STATELESS_AUTH=True,
+    MIDDLEWARE=[
+        'flights.middleware.JWTCookieAuthenticationMiddleware'
+        if name == 'django.contrib.auth.middleware.AuthenticationMiddleware' else name
+        for name in settings.MIDDLEWARE
+        if name != 'django.contrib.sessions.middleware.SessionMiddleware'
+    ],
+    MESSAGE_STORAGE='django.contrib.messages.storage.cookie.CookieStorage',
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_AUTHENTICATION_CLASSES': ('flights.authentication.CachedJWTAuthentication',),
+    },
+)
+class StatelessAuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=5, passengers=1, bookings_per_passenger=0, seed=7)
+        cls.user = User.objects.get(username='bench-user-0')
+        cls.flight = Flight.objects.filter(capacity__isnull=True).first() or Flight.objects.first()
+
+    def test_login_and_join_without_sessions(self):
+        response = self.client.post('/login/', {'username': self.user.username, 'password': 'bench-password'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('access_token', response.cookies)
+
+        response = self.client.post(f'/flights/{self.flight.pk}/register/')
+        self.assertRedirects(response, '/my_flights/', fetch_redirect_response=False)
+        self.assertIn('messages', response.cookies)
+        self.assertTrue(self.flight.passengers.filter(user=self.user).exists())
+
+        response = self.client.get('/my_flights/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Successfully joined the flight!', [str(message) for message in response.context['messages']])
+
+        response = self.client.get('/logout/')
+        self.assertEqual(response.cookies['access_token'].value, '')
+        self.assertFalse(Session.objects.exists())
+
+    def test_invalid_token_is_anonymous(self):
+        self.client.cookies['access_token'] = 'not-a-token'
+        response = self.client.get('/my_flights/')
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(FLIGHTS_READ_REPLICAS=['replica'], FLIGHTS_REPLICA_HEALTH_INTERVAL=60)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        replica_health.record('replica', True)
+        self.addCleanup(replica_health.reset)
+        self.router = ReplicaRouter()
+
+    def routed_reads(self, method='GET', cookies=None, write=False):
+        """Run a request through ReplicaPinningMiddleware; return (read alias, response)."""
+        seen = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Flight)
+            seen.append(self.router.db_for_read(Flight))
+            return HttpResponse()
+
+        request = RequestFactory().generic(method, '/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen[0], response
+
+    def test_reads_go_to_healthy_replica(self):
+        self.assertEqual(self.router.db_for_read(Flight), 'replica')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(Flight), 'default')
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        replica_health.record('replica', False)
+        self.assertEqual(self.router.db_for_read(Flight), 'default')
+
+    def test_read_your_writes(self):
+        alias, response = self.routed_reads()
+        self.assertEqual(alias, 'replica')
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+        alias, response = self.routed_reads(method='POST', write=True)
+        self.assertEqual(alias, 'default')
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+        alias, _ = self.routed_reads(cookies={PRIMARY_COOKIE: '1'})
+        self.assertEqual(alias, 'default')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'the replica is an SQLite copy of the primary')
+@override_settings(FLIGHTS_READ_REPLICAS=['replica'], FLIGHTS_REPLICA_HEALTH_INTERVAL=60)
+class LaggingReplicaTests(TransactionTestCase):
+    """Shared caches are filled from the primary, never from a replica that lags behind it."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # a connection of this thread only, outside settings.DATABASES
+        settings_dict = {**connections['default'].settings_dict, 'NAME': str(Path(directory.name) / 'replica.sqlite3')}
+        connections['replica'] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'replica')
+        self.addCleanup(self.drop_replica)
+        replica_health.record('replica', True)
+        self.addCleanup(replica_health.reset)
+        for alias in ('default', 'catalog'):
+            caches[alias].clear()
+
+        generate_dataset(cities=2, airports=4, flights=3, passengers=1, bookings_per_passenger=0, seed=14)
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        self.flight = Flight.objects.order_by('pk').first()
+        self.flight.name = 'LAG1'
+        self.flight.save()
+
+    @staticmethod
+    def drop_replica():
+        connections['replica'].close()
+        del connections['replica']
+
+    def test_caches_are_filled_from_the_primary(self):
+        self.assertFalse(Flight.objects.using('replica').filter(name='LAG1').exists())
+        self.assertEqual(self.client.get(f'/api/flights/{self.flight.pk}/').json()['name'], 'LAG1')
+        self.assertContains(self.client.get('/'), 'LAG1')
+        self.assertContains(self.client.get(f'/flights/{self.flight.pk}/'), 'LAG1')
+
+
+@override_settings(FLIGHTS_BOOKING_QUEUE=True)
+class BookingQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=2, passengers=3, bookings_per_passenger=0, seed=8)
+        cls.flight = Flight.objects.first()
+        Flight.objects.filter(pk=cls.flight.pk).update(capacity=1)
+        cls.users = [passenger.user for passenger in Passenger.objects.select_related('user').order_by('pk')]
+
+    def join(self, user):
+        self.client.force_login(user)
+        return self.client.post(f'/api/flights/{self.flight.pk}/join/')
+
+    def test_joins_are_queued_and_processed_in_order(self):
+        first = self.join(self.users[0])
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.json()['status'], BookingStatus.QUEUED)
+        self.assertEqual(self.join(self.users[0]).json()['id'], first.json()['id'])
+        second = self.join(self.users[1])
+        self.assertFalse(self.flight.passengers.exists())
+
+        self.assertEqual(process_booking_queue(), {BookingStatus.BOOKED: 1, BookingStatus.FULL: 1})
+        self.assertEqual(list(self.flight.passengers.values_list('user', flat=True)), [self.users[0].pk])
+
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.client.get(first['Location']).json()['status'], BookingStatus.BOOKED)
+        # only the passenger (or a manager) can see a request
+        self.assertEqual(self.client.get(second['Location']).status_code, 404)
+        self.assertEqual(self.join(self.users[2]).status_code, 409)
+
+
+class FlightEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=3, passengers=1, bookings_per_passenger=0, seed=9)
+
+    def test_changes_are_recorded(self):
+        flight, passenger = Flight.objects.first(), Passenger.objects.first()
+        start = FlightEvent.objects.latest('pk').pk
+        book_seat(flight.pk, passenger.pk)
+        flight.name = 'EV1'
+        flight.save()
+        flight.delete()
+        events = list(FlightEvent.objects.filter(pk__gt=start).order_by('pk'))
+        self.assertEqual([event.kind for event in events], ['passengers', 'updated', 'deleted'])
+        self.assertEqual(events[0].data['passenger_count'], 1)
+        self.assertEqual(events[1].data['name'], 'EV1')
+
+    async def test_stream_resumes_and_filters(self):
+        flights = [flight async for flight in Flight.objects.order_by('pk')]
+        passenger = await Passenger.objects.afirst()
+        start = (await FlightEvent.objects.alatest('pk')).pk
+        for flight in flights[:2]:
+            await sync_to_async(book_seat)(flight.pk, passenger.pk)
+
+        frames = []
+
+        async def listen():
+            async for frame in event_stream(start, {flights[1].pk}, lifetime=1.5):
+                frames.append(frame)
+
+        listener = asyncio.ensure_future(listen())
+        await asyncio.sleep(0.2)
+        await sync_to_async(book_seat)(flights[2].pk, passenger.pk)
+        flights[1].distance_km = 7
+        await flights[1].asave()
+        await listener
+
+        events = [frame for frame in frames if frame.startswith('id: ')]
+        self.assertEqual([frame.split('\n')[1] for frame in events], ['event: passengers', 'event: updated'])
+        self.assertTrue(all(f'"flight":{flights[1].pk},' in frame for frame in events))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/events/flights/?flight=abc').status_code, 400)
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=3, passengers=1, bookings_per_passenger=0, seed=10)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        limits = override_settings(
+            FLIGHTS_RATELIMIT_PATH=Path(directory.name) / 'ratelimit.sqlite3',
+            FLIGHTS_RATE_LIMITS={
+                'token_obtain_pair': ['ip:2/m'], 'admin:login': ['ip:2/m'], 'admin_login': ['ip:2/m'],
+                'flight-join': ['user:2/m', 'flight:100/s'],
+            },
+        )
+        limits.enable()
+        self.addCleanup(limits.disable)
+
+    def test_token_bucket(self):
+        store, rule = TokenBucketStore(':memory:'), Rule('ip:2/s')
+        self.assertEqual([store.take('key', rule, now=100) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(store.take('key', rule, now=100), 0.5)
+        self.assertEqual(store.take('key', rule, now=100.5), 0)
+
+    def test_rejected_before_password_check(self):
+        credentials = {'username': 'bench-user-0', 'password': 'bench-password'}
+        for urlconf, url, status_code in (
+            (settings.ROOT_URLCONF, '/api/token/', 200),
+            (settings.ROOT_URLCONF, '/admin/login/', 200),
+            (__name__, '/admin/login/', 302),  # FLIGHTS_STATELESS_AUTH routing
+        ):
+            with self.subTest(url=url, urlconf=urlconf), override_settings(ROOT_URLCONF=urlconf):
+                for _ in range(2):
+                    self.assertEqual(self.client.post(url, credentials).status_code, status_code)
+                with self.assertNumQueries(0):
+                    response = self.client.post(url, credentials)
+                self.assertEqual(response.status_code, 429)
+                self.assertIn('Retry-After', response)
+
+    def test_joins_per_user(self):
+        self.client.force_login(Passenger.objects.get().user)
+        statuses = [self.client.post(f'/api/flights/{flight.pk}/join/').status_code for flight in Flight.objects.all()]
+        self.assertEqual(statuses, [200, 200, 429])
+
+
+class FastReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=3, airports=6, flights=12, passengers=2, bookings_per_passenger=3, seed=11)
+        Flight.objects.filter(pk=Flight.objects.order_by('pk')[0].pk).update(name='Tehran\u2028✈', capacity=None)
+        cls.flights = Flight.objects.select_related('origin__city', 'destination__city').order_by('pk')
+
+    def setUp(self):
+        caches['catalog'].clear()
+
+    def test_rows_match_serializer(self):
+        expected = FlightSerializer(self.flights, many=True).data
+        rows = list(flight_rows(self.flights))
+        self.assertEqual(rows, expected)
+        self.assertEqual(json.dumps(rows), json.dumps(expected))  # same key order at every level
+
+        response = self.client.get('/api/flights/', {'page_size': 5})
+        self.assertEqual(response.json()['results'], expected[:5])
+        self.assertEqual(response.content, JSONRenderer().render(response.json()))
+        self.assertEqual(self.client.get(response.json()['next']).json()['results'], expected[5:10])
+        self.assertEqual(self.client.get(f'/api/flights/{expected[0]["id"]}/').json(), expected[0])
+        self.assertEqual(self.client.get('/api/flights/not-a-number/').status_code, 404)
+
+        passenger = Passenger.objects.first()
+        self.client.force_login(passenger.user)
+        self.assertEqual(
+            self.client.get('/api/flights/my_flights/').json()['results'],
+            FlightSerializer(self.flights.filter(passengers=passenger), many=True).data,
+        )
+
+    def test_row_builder(self):
+        class FlightIdSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Flight
+                fields = ['id']
+
+        class FlightLabelSerializer(FlightIdSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta(FlightIdSerializer.Meta):
+                fields = ['id', 'label']
+
+        columns, build = row_builder(FlightIdSerializer)
+        self.assertEqual((columns, build((7,))), (('id',), {'id': 7}))
+        with self.assertRaises(ImproperlyConfigured):
+            row_builder(FlightLabelSerializer)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {'when': timezone.now(), 'ratio': 0.25, 'text': 'a\u2029b', 'big': 2 ** 70}
+        for media_type in (None, 'application/json; indent=2'):
+            with self.subTest(media_type=media_type):
+                self.assertEqual(
+                    FastJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type),
+                )
+
+
+class FlightFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(cities=2, airports=4, flights=6, passengers=2, bookings_per_passenger=1, seed=12)
+
+    def setUp(self):
+        caches['catalog'].clear()
+
+    def test_list_rows_follow_changes(self):
+        flight = Flight.objects.order_by('pk').first()
+        passenger = Passenger.objects.exclude(flights=flight).first()
+        self.assertNotContains(self.client.get('/'), 'btn-outline-success')
+        with self.assertNumQueries(0):
+            self.client.get('/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(flight.pk, passenger.pk)
+        # one query for the flight ids, one to re-render the booked flight's row
+        with self.assertNumQueries(2):
+            self.client.get('/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.origin.city.name = 'Renamed city'
+            flight.origin.city.save()
+        self.client.force_login(passenger.user)
+        response = self.client.get('/')
+        self.assertContains(response, 'Renamed city')
+        self.assertContains(response, 'btn-outline-success', count=6)
+        self.assertNotContains(response, 'fa-edit')
+
+    def test_list_recomposed_between_bumps(self):
+        flight = Flight.objects.order_by('pk').first()
+        self.client.get('/')
+        Flight.objects.filter(pk=flight.pk).update(name='FR2')
+        real_bump = bump_version
+
+        def bump_then_request(namespace):
+            version = real_bump(namespace)
+            self.client.get('/')
+            return version
+
+        with mock.patch('flights.cache.bump_version', side_effect=bump_then_request):
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidate_catalog([flight.pk])
+        self.assertContains(self.client.get('/'), 'FR2')
+
+    def test_detail_card(self):
+        flight = Flight.objects.first()
+        self.client.get(f'/flights/{flight.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.name = 'FR1'
+            flight.save()
+        self.assertContains(self.client.get(f'/flights/{flight.pk}/'), 'FR1')
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.delete()
+        self.assertEqual(self.client.get(f'/flights/{flight.pk}/').status_code, 404)
@@ -3,14 +3,15 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     FlightViewSet, PassengerViewSet, UserRegisterView,
-    CustomTokenObtainPairView,
+    CustomTokenObtainPairView, RouteSearchView, AutocompleteView, MetricsView, StatsView,
     flight_list_view, flight_detail_view, flight_join_view,
     my_flights_view, home_view,
-    flight_passengers_view, flight_create_view,
+    flight_passengers_view, flight_manifest_view, flight_create_view,
     flight_edit_view, flight_delete_view
 )
 
 from .auth_views import register_view
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'flights', FlightViewSet)
@@ -29,9 +30,21 @@ urlpatterns = [
     path('flights/<int:pk>/edit/', flight_edit_view, name='flight_edit'),
     path('flights/<int:pk>/delete/', flight_delete_view, name='flight_delete'),
     path('flights/<int:pk>/passengers/', flight_passengers_view, name='flight_passengers'),
+    path('flights/<int:pk>/manifest.csv', flight_manifest_view, name='flight_manifest'),
     path('my_flights/', my_flights_view, name='my_flights'),
 
     # API routes under /api/
+    # async (ASGI-native) versions of the hot endpoints
+    path('api/async/flights/', async_views.flight_list, name='async_flight_list'),
+    path('api/async/flights/my_flights/', async_views.my_flights, name='async_my_flights'),
+    path('api/async/flights/<int:pk>/', async_views.flight_detail, name='async_flight_detail'),
+    path('api/async/flights/<int:pk>/join/', async_views.flight_join, name='async_flight_join'),
+    path('api/bookings/<int:pk>/', async_views.booking_status, name='booking_status'),
+    path('api/events/flights/', async_views.flight_events, name='flight_events'),
+    path('api/routes/', RouteSearchView.as_view(), name='route_search'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/stats/<str:kind>/', StatsView.as_view(), name='stats'),
+    path('api/autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
     path('api/', include(router.urls)),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -12,18 +12,39 @@ This module contains:
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404 as get_row_or_404
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User, Group
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-
-from .models import Flight, Passenger, Airport, City
-from .serializers import FlightSerializer, PassengerSerializer, UserSerializer
-from .permissions import IsFlightManager, IsPassenger
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import Http404, HttpResponse
+
+from .models import BookingStatus, Flight, Passenger, Airport, City, AirportStats, CityStats, RouteStats
+from .serializers import (
+    BookingRequestSerializer, BulkBookingSerializer, BulkOnboardingSerializer, CustomTokenObtainPairSerializer, FlightSerializer,
+    AutocompleteQuerySerializer, PassengerSerializer, RouteSearchQuerySerializer, UserSerializer,
+    AirportStatsSerializer, CityStatsSerializer, RouteStatsSerializer, StatsQuerySerializer,
+)
+from .permissions import IsBookingOrganizer, IsFlightManager, IsPassenger
+from .booking import booking_queue_enabled, bulk_book, bulk_cancel, enqueue_booking
+from .routes import get_route_index
+from .autocomplete import get_place_index
+from .manifest import ENCODERS, manifest_response, manifest_rows
+from .onboarding import PassengerOnboarder, web_pool, web_workers
 from .forms import FlightForm
+from .cache import CatalogCacheMixin, catalog_stats, get_version
+from .fastpath import flight_rows
+from . import fragments
+from .filters import FlightSearchFilter
+from .roles import is_manager_or_admin
+from .instrumentation import request_metrics
+from .db_router import replica_health
 
 
 # ───────────────────────────────────────────────
@@ -34,13 +55,16 @@ def _is_manager_or_admin(user):
     """
     Check if the user is a staff member (admin) or belongs to the 'Flight Managers' group.
 
+    Roles are resolved through flights.roles, so repeated calls within a request
+    (and across requests) do not query the groups table again.
+
     Args:
         user: The user instance to check.
 
     Returns:
         bool: True if user has management permissions, False otherwise.
     """
-    return user.is_authenticated and (user.is_staff or user.groups.filter(name='Flight Managers').exists())
+    return is_manager_or_admin(user)
 
 
 # ───────────────────────────────────────────────
@@ -50,28 +74,30 @@ def _is_manager_or_admin(user):
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Custom endpoint for obtaining JWT access and refresh tokens.
-    Can be extended with CustomTokenObtainPairSerializer for additional claims.
+    Tokens carry the `username` and `is_flight_manager` claims
+    (see CustomTokenObtainPairSerializer).
     """
-    # serializer_class = CustomTokenObtainPairSerializer  # Uncomment if custom serializer exists
-    pass
+    serializer_class = CustomTokenObtainPairSerializer
 
 
 # ───────────────────────────────────────────────
 # Flight API ViewSet (DRF)
 # ───────────────────────────────────────────────
 
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing flights.
 
     Permissions:
     - create/update/delete: Flight Managers or admins only
     - join/my_flights: authenticated users only
-    - list/retrieve: public (AllowAny)
+    - list/retrieve: public (AllowAny), served from the catalog cache with ETags
     - passengers: Flight Managers or admins only
+    - bulk_bookings: Flight Managers, admins, or Group Organizers for their own passengers
+    - cache_stats: staff only
 
     Endpoints:
-    - GET    /api/flights/                → List all flights
+    - GET    /api/flights/                → List flights, optionally filtered (see flights.filters)
     - GET    /api/flights/<id>/           → Retrieve flight detail
     - POST   /api/flights/                → Create new flight (manager only)
     - PUT    /api/flights/<id>/           → Update flight (manager only)
@@ -79,9 +105,17 @@ class FlightViewSet(viewsets.ModelViewSet):
     - POST   /api/flights/<id>/join/      → Join the flight as passenger
     - GET    /api/flights/my_flights/     → List current user's joined flights
     - GET    /api/flights/<id>/passengers/ → List passengers of the flight (manager only)
+    - GET    /api/flights/<id>/manifest/  → Stream the flight's manifest as CSV/NDJSON (manager only)
+    - GET    /api/flights/manifest/       → Stream the manifest of all flights (manager only)
+    - POST   /api/flights/bulk-bookings/  → Add/remove many (flight, passenger) pairs
+    - GET    /api/flights/cache-stats/    → Catalog cache hit/miss counters (staff only)
     """
-    queryset = Flight.objects.all()
+    queryset = Flight.objects.select_related('origin__city', 'destination__city')
     serializer_class = FlightSerializer
+    # ?origin=&destination=&origin_city=&destination_city=&min_distance=&max_distance=&name=
+    filter_backends = [FlightSearchFilter]
+    # read-only requests get a token-backed user instead of a User row
+    claims_user_safe_methods = True
 
     def get_permissions(self):
         """
@@ -91,10 +125,36 @@ class FlightViewSet(viewsets.ModelViewSet):
             return [IsFlightManager()]
         if self.action in ['join', 'my_flights']:
             return [IsAuthenticated()]
-        if self.action == 'passengers':
+        if self.action in ['passengers', 'manifest', 'all_manifests']:
             return [IsFlightManager()]
+        if self.action == 'bulk_bookings':
+            return [IsBookingOrganizer()]
+        if self.action == 'cache_stats':
+            return [IsAdminUser()]
         return [AllowAny()]
 
+    # list/retrieve/my_flights build the FlightSerializer format from values_list
+    # rows (flights.fastpath); serializer_class still drives writes and the schema
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.list_rows, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(self.retrieve_row, request, *args, **kwargs)
+
+    def list_rows(self, request, *args, **kwargs):
+        """Paginated list in the FlightSerializer format, read with values_list."""
+        rows = flight_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(list(rows))
+        return self.get_paginated_response(page)
+
+    def retrieve_row(self, request, *args, **kwargs):
+        """Single flight in the FlightSerializer format, read with values_list."""
+        row = get_row_or_404(flight_rows(self.filter_queryset(self.get_queryset())), pk=kwargs['pk'])
+        self.check_object_permissions(request, row)
+        return Response(row)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def join(self, request, pk=None):
         """
@@ -102,7 +162,8 @@ class FlightViewSet(viewsets.ModelViewSet):
 
         POST /api/flights/<id>/join/
         Requires authentication.
-        Returns success message or error if already joined.
+        Returns success message, 400 if already joined or 409 if the flight is full.
+        In queued booking mode returns 202 with the queued booking request instead.
         """
         flight = self.get_object()
 
@@ -114,15 +175,32 @@ class FlightViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if flight.passengers.filter(id=passenger.id).exists():
+        if booking_queue_enabled():
+            if flight.is_full:
+                return Response(
+                    {"error": "Flight is full", "status": BookingStatus.FULL},
+                    status=status.HTTP_409_CONFLICT
+                )
+            data = BookingRequestSerializer(enqueue_booking(flight.pk, passenger.pk)).data
             return Response(
-                {"error": "Already joined this flight"},
+                {"message": "Booking request queued", **data},
+                status=status.HTTP_202_ACCEPTED, headers={'Location': data['status_url']}
+            )
+
+        result = flight.book(passenger)
+        if result == BookingStatus.ALREADY_JOINED:
+            return Response(
+                {"error": "Already joined this flight", "status": result},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if result == BookingStatus.FULL:
+            return Response(
+                {"error": "Flight is full", "status": result},
+                status=status.HTTP_409_CONFLICT
+            )
 
-        flight.passengers.add(passenger)
         return Response(
-            {"message": "Successfully joined flight"},
+            {"message": "Successfully joined flight", "status": result},
             status=status.HTTP_200_OK
         )
 
@@ -132,19 +210,20 @@ class FlightViewSet(viewsets.ModelViewSet):
         Retrieve the list of flights the current authenticated user has joined.
 
         GET /api/flights/my_flights/
-        Returns serialized list of flights.
+        Returns a cursor-paginated list of flights.
         """
         try:
             passenger = request.user.passenger_profile
-            flights = Flight.objects.filter(passengers=passenger)
-            serializer = self.get_serializer(flights, many=True)
-            return Response(serializer.data)
         except Passenger.DoesNotExist:
             return Response(
                 {"error": "Passenger profile not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        flights = flight_rows(self.get_queryset().filter(passengers=passenger))
+        page = self.paginate_queryset(flights)
+        return self.get_paginated_response(page)
+
     @action(detail=True, methods=['get'], permission_classes=[IsFlightManager])
     def passengers(self, request, pk=None):
         """
@@ -152,12 +231,252 @@ class FlightViewSet(viewsets.ModelViewSet):
 
         GET /api/flights/<id>/passengers/
         Only accessible by Flight Managers or admins.
-        Returns serialized list of passengers.
+        Returns a cursor-paginated list of passengers.
         """
         flight = self.get_object()
-        passengers_data = flight.passengers.all()
-        serializer = PassengerSerializer(passengers_data, many=True)
-        return Response(serializer.data)
+        passengers_data = flight.passengers.select_related('user')
+        page = self.paginate_queryset(passengers_data)
+        serializer = PassengerSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsFlightManager])
+    def manifest(self, request, pk=None):
+        """
+        Stream the passenger manifest of the specified flight.
+
+        GET /api/flights/<id>/manifest/?type=csv|ndjson
+        Only accessible by Flight Managers or admins.
+        """
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in ENCODERS:
+            return Response(
+                {"error": f"type must be one of: {', '.join(ENCODERS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        flight = get_object_or_404(Flight.objects.only('pk'), pk=pk)
+        return manifest_response(manifest_rows([flight.pk]), fmt, f'manifest-{flight.pk}')
+
+    @action(detail=False, methods=['get'], url_path='manifest', url_name='manifest-all',
+            permission_classes=[IsFlightManager])
+    def all_manifests(self, request):
+        """
+        Stream the passenger manifest of every flight.
+
+        GET /api/flights/manifest/?type=csv|ndjson
+        Only accessible by Flight Managers or admins.
+        """
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in ENCODERS:
+            return Response(
+                {"error": f"type must be one of: {', '.join(ENCODERS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return manifest_response(manifest_rows(), fmt, 'manifest-all')
+
+    @action(detail=False, methods=['post'], url_path='bulk-bookings', permission_classes=[IsBookingOrganizer])
+    def bulk_bookings(self, request):
+        """
+        Add and/or remove many passengers across flights in one call.
+
+        POST /api/flights/bulk-bookings/
+        Body: {"add": [{"flight": 1, "passenger": 2}, ...], "remove": [...]}
+        Only accessible by Flight Managers, admins or Group Organizers; an
+        organizer may only book themselves and the passengers they organize
+        (Passenger.organizer), otherwise nothing is applied and 403 is returned.
+        Applies the same duplicate and capacity rules as join and returns one
+        result per item, in request order.
+        """
+        serializer = BulkBookingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if not is_manager_or_admin(request.user, request.auth):
+            passenger_ids = {item['passenger'] for item in data['add'] + data['remove']}
+            organized = set(Passenger.objects.filter(
+                Q(user=request.user) | Q(organizer=request.user), pk__in=passenger_ids,
+            ).values_list('pk', flat=True))
+            if passenger_ids - organized:
+                return Response(
+                    {"error": "Not an organizer of these passengers", "passengers": sorted(passenger_ids - organized)},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+        results = []
+        with transaction.atomic():
+            for op, items, apply in (('add', data['add'], bulk_book), ('remove', data['remove'], bulk_cancel)):
+                if not items:
+                    continue
+                statuses = apply([(item['flight'], item['passenger']) for item in items])
+                results.extend(
+                    {'op': op, 'flight': item['flight'], 'passenger': item['passenger'], 'status': result}
+                    for item, result in zip(items, statuses)
+                )
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Report the catalog response cache counters of this worker process.
+
+        GET /api/flights/cache-stats/
+        Only accessible by staff users.
+        """
+        return Response({
+            'catalog_version': get_version('catalog'),
+            **catalog_stats.as_dict(),
+        })
+
+
+# ───────────────────────────────────────────────
+# Route Search API
+# ───────────────────────────────────────────────
+
+class RouteSearchView(APIView):
+    """
+    Find the shortest multi-leg itineraries between two airports or cities.
+
+    GET /api/routes/?origin=IKA&destination=MHD&k=3&max_legs=3
+    GET /api/routes/?origin_city=1&destination_city=2
+
+    `origin` / `destination` accept an airport id or code. Itineraries are
+    ranked by total distance and never revisit an airport. Served from the
+    in-memory route index (flights.routes), not from the database.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = RouteSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        index = get_route_index()
+
+        endpoints = {}
+        for side in ('origin', 'destination'):
+            if f'{side}_city' in params:
+                airports = index.airports_in_city(params[f'{side}_city'])
+            else:
+                value = params[side]
+                airport_id = int(value) if value.isdecimal() and int(value) in index.airports else index.airport_by_code(value)
+                airports = {airport_id} if airport_id is not None else set()
+            if not airports:
+                return Response(
+                    {"error": f"Unknown {side}"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            endpoints[side] = airports
+
+        itineraries = index.find_itineraries(
+            endpoints['origin'], endpoints['destination'],
+            k=params['k'], max_legs=params['max_legs'],
+        )
+        return Response({'results': itineraries})
+
+
+class AutocompleteView(APIView):
+    """
+    Prefix lookup of airports (by name or IATA code) and cities (by name).
+
+    GET /api/autocomplete/?q=teh&type=airport&limit=10&offset=0
+
+    `next_offset` is set when more matches are available.
+
+    Served from an in-memory sorted prefix index (flights.autocomplete);
+    the database is only read when the index has to be rebuilt.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = AutocompleteQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        index = get_place_index()
+        kinds = (params['type'],) if 'type' in params else ('airport', 'city')
+        places, has_more = index.search(
+            params['q'], limit=params['limit'], offset=params['offset'], kinds=kinds,
+        )
+        return Response({
+            'results': [index.describe(kind, pk) for kind, pk in places],
+            'next_offset': params['offset'] + len(places) if has_more else None,
+        })
+
+
+class StatsView(APIView):
+    """
+    Precomputed route / airport / city statistics (see flights.stats).
+
+    GET /api/stats/routes/?ordering=-load_factor&limit=20
+    GET /api/stats/airports/?ordering=-departing_passengers
+    GET /api/stats/cities/
+    Only accessible by Flight Managers. Each response is a single query.
+    """
+    permission_classes = [IsFlightManager]
+
+    PLACE_ORDERINGS = [
+        'passengers', 'departing_passengers', 'arriving_passengers',
+        'departing_flights', 'arriving_flights',
+    ]
+    KINDS = {
+        'routes': (
+            lambda: RouteStats.objects.with_load_factor().select_related('origin__city', 'destination__city'),
+            RouteStatsSerializer,
+            ['passenger_count', 'flight_count', 'seats', 'load_factor'],
+        ),
+        'airports': (
+            lambda: AirportStats.objects.with_passengers().select_related('airport__city'),
+            AirportStatsSerializer,
+            PLACE_ORDERINGS,
+        ),
+        'cities': (
+            lambda: CityStats.objects.with_passengers().select_related('city'),
+            CityStatsSerializer,
+            PLACE_ORDERINGS,
+        ),
+    }
+
+    def get(self, request, kind):
+        if kind not in self.KINDS:
+            raise Http404
+        query = StatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        queryset, serializer_class, orderings = self.KINDS[kind]
+        ordering = params.get('ordering', f'-{orderings[0]}')
+        field = ordering.lstrip('-')
+        if field not in orderings:
+            return Response(
+                {"ordering": [f"Must be one of: {', '.join(orderings)} (prefix '-' for descending)"]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        order = F(field).desc(nulls_last=True) if ordering.startswith('-') else F(field).asc(nulls_last=True)
+
+        rows = queryset().order_by(order, 'pk')[:params['limit']]
+        return Response({'results': serializer_class(rows, many=True).data})
+
+
+class MetricsView(APIView):
+    """
+    Per-route request histograms (see flights.instrumentation) and the read
+    replica health seen by this process (flights.db_router) in the
+    Prometheus text format.
+
+    GET /api/metrics/
+    Only accessible by staff.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        lines = [
+            '# HELP flights_replica_healthy Whether the last probe of a read replica succeeded.',
+            '# TYPE flights_replica_healthy gauge',
+            *(f'flights_replica_healthy{{alias="{alias}"}} {int(healthy)}'
+              for alias, healthy in replica_health.status().items()),
+        ]
+        return HttpResponse(
+            request_metrics.render() + '\n'.join(lines) + '\n',
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
 
 
 # ───────────────────────────────────────────────
@@ -168,12 +487,18 @@ def flight_list_view(request):
     """
     Render HTML page listing all flights.
     Managers/admins see add/edit/delete options.
+    The table rows come from the fragment cache (see flights.fragments).
     """
-    flights = Flight.objects.select_related("origin__city", "destination__city").all()
     is_manager = _is_manager_or_admin(request.user)
-    
+    if is_manager:
+        role = fragments.MANAGER
+    elif request.user.is_authenticated:
+        role = fragments.PASSENGER
+    else:
+        role = fragments.ANONYMOUS
+
     return render(request, 'flights/flight_list.html', {
-        'flights': flights,
+        'rows': fragments.flight_list_rows(role),
         'is_manager': is_manager
     })
 
@@ -182,12 +507,18 @@ def flight_detail_view(request, pk):
     """
     Render HTML page with flight details.
     Managers/admins see passenger list.
+    The flight card comes from the fragment cache (see flights.fragments).
     """
-    flight = get_object_or_404(Flight, pk=pk)
+    entry = fragments.flight_card(pk)
+    if entry is None:
+        raise Http404('No Flight matches the given query.')
+    name, card = entry
     is_manager = _is_manager_or_admin(request.user)
-    
+
     return render(request, 'flights/flight_detail.html', {
-        'flight': flight,
+        'flight_id': pk,
+        'flight_name': name,
+        'card': card,
         'is_manager': is_manager
     })
 
@@ -207,14 +538,23 @@ def flight_join_view(request, pk):
         return redirect('register')
 
     if request.method == 'POST':
-        if flight.passengers.filter(id=passenger.id).exists():
+        if booking_queue_enabled():
+            # the worker books it; only an obviously full flight is refused here
+            result = BookingStatus.FULL if flight.is_full else enqueue_booking(flight.pk, passenger.pk).status
+        else:
+            result = flight.book(passenger)
+        if result == BookingStatus.ALREADY_JOINED:
             messages.info(request, 'You already joined this flight.')
+        elif result == BookingStatus.FULL:
+            messages.error(request, 'Sorry, this flight is full.')
+            return redirect('flight_detail', pk=flight.pk)
+        elif result == BookingStatus.QUEUED:
+            messages.info(request, 'Your booking request was received; the flight will appear here once it is confirmed.')
         else:
-            flight.passengers.add(passenger)
             messages.success(request, 'Successfully joined the flight!')
         return redirect('my_flights')
 
-    return render(request, 'flights/flight_detail.html', {'flight': flight})
+    return flight_detail_view(request, flight.pk)
 
 
 @login_required
@@ -314,7 +654,7 @@ def flight_passengers_view(request, pk):
     Only accessible by Flight Managers or admins.
     """
     flight = get_object_or_404(Flight, pk=pk)
-    passengers = flight.passengers.all()
+    passengers = flight.passengers.only('name', 'passport', 'phone')
     
     return render(request, 'flights/flight_passengers.html', {
         'flight': flight,
@@ -322,6 +662,16 @@ def flight_passengers_view(request, pk):
     })
 
 
+@user_passes_test(_is_manager_or_admin)
+def flight_manifest_view(request, pk):
+    """
+    Download the passenger manifest of a flight as a streamed CSV file.
+    Only accessible by Flight Managers or admins.
+    """
+    flight = get_object_or_404(Flight.objects.only('pk'), pk=pk)
+    return manifest_response(manifest_rows([flight.pk]), 'csv', f'manifest-{flight.pk}')
+
+
 # ───────────────────────────────────────────────
 # Additional ViewSets
 # ───────────────────────────────────────────────
@@ -332,7 +682,7 @@ class PassengerViewSet(viewsets.ModelViewSet):
 
     - List / Retrieve / Update / Delete: authenticated users only
     """
-    queryset = Passenger.objects.all()
+    queryset = Passenger.objects.select_related('user')
     serializer_class = PassengerSerializer
     permission_classes = [IsAuthenticated]
 
@@ -363,6 +713,37 @@ class UserRegisterView(viewsets.ViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_register(self, request):
+        """
+        Register many users with Passenger profiles in one call.
+
+        POST /api/users/bulk_register/
+        Body: {"users": [{"username": ..., "password": ..., "email": ..., "passport": ...}, ...]}
+        Only accessible by staff users.
+        Invalid rows are skipped and reported; the others are created. Returns
+        one result per row, in request order.
+        """
+        serializer = BulkOnboardingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        records = list(enumerate(serializer.validated_data['users'], start=1))
+
+        # hashes in the pool shared by all requests (FLIGHTS_ONBOARDING_WEB_WORKERS)
+        with PassengerOnboarder(workers=web_workers(), pool=web_pool()) as onboarder:
+            created = onboarder.onboard_chunk(records)
+        results = {
+            row: {'row': row, 'status': 'created', 'user': user_id, 'passenger': passenger_id, 'passport': passport}
+            for row, user_id, passenger_id, passport in created
+        }
+        results.update(
+            (row, {'row': row, 'status': 'error', 'error': message})
+            for row, message in onboarder.errors
+        )
+        return Response(
+            {'created': len(created), 'results': [results[row] for row, _ in records]},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """